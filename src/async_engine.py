@@ -0,0 +1,276 @@
+"""
+asyncioで複数のキーワード検索を並行実行するエンジン
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Iterable, Callable
+from loguru import logger
+
+from src.amazon_scraper import AmazonScraper
+from src.rakuten_scraper import RakutenScraper
+from src.browser_pool import PagePool
+from src.circuit_breaker import CircuitBreaker
+from src.concurrency import AdaptiveConcurrency
+from src.http_fetcher import HttpFetcher
+from src.rate_limiter import RateLimiter, default_rate_limiter
+from src.search_planner import SearchPlan
+from src.serp_archive import SerpArchive
+from src.serp_snapshot import SerpSnapshot
+from src.run_journal import RunJournal
+from src.ranking import RANK_UNKNOWN
+
+
+SCRAPER_CLASSES = {
+    'amazon': AmazonScraper,
+    'rakuten': RakutenScraper,
+}
+
+
+class Lane:
+    """マーケットプレイス専用のジョブキューとワーカーを持つ実行レーン"""
+
+    def __init__(self, marketplace: str, workers: int, search_func: Callable[[str, str, Iterable[str]], Dict[str, Optional[int]]],
+                 circuit_breaker: Optional[CircuitBreaker] = None, concurrency: Optional[AdaptiveConcurrency] = None):
+        """
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            workers: レーン内で同時に実行するキーワード検索数（concurrencyを指定した場合はその上限を使う）
+            search_func: 1キーワード分の検索を行う関数（marketplace, keyword, targets）
+            circuit_breaker: ブロック検知時にレーンを一時停止するサーキットブレーカー
+            concurrency: 同時実行数を応答時間・エラー率に応じて調整するコントローラー
+        """
+        self.marketplace = marketplace
+        self.workers = max(1, concurrency.maximum if concurrency else workers)
+        self.search_func = search_func
+        self.circuit_breaker = circuit_breaker
+        self.concurrency = concurrency
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        executor: ThreadPoolExecutor,
+        results: Dict[str, Dict[str, Optional[int]]],
+        total: int
+    ):
+        """キューが空になるまでキーワード検索を取り出して実行"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # 同時実行数の枠が空くまで待つ（ワーカーは上限数だけ起動しておく）
+            if self.concurrency:
+                await self.concurrency.acquire_async()
+            try:
+                await self._run_next(queue, executor, results, total, loop)
+            except asyncio.QueueEmpty:
+                return
+            finally:
+                if self.concurrency:
+                    self.concurrency.release()
+
+    async def _run_next(
+        self,
+        queue: asyncio.Queue,
+        executor: ThreadPoolExecutor,
+        results: Dict[str, Dict[str, Optional[int]]],
+        total: int,
+        loop: asyncio.AbstractEventLoop
+    ):
+        """キューから1キーワードを取り出して検索（キューが空ならQueueEmptyを送出）"""
+        keyword, targets = queue.get_nowait()
+
+        # ブロックで停止中はスレッドやブラウザを占有せずに待つ
+        if self.circuit_breaker and not await self.circuit_breaker.wait_async():
+            logger.warning(f"[{self.marketplace}] ブロックが続いているため検索しません: キーワード='{keyword}'")
+            results[keyword] = {target: RANK_UNKNOWN for target in targets}
+            logger.info(f"[{self.marketplace}] 進捗: {len(results)}/{total} キーワード")
+            return
+
+        try:
+            results[keyword] = await loop.run_in_executor(
+                executor, self.search_func, self.marketplace, keyword, targets
+            )
+        except Exception as e:
+            logger.error(f"{self.marketplace}検索エラー: キーワード='{keyword}' - {e}")
+            results[keyword] = {target: RANK_UNKNOWN for target in targets}
+
+        logger.info(f"[{self.marketplace}] 進捗: {len(results)}/{total} キーワード")
+
+    async def run(self, keyword_targets: Dict[str, Iterable[str]]) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        レーンのキーワードを全て検索
+
+        Args:
+            keyword_targets: キーワードと検索対象の辞書
+
+        Returns:
+            キーワードごとの検索対象と順位の辞書
+        """
+        queue = asyncio.Queue()
+        for keyword, targets in keyword_targets.items():
+            queue.put_nowait((keyword, targets))
+
+        results = {}
+        if queue.empty():
+            return results
+
+        if self.concurrency:
+            logger.info(
+                f"[{self.marketplace}] {queue.qsize()} 件のキーワード検索を同時実行数 {self.concurrency.limit}"
+                f"（{self.concurrency.minimum}〜{self.concurrency.maximum} で自動調整）で開始します"
+            )
+        else:
+            logger.info(f"[{self.marketplace}] {queue.qsize()} 件のキーワード検索をワーカー {self.workers} 個で開始します")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.marketplace) as executor:
+            await asyncio.gather(*[
+                self._worker(queue, executor, results, queue.qsize())
+                for _ in range(self.workers)
+            ])
+        if self.concurrency:
+            logger.info(f"[{self.marketplace}] 完了（最終的な同時実行数: {self.concurrency.limit}）")
+        else:
+            logger.info(f"[{self.marketplace}] 完了")
+        return results
+
+
+class AsyncSearchEngine:
+    """マーケットプレイスごとのレーンでキーワード検索を並行実行するクラス"""
+
+    def __init__(
+        self,
+        pool: PagePool,
+        http_fetcher: Optional[HttpFetcher] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        lane_workers: Optional[Dict[str, int]] = None,
+        headless: bool = True,
+        max_pages: int = 5,
+        extraction_mode: str = 'html',
+        page_ready_timeout: float = 10,
+        circuit_breakers: Optional[Dict[str, CircuitBreaker]] = None,
+        concurrency: Optional[Dict[str, AdaptiveConcurrency]] = None,
+        prefetch_pages: int = 0,
+        archive: Optional[SerpArchive] = None,
+        snapshot: Optional[SerpSnapshot] = None,
+        journal: Optional[RunJournal] = None,
+        page_deadline: float = 0,
+        keyword_deadline: float = 0
+    ):
+        """
+        Args:
+            pool: ブラウザ・タブのプール（BrowserPool または TabPool）
+            http_fetcher: HTTPクライアント（Noneの場合は常にブラウザで取得）
+            rate_limiter: ホストごとのレートリミッター（Noneの場合は設定値のレートを共有）
+            lane_workers: マーケットプレイスごとのワーカー数（Noneの場合は各1）
+            headless: ヘッドレスモードで実行するか
+            max_pages: 最大検索ページ数
+            extraction_mode: ブラウザでの結果抽出方法（html / js）
+            page_ready_timeout: ページの準備完了を待つ最大秒数
+            circuit_breakers: マーケットプレイスごとのサーキットブレーカー（Noneの場合は既定値で作成）
+            concurrency: マーケットプレイスごとの同時実行数コントローラー（Noneの場合はlane_workersで固定）
+            prefetch_pages: 1キーワード内でHTTPで先読みする後続ページ数
+            archive: 取得したページを保存するSERPアーカイブ（Noneの場合は保存しない）
+            snapshot: 検索で確認した全商品を記録するSERPスナップショット（Noneの場合は記録しない）
+            journal: 検索し終えたキーワードの順位を記録するジャーナル（Noneの場合は記録しない）
+            page_deadline: ブラウザでの1ページの取得の期限（秒、過ぎたらブラウザを強制終了する、0で無効）
+            keyword_deadline: 1キーワードの検索の期限（秒、過ぎたら残りのターゲットを「不明」にする、0で無効）
+        """
+        self.pool = pool
+        self.http_fetcher = http_fetcher
+        self.rate_limiter = rate_limiter or default_rate_limiter()
+        self.lane_workers = lane_workers or {}
+        self.headless = headless
+        self.max_pages = max_pages
+        self.extraction_mode = extraction_mode
+        self.page_ready_timeout = page_ready_timeout
+        self.circuit_breakers = circuit_breakers or {
+            marketplace: CircuitBreaker(marketplace) for marketplace in SCRAPER_CLASSES
+        }
+        self.concurrency = concurrency or {}
+        self.prefetch_pages = prefetch_pages
+        self.archive = archive
+        self.snapshot = snapshot
+        self.journal = journal
+        self.page_deadline = page_deadline
+        self.keyword_deadline = keyword_deadline
+        self._depths: Dict[str, Dict[str, Dict[str, int]]] = {}  # 実行中の検索計画の検索ページ数
+
+    def create_scraper(self, marketplace: str):
+        """
+        エンジンの設定（プール・レート制限・サーキットブレーカーなど）を共有するスクレイパーを作成
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+
+        Returns:
+            AmazonScraper または RakutenScraper
+        """
+        scraper_class = SCRAPER_CLASSES[marketplace]
+        return scraper_class(
+            headless=self.headless,
+            pool=self.pool,
+            http_fetcher=self.http_fetcher,
+            rate_limiter=self.rate_limiter,
+            extraction_mode=self.extraction_mode,
+            page_ready_timeout=self.page_ready_timeout,
+            circuit_breaker=self.circuit_breakers.get(marketplace),
+            concurrency=self.concurrency.get(marketplace),
+            prefetch_pages=self.prefetch_pages,
+            archive=self.archive,
+            snapshot=self.snapshot,
+            page_deadline=self.page_deadline,
+            keyword_deadline=self.keyword_deadline
+        )
+
+    def _search_keyword(self, marketplace: str, keyword: str, targets: Iterable[str]) -> Dict[str, Optional[int]]:
+        """
+        1キーワード分の検索を実行（ワーカースレッドで呼ばれる）
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            keyword: 検索キーワード
+            targets: 検索対象のASINまたは楽天商品ID
+
+        Returns:
+            検索対象と順位の辞書
+        """
+        started_at = time.monotonic()
+        with self.create_scraper(marketplace) as scraper:
+            target_depths = self._depths.get(marketplace, {}).get(keyword)
+            ranks = scraper.search_targets_rank(keyword, targets, self.max_pages, target_depths)
+        if self.journal:
+            self.journal.record(marketplace, keyword, ranks, time.monotonic() - started_at)
+        return ranks
+
+    async def run_async(self, plan: SearchPlan) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+        """
+        検索計画の全キーワードをマーケットプレイスごとのレーンで並行して検索
+
+        Args:
+            plan: 検索計画
+
+        Returns:
+            マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+        """
+        lane_jobs = {marketplace: plan.targets(marketplace) for marketplace in SCRAPER_CLASSES}
+        self._depths = {marketplace: plan.depths(marketplace) for marketplace in SCRAPER_CLASSES}
+        lanes = [
+            Lane(marketplace, self.lane_workers.get(marketplace, 1), self._search_keyword,
+                 self.circuit_breakers.get(marketplace), self.concurrency.get(marketplace))
+            for marketplace in lane_jobs
+        ]
+
+        # 各レーンは独立して進むため、一方が遅くてももう一方は待たされない
+        lane_results = await asyncio.gather(*[lane.run(lane_jobs[lane.marketplace]) for lane in lanes])
+        return {lane.marketplace: results for lane, results in zip(lanes, lane_results)}
+
+    def run(self, plan: SearchPlan) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+        """
+        検索計画の全キーワードを並行して検索（同期呼び出し用）
+
+        Args:
+            plan: 検索計画
+
+        Returns:
+            マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+        """
+        return asyncio.run(self.run_async(plan))
@@ -0,0 +1,516 @@
+"""
+検索結果をスクレイピングするクラスの共通部分
+
+取得（HTTP・ブラウザの切り替え、レート制限、サーキットブレーカー、同時実行数、ウォッチドッグ）、
+先読み、アーカイブ・スナップショットへの記録、1キーワード分の順位の集計はマーケットプレイスに
+よらず同じため、ここにまとめる。各マーケットプレイスのスクレイパーは検索URL・ページの目印・
+ブラウザ内抽出スクリプト・順位に数える商品の判定だけを持つ。
+"""
+
+import threading
+import time
+from typing import Optional, List, Dict, Iterable, Tuple
+from loguru import logger
+
+from src.browser_pool import PagePool, create_browser_page
+from src.circuit_breaker import CircuitBreaker
+from src.concurrency import AdaptiveConcurrency
+from src.http_fetcher import HttpFetcher
+from src.prefetch import PagePrefetcher
+from src.rank_state import RankState
+from src.page_handle import PageHandle
+from src.page_readiness import PageMarkers, PageState, wait_for_page
+from src.rate_limiter import RateLimiter, default_rate_limiter
+from src.serp_archive import SerpArchive
+from src.serp_snapshot import SerpSnapshot
+from src.watchdog import default_watchdog
+from src.serp_parser import ParsedPage, RawPage, SerpItem, parse_raw_page
+
+
+class BaseScraper:
+    """検索結果をスクレイピングするクラスの基底クラス"""
+
+    marketplace = ''  # マーケットプレイス名（amazon / rakuten）
+    display_name = ''  # ログに表示するマーケットプレイスの名前
+    base_url = ''
+    page_markers: PageMarkers  # ページの状態を判定するための目印
+    extract_script = ''  # ブラウザ内抽出モードで実行するスクリプト
+    id_label = 'ID'  # ログに表示する商品IDの名前
+    rank_label = '順位'  # ログに表示する順位の名前
+
+    def __init__(self, headless: bool = True, pool: Optional[PagePool] = None,
+                 http_fetcher: Optional[HttpFetcher] = None, rate_limiter: Optional[RateLimiter] = None,
+                 extraction_mode: str = 'html', page_ready_timeout: float = 10,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None, prefetch_pages: int = 0,
+                 browser_backend: str = 'selenium', archive: Optional[SerpArchive] = None,
+                 snapshot: Optional[SerpSnapshot] = None, page_deadline: float = 0, keyword_deadline: float = 0):
+        """
+        Args:
+            headless: ヘッドレスモードで実行するか
+            pool: ブラウザ・タブのプール（指定した場合はプールからページを借りる）
+            http_fetcher: HTTPクライアント（指定した場合はHTTP取得を優先し、失敗時のみブラウザを使う）
+            rate_limiter: ホストごとのレートリミッター（Noneの場合は設定値のレートを共有）
+            extraction_mode: ブラウザでの結果抽出方法（html: page_sourceを解析 / js: ページ内で抽出）
+            page_ready_timeout: ページの準備完了を待つ最大秒数
+            circuit_breaker: ブロック検知時にリクエストを止めるサーキットブレーカー
+            concurrency: ページ取得の応答時間・エラーを伝える同時実行数コントローラー
+            prefetch_pages: 現在のページを解析している間にHTTPで先読みしておくページ数（0で先読みしない）
+            browser_backend: プールを使わない場合に起動するブラウザのバックエンド（selenium / playwright）
+            archive: 取得したページを保存するSERPアーカイブ
+            snapshot: 検索で確認した全商品を記録するSERPスナップショット
+            page_deadline: ブラウザでの1ページの取得の期限（秒、過ぎたらブラウザを強制終了する、0で無効）
+            keyword_deadline: 1キーワードの検索の期限（秒、過ぎたら残りのターゲットを「不明」にする、0で無効）
+        """
+        self.headless = headless
+        self.pool = pool
+        self.http_fetcher = http_fetcher
+        self.rate_limiter = rate_limiter or default_rate_limiter()
+        self.extraction_mode = extraction_mode
+        self.page_ready_timeout = page_ready_timeout
+        self.circuit_breaker = circuit_breaker
+        self.concurrency = concurrency
+        self.prefetch_pages = prefetch_pages
+        self.browser_backend = browser_backend
+        self.archive = archive
+        self.snapshot = snapshot
+        self.page_deadline = page_deadline
+        self.keyword_deadline = keyword_deadline
+        self.watchdog = default_watchdog()
+        self._keyword_deadline_at: Optional[float] = None  # 検索中のキーワードの期限（time.monotonic()）
+        self.browser_page: Optional[PageHandle] = None  # ブラウザで取得する場合のページ
+
+    def _search_url(self, keyword: str, page: int) -> str:
+        """
+        検索URLを構築（各マーケットプレイスのスクレイパーで実装する）
+
+        Args:
+            keyword: 検索キーワード
+            page: ページ番号
+
+        Returns:
+            検索URL
+        """
+        raise NotImplementedError
+
+    def counts_toward_rank(self, item: SerpItem) -> bool:
+        """
+        商品を順位に数えるか（既定では全ての商品を数える）
+
+        Args:
+            item: 検索結果の商品
+
+        Returns:
+            順位に数える場合True
+        """
+        return True
+
+    def _target_id(self, target: str) -> Optional[str]:
+        """
+        検索対象の指定（URLなど）から商品IDを取り出す（既定ではそのまま使う）
+
+        Args:
+            target: 検索対象の指定
+
+        Returns:
+            商品ID、取り出せない場合はNone
+        """
+        return target
+
+    def _open_page(self):
+        """ブラウザのページを用意（プールがあれば借りる）"""
+        if self.pool:
+            self.browser_page = self.pool.acquire_page()
+        else:
+            self.browser_page = create_browser_page(self.headless, self.browser_backend)
+
+    def _close_page(self):
+        """ブラウザのページを閉じる（プールから借りた場合は返却）"""
+        if self.browser_page:
+            if self.pool:
+                self.pool.release_page(self.browser_page)
+            else:
+                self.browser_page.close()
+            self.browser_page = None
+
+    def _ensure_page(self) -> float:
+        """
+        ブラウザのページが無ければ用意する
+
+        Returns:
+            プールのページの空きを待った秒数（ページの起動にかかった時間を含む）
+        """
+        if self.browser_page:
+            return 0.0
+        started_at = time.monotonic()
+        self._open_page()
+        return time.monotonic() - started_at
+
+    def _discard_page(self):
+        """強制終了したブラウザのページを手放す（プールに返すと作り直される）"""
+        try:
+            self._close_page()
+        except Exception as e:
+            logger.debug(f"強制終了したブラウザを手放す際のエラー: {e}")
+            self.browser_page = None
+
+    def _keyword_expired(self) -> bool:
+        """検索中のキーワードの期限を過ぎたか"""
+        return self._keyword_deadline_at is not None and time.monotonic() >= self._keyword_deadline_at
+
+    def _page_timeout(self) -> float:
+        """ブラウザでの1ページの取得の期限までの秒数（キーワードの期限が先に来る場合はそちら、0は期限なし）"""
+        timeout = self.page_deadline
+        if self._keyword_deadline_at is not None:
+            remaining = max(1.0, self._keyword_deadline_at - time.monotonic())
+            timeout = min(timeout, remaining) if timeout else remaining
+        return timeout
+
+    def _load_page(self, url: str):
+        """
+        ページを読み込む
+
+        Args:
+            url: 読み込むURL
+        """
+        self.browser_page.get(url)
+        if self.pool:
+            self.pool.record_page(self.browser_page)
+
+    def _fetch_page(self, url: str, http_only: bool = False, cancelled: Optional[threading.Event] = None,
+                    archive_key: Optional[Tuple[str, int]] = None) -> Tuple[str, Optional[ParsedPage]]:
+        """
+        検索結果ページを取得して解析（ブロック中は解除されるまで待ってから取得）
+
+        Args:
+            url: 取得するURL
+            http_only: HTTPでのみ取得し、ブラウザに切り替えない（先読み用）
+            cancelled: セットされていたらリクエストせずに戻る（先読み用）
+            archive_key: アーカイブに保存する場合の（キーワード, ページ番号）
+
+        Returns:
+            ページの状態（PageState）と、結果ありの場合はページの解析結果
+        """
+        state, raw_page = self.fetch_raw_page(url, http_only, cancelled, archive_key)
+        return state, parse_raw_page(self.marketplace, raw_page) if raw_page else None
+
+    def fetch_raw_page(self, url: str, http_only: bool = False, cancelled: Optional[threading.Event] = None,
+                       archive_key: Optional[Tuple[str, int]] = None) -> Tuple[str, Optional[RawPage]]:
+        """
+        検索結果ページを取得し、解析前のまま返す（ブロック中は解除されるまで待ってから取得）
+
+        Args:
+            url: 取得するURL
+            http_only: HTTPでのみ取得し、ブラウザに切り替えない（先読み用）
+            cancelled: セットされていたらリクエストせずに戻る（先読み用）
+            archive_key: アーカイブに保存する場合の（キーワード, ページ番号）
+
+        Returns:
+            ページの状態（PageState）と、結果ありの場合は解析前のページ
+        """
+        if self.circuit_breaker and not self.circuit_breaker.acquire():
+            # ブロックが続いて諦めた場合はリクエストしない
+            return PageState.BLOCKED, None
+
+        state = PageState.TIMEOUT
+        waited = 0.0
+        started_at = time.monotonic()
+        try:
+            state, raw_page, waited = self._request_page(url, http_only, cancelled)
+        finally:
+            if state != PageState.CANCELLED:
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_result(state)
+                if self.concurrency:
+                    # レート制限・プールのページの空きを待った時間は応答時間に含めない
+                    self.concurrency.record_page(state, time.monotonic() - started_at - waited)
+
+        if self.archive and archive_key and raw_page is not None:
+            self._archive_page(archive_key, raw_page)
+        return state, raw_page
+
+    def _archive_page(self, archive_key: Tuple[str, int], raw_page: RawPage):
+        """取得したページをアーカイブに保存（失敗しても検索は続ける）"""
+        keyword, page = archive_key
+        try:
+            self.archive.store(self.marketplace, keyword, page, raw_page)
+        except Exception as e:
+            logger.warning(f"SERPアーカイブへの保存に失敗しました: キーワード='{keyword}', ページ={page} - {e}")
+
+    def _prefetch_page(self, keyword: str, page: int, cancelled: threading.Event) -> Tuple[str, Optional[ParsedPage]]:
+        """先読み用にHTTPでのみページを取得（ワーカースレッドで呼ばれる）"""
+        return self._fetch_page(self._search_url(keyword, page), http_only=True, cancelled=cancelled, archive_key=(keyword, page))
+
+    def _request_page(self, url: str, http_only: bool = False,
+                      cancelled: Optional[threading.Event] = None) -> Tuple[str, Optional[RawPage], float]:
+        """
+        検索結果ページを1回取得
+
+        HTTPクライアントがあればまずHTTPで取得し、検索結果が含まれない場合のみ
+        ブラウザで読み込み直す。HTTPで該当なし・ブロック（ロボット確認・429）と
+        判定されても、ブラウザでは結果が表示されることが多いため判定には使わない。
+        HTTPの結果判定は目印の文字列を探すだけなので、結果ありと判定されても
+        商品も次のページへのリンクも解析できないページは結果なしとして扱う。
+        サーキットブレーカーに伝わるのはブラウザで確認した状態だけになる。
+        ブラウザ内抽出モードではページ内のJavaScriptで結果カードだけを取り出し、
+        page_sourceの転送とPython側の解析を省く。
+
+        Args:
+            url: 取得するURL
+            http_only: HTTPでのみ取得し、ブラウザに切り替えない
+            cancelled: セットされていたらリクエストせずに戻る
+
+        Returns:
+            ページの状態（PageState）、結果ありの場合は解析前のページ、レート制限・ページの空きを待った秒数
+        """
+        waited = 0.0
+        if self.http_fetcher:
+            # ホストごとのレート制限に従って待つ（先読みは取り消されたらトークンを使わずに戻る）
+            waited += self.rate_limiter.acquire(url, cancelled)
+            if cancelled is not None and cancelled.is_set():
+                return PageState.CANCELLED, None, waited
+            state, page_source = self.http_fetcher.fetch(url, self.page_markers)
+            if state == PageState.READY:
+                raw_page = RawPage('html', page_source)
+                parsed_page = parse_raw_page(self.marketplace, raw_page)
+                if parsed_page.items or parsed_page.has_next:
+                    return state, raw_page, waited
+                # 目印の文字列はあっても結果を1件も解析できないページで「圏外」と確定しない
+                state = PageState.TIMEOUT
+            if http_only:
+                # 先読みでは判定できなかったものとして扱い、呼び出し側でブラウザを使って取得し直す
+                return PageState.TIMEOUT, None, waited
+            logger.info(f"HTTP取得で検索結果が得られないため（{state}）、ブラウザで取得します")
+
+        waited += self.rate_limiter.acquire(url)
+        waited += self._ensure_page()
+        state, raw_page, expired = self._browser_fetch(url)
+        if expired and raw_page is None and not self._keyword_expired():
+            # 止めたページ・強制終了したブラウザの代わりに、新しいページで1回だけ取得し直す
+            logger.warning(f"新しいブラウザで取得し直します: {url}")
+            waited += self.rate_limiter.acquire(url)
+            waited += self._ensure_page()
+            state, raw_page, _ = self._browser_fetch(url)
+        return state, raw_page, waited
+
+    def _browser_fetch(self, url: str) -> Tuple[str, Optional[RawPage], bool]:
+        """
+        ブラウザでページを読み込んで取り出す
+
+        期限（page_deadline）を過ぎても戻らない場合は、ウォッチドッグがページ（タブ・ブラウザ）を強制的に止める。
+        止まっていた呼び出しはエラーで戻るため、そのページはタイムアウトとして扱う。
+        同じブラウザの別のタブが期限を過ぎてブラウザごと強制終了された場合も、このページの
+        取得はエラーで戻るため、同じく取得し直す対象として扱う。
+
+        Args:
+            url: 取得するURL
+
+        Returns:
+            ページの状態（PageState）、結果ありの場合は解析前のページ、ページを強制的に止めたか
+        """
+        self._ensure_page()
+
+        browser_page = self.browser_page
+        deadline = self.watchdog.start(self._page_timeout(), browser_page.kill, f"{self.display_name}のページ取得 {url}")
+        try:
+            started_at = time.monotonic()
+            self._load_page(url)
+
+            # 結果・該当なし・ブロックのいずれかを検知した時点で戻る
+            readiness = wait_for_page(self.browser_page, self.page_markers, self.page_ready_timeout, started_at=started_at)
+            logger.info(f"ページ判定: {readiness.state}（{readiness.elapsed:.2f}秒）")
+
+            state, raw_page = readiness.state, None
+            if state == PageState.READY and self.extraction_mode == 'js':
+                raw_page = RawPage('script', self.browser_page.execute_script(self.extract_script))
+            elif state == PageState.READY:
+                raw_page = RawPage('html', self.browser_page.page_source)
+        except Exception:
+            if not (deadline.expired or browser_page.killed):
+                raise
+            state, raw_page = PageState.TIMEOUT, None
+        finally:
+            deadline.cancel()
+
+        stopped = deadline.expired or browser_page.killed
+        if stopped:
+            # 止めたページ・強制終了したブラウザは作り直させる（直前に取り出せていたページはそのまま使う）
+            self._discard_page()
+        return state, raw_page, stopped
+
+    def fetch_search_page(self, keyword: str, page: int) -> Tuple[str, Optional[RawPage]]:
+        """
+        検索結果の指定ページを取得し、解析前のまま返す（取得と解析を分けるパイプライン用）
+
+        Args:
+            keyword: 検索キーワード
+            page: ページ番号
+
+        Returns:
+            ページの状態（PageState）と、結果ありの場合は解析前のページ
+        """
+        logger.info(f"{self.display_name}検索: キーワード='{keyword}', ページ={page}")
+        return self.fetch_raw_page(self._search_url(keyword, page), archive_key=(keyword, page))
+
+    def new_rank_state(self, keyword: str, target_ids: Iterable[str], max_pages: int = 5,
+                       target_depths: Optional[Dict[str, int]] = None) -> RankState:
+        """
+        1キーワード分の順位の集計状態を作成
+
+        Args:
+            keyword: 検索キーワード
+            target_ids: 検索対象の商品IDのリスト
+            max_pages: 最大検索ページ数
+            target_depths: ターゲットごとの検索ページ数（指定のないターゲットはmax_pages）
+
+        Returns:
+            順位の集計状態
+        """
+        return RankState(keyword, target_ids, max_pages, target_depths, id_label=self.id_label, rank_label=self.rank_label,
+                         record_items=self.snapshot is not None)
+
+    def record_snapshot(self, rank_state: RankState):
+        """
+        検索し終えたキーワードの商品をSERPスナップショットに記録（スナップショットが無い場合は何もしない）
+
+        Args:
+            rank_state: 検索し終えたキーワードの状態
+        """
+        if self.snapshot:
+            self.snapshot.add(self.marketplace, rank_state)
+
+    def search_product_rank(self, keyword: str, target: str, max_pages: int = 5) -> Optional[int]:
+        """
+        指定したキーワードで検索し、ターゲット商品の順位を取得
+
+        Args:
+            keyword: 検索キーワード
+            target: 検索対象の商品（商品IDまたはマーケットプレイスが受け付ける指定）
+            max_pages: 最大検索ページ数
+
+        Returns:
+            順位（1から始まる）、見つからない場合はNone
+        """
+        target_id = self._target_id(target)
+        if not target_id:
+            logger.error(f"商品IDを抽出できませんでした: {target}")
+            return None
+
+        ranks = self.search_targets_rank(keyword, [target_id], max_pages)
+        return ranks.get(target_id)
+
+    def search_targets_rank(self, keyword: str, target_ids: Iterable[str], max_pages: int = 5,
+                            target_depths: Optional[Dict[str, int]] = None) -> Dict[str, Optional[int]]:
+        """
+        指定したキーワードで1回だけ検索結果をたどり、複数商品の順位をまとめて取得
+
+        全てのターゲットが見つかった時点、または残りのターゲットが全て
+        検索ページ数の上限に達した時点で終了する。
+
+        Args:
+            keyword: 検索キーワード
+            target_ids: 検索対象の商品IDのリスト
+            max_pages: 最大検索ページ数
+            target_depths: ターゲットごとの検索ページ数（指定のないターゲットはmax_pages）
+
+        Returns:
+            商品IDと順位の辞書（見つからない場合はNone）
+        """
+        rank_state = self.new_rank_state(keyword, target_ids, max_pages, target_depths)
+
+        if rank_state.done:
+            return rank_state.ranks
+
+        self._keyword_deadline_at = time.monotonic() + self.keyword_deadline if self.keyword_deadline else None
+        try:
+            page_limit = rank_state.page_limit
+
+            # 先読みはHTTP取得が使える場合のみ（ブラウザは1キーワードにつき1つ）
+            prefetch_window = self.prefetch_pages if self.http_fetcher else 0
+            prefetch_func = lambda page, cancelled: self._prefetch_page(keyword, page, cancelled)
+            with PagePrefetcher(prefetch_func, page_limit, prefetch_window) as prefetcher:
+                for page in range(1, page_limit + 1):
+                    if self._keyword_expired():
+                        # 残りのターゲットは「不明」になり、--resume や常駐モードで検索し直す
+                        logger.warning(f"{self.display_name}検索の期限（{self.keyword_deadline:.0f}秒）を過ぎたため打ち切ります: キーワード='{keyword}'")
+                        rank_state.add_page(page, PageState.TIMEOUT, None, self.counts_toward_rank)
+                        break
+                    logger.info(f"{self.display_name}検索: キーワード='{keyword}', ページ={page}/{page_limit}")
+
+                    # 次のページの先読みを始めてから、このページを取得して（商品ID, 広告か, 表示位置）を得る
+                    prefetcher.schedule(page)
+                    result = prefetcher.take(page, self._page_timeout())
+                    if result is None:
+                        # 先読みしていない・先読みで判定できなかった・期限までに届かなかったページはブラウザも使って取得する
+                        result = self._fetch_page(self._search_url(keyword, page), archive_key=(keyword, page))
+                    state, parsed_page = result
+
+                    rank_state.add_page(page, state, parsed_page, self.counts_toward_rank)
+                    if rank_state.done:
+                        break
+
+            ranks = rank_state.finish()
+            self.record_snapshot(rank_state)
+            return ranks
+
+        except Exception as e:
+            logger.error(f"{self.display_name}検索中のエラー: {e}")
+            return rank_state.fail()
+
+        finally:
+            self._keyword_deadline_at = None
+
+    def search_multiple_keywords(self, keywords: List[str], target: str, max_pages: int = 5) -> Dict[str, Optional[int]]:
+        """
+        複数のキーワードで検索し、それぞれの順位を取得
+
+        Args:
+            keywords: 検索キーワードのリスト
+            target: 検索対象の商品（商品IDまたはマーケットプレイスが受け付ける指定）
+            max_pages: 最大検索ページ数
+
+        Returns:
+            キーワードと順位の辞書
+        """
+        results = {}
+
+        try:
+            for keyword in keywords:
+                rank = self.search_product_rank(keyword, target, max_pages)
+                results[keyword] = rank
+
+        finally:
+            self._close_page()
+
+        return results
+
+    def search_keywords_targets(self, keyword_targets: Dict[str, Iterable[str]], max_pages: int = 5) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        キーワードごとの検索対象の商品IDをまとめて検索し、それぞれの順位を取得
+
+        Args:
+            keyword_targets: キーワードと検索対象の商品IDの辞書
+            max_pages: 最大検索ページ数
+
+        Returns:
+            キーワードごとの商品IDと順位の辞書
+        """
+        results = {}
+        keywords = list(keyword_targets)
+
+        try:
+            for keyword in keywords:
+                results[keyword] = self.search_targets_rank(keyword, keyword_targets[keyword], max_pages)
+
+        finally:
+            self._close_page()
+
+        return results
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self._close_page()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+ブラウザ複数起動モード・タブ共有モード・Playwrightバックエンドのベンチマーク
+
+同じ検索結果ページを同じ同時実行数で読み込み、1分あたりのページ数・1ページの読み込み秒数と
+ブラウザのメモリ使用量（RSS）を比較する。レート制限を有効にすると1分あたりのページ数は
+レートで頭打ちになりモードの差が出ないため、既定では無効にしている。
+
+使い方:
+    python src/benchmark_browsers.py --concurrency 4 --pages 40
+    python src/benchmark_browsers.py --mode tabs --site rakuten --keywords 化粧水,シャンプー
+    python src/benchmark_browsers.py --mode all --output data/benchmark_results.md
+"""
+
+import sys
+import argparse
+import platform
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from urllib.parse import quote_plus
+from loguru import logger
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import *
+from src.browser_pool import create_page_pool
+from src.page_readiness import PageState, wait_for_page, AMAZON_MARKERS, RAKUTEN_MARKERS
+from src.rate_limiter import RateLimiter, create_rate_limiter
+
+
+SITES = {
+    'amazon': (lambda keyword, page: f"https://www.amazon.co.jp/s?k={quote_plus(keyword)}&page={page}", AMAZON_MARKERS),
+    'rakuten': (lambda keyword, page: f"https://search.rakuten.co.jp/search/mall/{quote_plus(keyword)}/p{page}", RAKUTEN_MARKERS),
+}
+
+
+def build_urls(site: str, keywords: List[str], pages: int) -> List[str]:
+    """
+    ベンチマークで読み込む検索URLを作成（キーワードとページ番号を順に回す）
+
+    Args:
+        site: amazon / rakuten
+        keywords: 検索キーワード
+        pages: 読み込むページ数の合計
+
+    Returns:
+        検索URLのリスト
+    """
+    url_func = SITES[site][0]
+    return [url_func(keywords[i % len(keywords)], i // len(keywords) % MAX_SEARCH_PAGES + 1) for i in range(pages)]
+
+
+def run_benchmark(mode: str, site: str, urls: List[str], concurrency: int,
+                  rate_limiter: Optional[RateLimiter], backend: str = 'selenium') -> Dict[str, Any]:
+    """
+    1つのモードでURLを全て読み込み、速度とメモリ使用量を計測
+
+    Args:
+        mode: browsers / tabs / playwright
+        site: amazon / rakuten
+        urls: 読み込むURL
+        concurrency: 同時に読み込むページ数（ブラウザ数またはタブ数）
+        rate_limiter: レートリミッター（Noneの場合は制限しない）
+        backend: selenium / playwright
+
+    Returns:
+        計測結果
+    """
+    markers = SITES[site][1]
+    jobs = queue.Queue()
+    for url in urls:
+        jobs.put(url)
+    states: Dict[str, int] = {}
+    load_times: List[float] = []
+    states_lock = threading.Lock()
+    rss_samples: List[float] = []
+    finished = threading.Event()
+
+    logger.info(f"[{mode}] 同時実行数 {concurrency} で {len(urls)} ページを読み込みます")
+    with create_page_pool(mode=mode, size=concurrency, headless=HEADLESS_MODE, max_pages=0, max_rss_mb=0,
+                          backend=backend) as pool:
+        def sample_rss():
+            while not finished.wait(0.5):
+                rss_mb = pool.rss_mb()
+                if rss_mb is not None:
+                    rss_samples.append(rss_mb)
+
+        def worker():
+            while True:
+                try:
+                    url = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                # レート制限の待ちはページを借りる前に済ませ、待っている間にブラウザを占有しない
+                if rate_limiter:
+                    rate_limiter.acquire(url)
+                page = pool.acquire_page()
+                started_at = time.monotonic()
+                try:
+                    page.get(url)
+                    pool.record_page(page)
+                    state = wait_for_page(page, markers, PAGE_READY_TIMEOUT, started_at=started_at).state
+                except Exception as e:
+                    logger.debug(f"[{mode}] 読み込みエラー: {url} - {e}")
+                    state = 'error'
+                finally:
+                    pool.release_page(page)
+                load_time = time.monotonic() - started_at
+                with states_lock:
+                    states[state] = states.get(state, 0) + 1
+                    load_times.append(load_time)
+
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+        started_at = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started_at
+        finished.set()
+        sampler.join()
+
+    return {
+        'mode': mode,
+        'pages': len(urls),
+        'ready': states.get(PageState.READY, 0),
+        'states': states,
+        'elapsed': elapsed,
+        'pages_per_minute': len(urls) / elapsed * 60 if elapsed else 0.0,
+        'avg_load_seconds': sum(load_times) / len(load_times) if load_times else 0.0,
+        'peak_rss_mb': max(rss_samples) if rss_samples else None,
+        'avg_rss_mb': sum(rss_samples) / len(rss_samples) if rss_samples else None,
+    }
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    """
+    計測結果を表にする
+
+    Args:
+        results: run_benchmarkの結果のリスト
+
+    Returns:
+        表形式の文字列
+    """
+    def mb(value):
+        return f"{value:.0f}MB" if value is not None else '-'
+
+    lines = [
+        f"{'モード':<10}{'ページ':>8}{'結果あり':>8}{'秒':>8}{'ページ/分':>10}{'読込秒/件':>10}{'最大RSS':>10}{'平均RSS':>10}",
+    ]
+    for result in results:
+        lines.append(
+            f"{result['mode']:<10}{result['pages']:>8}{result['ready']:>8}{result['elapsed']:>8.1f}"
+            f"{result['pages_per_minute']:>10.1f}{result['avg_load_seconds']:>10.2f}"
+            f"{mb(result['peak_rss_mb']):>10}{mb(result['avg_rss_mb']):>10}"
+        )
+    return '\n'.join(lines)
+
+
+def format_markdown(results: List[Dict[str, Any]], args: argparse.Namespace) -> str:
+    """
+    計測結果を記録用のMarkdownの表にする（計測した条件も添える）
+
+    Args:
+        results: run_benchmarkの結果のリスト
+        args: コマンドライン引数
+
+    Returns:
+        Markdownの文字列
+    """
+    def mb(value):
+        return f"{value:.0f}" if value is not None else '-'
+
+    rate = 'あり' if args.rate_limit else 'なし'
+    lines = [
+        f"### {datetime.now().strftime('%Y-%m-%d %H:%M')} {platform.node()}（{platform.system()} {platform.machine()}）",
+        '',
+        f"サイト: {args.site} / 同時実行数: {args.concurrency} / ページ数: {args.pages} / レート制限: {rate} / "
+        f"ヘッドレス: {HEADLESS_MODE} / リソースブロック: {BLOCK_RESOURCES}",
+        '',
+        '| モード | ページ | 結果あり | 秒 | ページ/分 | 読込秒/件 | 最大RSS(MB) | 平均RSS(MB) |',
+        '|---|---:|---:|---:|---:|---:|---:|---:|',
+    ]
+    for result in results:
+        lines.append(
+            f"| {result['mode']} | {result['pages']} | {result['ready']} | {result['elapsed']:.1f} "
+            f"| {result['pages_per_minute']:.1f} | {result['avg_load_seconds']:.2f} "
+            f"| {mb(result['peak_rss_mb'])} | {mb(result['avg_rss_mb'])} |"
+        )
+    return '\n'.join(lines) + '\n\n'
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析
+
+    Args:
+        argv: 引数のリスト（Noneの場合はsys.argv）
+
+    Returns:
+        解析結果
+    """
+    parser = argparse.ArgumentParser(description='ブラウザ複数起動モードとタブ共有モードのベンチマーク')
+    parser.add_argument('--mode', choices=['browsers', 'tabs', 'playwright', 'both', 'all'], default='both',
+                        help='計測するモード（both: browsers と tabs / all: さらに playwright）')
+    parser.add_argument('--site', choices=list(SITES), default='amazon', help='読み込む検索サイト')
+    parser.add_argument('--keywords', default='化粧水,シャンプー,プロテイン,ノートパソコン', help='検索キーワード（カンマ区切り）')
+    parser.add_argument('--pages', type=int, default=40, help='モードごとに読み込むページ数')
+    parser.add_argument('--concurrency', type=int, default=BROWSER_POOL_SIZE, help='ブラウザ数またはタブ数')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='実際の検索と同じレート制限に従う（1分あたりのページ数はレートで頭打ちになる）')
+    parser.add_argument('--output', help='計測結果をMarkdownの表として追記するファイル')
+    return parser.parse_args(argv)
+
+
+def main():
+    """ベンチマークを実行して結果を表示"""
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stdout, level=LOG_LEVEL, format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | <cyan>{message}</cyan>")
+
+    keywords = [keyword.strip() for keyword in args.keywords.split(',') if keyword.strip()]
+    urls = build_urls(args.site, keywords, args.pages)
+    modes = {'both': ['browsers', 'tabs'], 'all': ['browsers', 'tabs', 'playwright']}.get(args.mode, [args.mode])
+
+    results = []
+    for mode in modes:
+        # モードごとにレートリミッターを作り直し、前のモードの待ち時間を持ち越さない
+        rate_limiter = create_rate_limiter() if args.rate_limit else None
+        backend = 'playwright' if mode == 'playwright' else 'selenium'
+        results.append(run_benchmark(mode, args.site, urls, args.concurrency, rate_limiter, backend))
+
+    print(format_results(results))
+    for result in results:
+        print(f"{result['mode']}: {result['states']}")
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'a', encoding='utf-8') as f:
+            f.write(format_markdown(results, args))
+        logger.info(f"計測結果を追記しました: {output}")
+
+
+if __name__ == "__main__":
+    main()
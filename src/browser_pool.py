@@ -0,0 +1,631 @@
+"""
+Chromeブラウザを使い回すためのドライバープール
+
+BrowserPool はブラウザを複数起動して1つずつ貸し出し、TabPool は1つのブラウザの
+タブを貸し出す。どちらもページハンドル（src.page_handle）として貸し出す。
+Playwrightバックエンドのプールは src.playwright_backend にある。
+"""
+
+import queue
+import threading
+from typing import Optional, Dict, Union
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from loguru import logger
+
+from src.config import CHROME_DRIVER_PATH, USER_AGENT, BLOCK_RESOURCES, PAGE_LOAD_STRATEGY, PAGE_LOAD_TIMEOUT
+from src.page_handle import NEW_SESSION_POPEN_KW, PageHandle, DriverPage, SharedDriver, TabPage
+
+try:
+    import psutil
+except ImportError:  # psutilが無い場合はRSSによる再起動を行わない
+    psutil = None
+
+
+# リソースブロックのプロファイル（順位の取得に必要なのは結果カードのマークアップのみ）
+_MEDIA_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm',
+]
+_THIRD_PARTY_PATTERNS = [
+    '*doubleclick.net*', '*googlesyndication.com*', '*google-analytics.com*', '*googletagmanager.com*',
+    '*amazon-adsystem.com*', '*criteo.com*', '*criteo.net*', '*facebook.net*', '*rat.rakuten.co.jp*',
+]
+BLOCK_PROFILES = {
+    'none': [],
+    'media': _MEDIA_PATTERNS,
+    'aggressive': _MEDIA_PATTERNS + ['*.css'] + _THIRD_PARTY_PATTERNS,
+}
+
+
+def create_chrome_driver(
+    headless: bool = True,
+    block_profile: str = BLOCK_RESOURCES,
+    page_load_strategy: str = PAGE_LOAD_STRATEGY
+) -> webdriver.Chrome:
+    """
+    スクレイピング用のChromeドライバーを起動
+
+    Args:
+        headless: ヘッドレスモードで実行するか
+        block_profile: 読み込みをブロックするリソースのプロファイル（none / media / aggressive）
+        page_load_strategy: ページ読み込みの待ち方（normal / eager / none）
+
+    Returns:
+        Chromeドライバー
+    """
+    if block_profile not in BLOCK_PROFILES:
+        logger.warning(f"不明なリソースブロック設定のため無効にします: {block_profile}")
+        block_profile = 'none'
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f'user-agent={USER_AGENT}')
+    chrome_options.page_load_strategy = page_load_strategy
+
+    if block_profile != 'none':
+        # 画像はCDPより手前のコンテンツ設定で止める
+        chrome_options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    # ChromeDriverを新しいプロセスグループで起動し、応答しないときにChrome本体までまとめて強制終了できるようにする
+    service = Service(CHROME_DRIVER_PATH or None, popen_kw=dict(NEW_SESSION_POPEN_KW))
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # 暗黙的待機は使わない（待機は page_readiness.wait_for_page に一本化）
+    # 読み込みが終わらないページで driver.get が戻らなくならないよう、タイムアウトを設定する
+    if PAGE_LOAD_TIMEOUT:
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+
+    apply_resource_blocking(driver, block_profile)
+    return driver
+
+
+def apply_resource_blocking(driver: webdriver.Chrome, block_profile: str = BLOCK_RESOURCES):
+    """
+    現在のウィンドウ（タブ）にCDPでリソースブロックを設定
+
+    CDPの設定はタブごとのため、新しいタブを開いたときにも呼ぶ。
+
+    Args:
+        driver: Chromeドライバー
+        block_profile: 読み込みをブロックするリソースのプロファイル（none / media / aggressive）
+    """
+    blocked_urls = BLOCK_PROFILES.get(block_profile, [])
+    if not blocked_urls:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+    except Exception as e:
+        logger.warning(f"CDPによるリソースブロックを設定できませんでした: {e}")
+
+
+def driver_rss_mb(driver: webdriver.Chrome) -> Optional[float]:
+    """
+    ChromeDriverとその子プロセス（Chrome本体）のメモリ使用量（MB）
+
+    Args:
+        driver: Chromeドライバー
+
+    Returns:
+        メモリ使用量、psutilが無い・取得できない場合はNone
+    """
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception as e:
+        logger.debug(f"メモリ使用量の取得エラー: {e}")
+        return None
+
+
+class BrowserPool:
+    """起動済みのChromeを貸し出し・返却するプール"""
+
+    def __init__(self, size: int = 2, headless: bool = True, max_pages: int = 200, max_rss_mb: int = 1024,
+                 prewarm: bool = True):
+        """
+        Args:
+            size: プールするブラウザ数
+            headless: ヘッドレスモードで実行するか
+            max_pages: ブラウザを再起動するまでの最大ページ数（0の場合は無制限）
+            max_rss_mb: ブラウザを再起動するメモリ使用量の上限（MB、0の場合は無制限）
+            prewarm: 開始時にブラウザを起動しておくか（Falseの場合は初回の貸し出し時に起動）
+        """
+        self.size = size
+        self.prewarm = prewarm
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.Queue()
+        self._page_counts: Dict[int, int] = {}
+        self._drivers: Dict[int, webdriver.Chrome] = {}  # 起動中の全ブラウザ（貸し出し中を含む）
+        self._starting = 0  # 起動枠を確保して起動中のブラウザ数
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if max_rss_mb and psutil is None:
+            logger.warning("psutilがインストールされていないため、メモリ使用量によるブラウザ再起動は無効です")
+
+    def start(self):
+        """ブラウザを事前に起動しておく"""
+        if not self.prewarm:
+            return
+        logger.info(f"ブラウザプールを起動します: {self.size} 個")
+        while self._reserve():
+            self._idle.put(self._create())
+
+    def _reserve(self) -> bool:
+        """
+        空きがあればブラウザ1つ分の起動枠を確保（確認と確保をロック内で行い、sizeを超えて起動しない）
+
+        Returns:
+            確保できた場合はTrue（続けて _create を呼ぶ）
+        """
+        with self._lock:
+            if len(self._page_counts) + self._starting >= self.size:
+                return False
+            self._starting += 1
+            return True
+
+    def _create(self) -> webdriver.Chrome:
+        """起動枠を確保済みのブラウザを起動してプールの管理対象に追加"""
+        try:
+            driver = create_chrome_driver(self.headless)
+        except Exception:
+            with self._lock:
+                self._starting -= 1
+            raise
+        with self._lock:
+            self._starting -= 1
+            self._page_counts[id(driver)] = 0
+            self._drivers[id(driver)] = driver
+        return driver
+
+    def _replace(self, driver: webdriver.Chrome) -> webdriver.Chrome:
+        """ブラウザを終了し、同じ起動枠で新しいブラウザを起動"""
+        with self._lock:
+            # 終了から起動までの間に他の貸し出しが枠を使わないよう、先に確保しておく
+            self._starting += 1
+        self._destroy(driver)
+        return self._create()
+
+    def _destroy(self, driver: webdriver.Chrome):
+        """ブラウザを終了して管理対象から外す"""
+        with self._lock:
+            self._page_counts.pop(id(driver), None)
+            self._drivers.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"ブラウザ終了時のエラー: {e}")
+
+    def _is_healthy(self, driver: webdriver.Chrome) -> bool:
+        """ブラウザが応答するか確認"""
+        try:
+            driver.execute_script('return 1')
+            return bool(driver.window_handles)
+        except Exception as e:
+            logger.warning(f"ブラウザが応答しません: {e}")
+            return False
+
+    def _needs_recycle(self, driver: webdriver.Chrome) -> bool:
+        """ページ数またはメモリ使用量が上限を超えたか判定"""
+        pages = self._page_counts.get(id(driver), 0)
+        if self.max_pages and pages >= self.max_pages:
+            logger.info(f"ブラウザを再起動します: ページ数={pages}")
+            return True
+
+        if self.max_rss_mb:
+            rss_mb = driver_rss_mb(driver)
+            if rss_mb is not None and rss_mb >= self.max_rss_mb:
+                logger.info(f"ブラウザを再起動します: メモリ使用量={rss_mb:.0f}MB")
+                return True
+
+        return False
+
+    def acquire(self, timeout: Optional[float] = None) -> webdriver.Chrome:
+        """
+        ブラウザを借りる
+
+        Args:
+            timeout: 空きブラウザを待つ最大秒数（Noneの場合は無制限）
+
+        Returns:
+            Chromeドライバー
+        """
+        if self._closed:
+            raise RuntimeError("ブラウザプールは終了しています")
+
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            # 再起動に失敗して減った分は、その場で起動して補充する
+            if self._reserve():
+                return self._create()
+            driver = self._idle.get(timeout=timeout)
+
+        if not self._is_healthy(driver):
+            driver = self._replace(driver)
+        return driver
+
+    def release(self, driver: webdriver.Chrome):
+        """
+        ブラウザを返す
+
+        Args:
+            driver: acquireで借りたChromeドライバー
+        """
+        if self._closed:
+            self._destroy(driver)
+            return
+
+        if self._needs_recycle(driver) or not self._is_healthy(driver):
+            try:
+                driver = self._replace(driver)
+            except Exception as e:
+                logger.error(f"ブラウザの再起動に失敗しました（次回の貸し出し時に再試行します）: {e}")
+                return
+
+        self._idle.put(driver)
+
+    def record_page(self, page: DriverPage):
+        """ブラウザで読み込んだページ数を記録"""
+        with self._lock:
+            if id(page.driver) in self._page_counts:
+                self._page_counts[id(page.driver)] += 1
+
+    def acquire_page(self, timeout: Optional[float] = None) -> DriverPage:
+        """
+        ブラウザを1つ占有するページハンドルを借りる
+
+        Args:
+            timeout: 空きブラウザを待つ最大秒数（Noneの場合は無制限）
+
+        Returns:
+            ページハンドル
+        """
+        return DriverPage(self.acquire(timeout))
+
+    def release_page(self, page: DriverPage):
+        """
+        acquire_pageで借りたページハンドルを返す
+
+        Args:
+            page: ページハンドル
+        """
+        self.release(page.driver)
+
+    def rss_mb(self) -> Optional[float]:
+        """起動中の全ブラウザのメモリ使用量の合計（MB、psutilが無い場合はNone）"""
+        with self._lock:
+            drivers = list(self._drivers.values())
+        sizes = [driver_rss_mb(driver) for driver in drivers]
+        if not sizes or any(size is None for size in sizes):
+            return None
+        return sum(sizes)
+
+    def close(self):
+        """プール内の全ブラウザを終了"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(driver)
+
+    def __enter__(self):
+        """with文のenter処理"""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
+
+
+class TabPool:
+    """1つのChromeのタブを貸し出し・返却するプール"""
+
+    def __init__(self, size: int = 4, headless: bool = True, max_pages: int = 200, max_rss_mb: int = 1024,
+                 prewarm: bool = True):
+        """
+        Args:
+            size: プールするタブ数
+            headless: ヘッドレスモードで実行するか
+            max_pages: タブを開き直すまでの最大ページ数（0の場合は無制限）
+            max_rss_mb: ブラウザを再起動するメモリ使用量の上限（MB、0の場合は無制限）
+            prewarm: 開始時にタブを開いておくか（Falseの場合は初回の貸し出し時に開く）
+        """
+        self.size = size
+        self.prewarm = prewarm
+        self.headless = headless
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._shared: Optional[SharedDriver] = None
+        self._idle = queue.Queue()
+        self._tabs: Dict[str, TabPage] = {}  # 開いている全タブ（貸し出し中を含む）
+        self._opening = 0  # 枠を確保して開いている途中のタブ数
+        self._lock = threading.Lock()
+        self._launched = threading.Condition(self._lock)  # ブラウザの起動の完了を待つ
+        self._launching = False  # ブラウザを起動している途中か
+        self._closed = False
+        self._recycle_pending = False  # 全タブが返却されたらブラウザを再起動する
+
+        if max_rss_mb and psutil is None:
+            logger.warning("psutilがインストールされていないため、メモリ使用量によるブラウザ再起動は無効です")
+
+    def start(self):
+        """タブを事前に開いておく"""
+        if not self.prewarm:
+            return
+        logger.info(f"タブプールを起動します: {self.size} タブ")
+        while self._reserve():
+            self._idle.put(self._open_tab())
+
+    def _reserve(self) -> bool:
+        """
+        空きがあればタブ1つ分の枠を確保（確認と確保をロック内で行い、sizeを超えて開かない）
+
+        Returns:
+            確保できた場合はTrue（続けて _open_tab を呼ぶ）
+        """
+        with self._lock:
+            if len(self._tabs) + self._opening >= self.size:
+                return False
+            self._opening += 1
+            return True
+
+    def _launch_browser(self) -> SharedDriver:
+        """タブを持つブラウザを起動"""
+        # タブの読み込みを並行させるため、driver.get の完了を待たない設定で起動する
+        return SharedDriver(create_chrome_driver(self.headless, page_load_strategy='none'))
+
+    def _browser(self) -> SharedDriver:
+        """
+        タブを持つブラウザを取得（未起動の場合は起動）
+
+        起動する権利だけをロック内で確保し、起動はロックの外で行う（起動中も返却・状態確認を止めない）。
+        同時に呼ばれた他のスレッドは起動が終わるのを待ち、同じブラウザを使う。
+        """
+        with self._lock:
+            while self._shared is None and self._launching:
+                self._launched.wait()
+            if self._shared is not None:
+                return self._shared
+            self._launching = True
+
+        try:
+            shared = self._launch_browser()
+        except Exception:
+            with self._lock:
+                self._launching = False
+                self._launched.notify_all()
+            raise
+        with self._lock:
+            self._shared = shared
+            self._launching = False
+            self._launched.notify_all()
+        if self._closed:
+            # 起動中にプールが終了した場合は起動したブラウザを残さない
+            self._restart_browser()
+            raise RuntimeError("タブプールは終了しています")
+        return shared
+
+    def _new_tab(self) -> TabPage:
+        """新しいタブを開く"""
+        shared = self._browser()
+        with shared.lock:
+            handle = shared.open_tab()
+            apply_resource_blocking(shared.driver)
+        return TabPage(shared, handle)
+
+    def _open_tab(self) -> TabPage:
+        """枠を確保済みの新しいタブを開いて管理対象に追加"""
+        try:
+            page = self._new_tab()
+        except Exception:
+            with self._lock:
+                self._opening -= 1
+            raise
+        with self._lock:
+            self._opening -= 1
+            self._tabs[page.handle] = page
+        return page
+
+    def _reopen_tab(self, page: TabPage) -> TabPage:
+        """タブを閉じ、同じ枠で新しいタブを開く"""
+        with self._lock:
+            # 閉じてから開くまでの間に他の貸し出しが枠を使わないよう、先に確保しておく
+            self._opening += 1
+        self._close_tab(page)
+        return self._open_tab()
+
+    def _close_tab(self, page: TabPage):
+        """タブを閉じて管理対象から外す"""
+        with self._lock:
+            self._tabs.pop(page.handle, None)
+        try:
+            page.close()
+        except Exception as e:
+            logger.debug(f"タブを閉じる際のエラー: {e}")
+
+    def _is_healthy(self, page: TabPage) -> bool:
+        """タブが応答するか確認"""
+        try:
+            page.execute_script('return 1')
+            return True
+        except Exception as e:
+            logger.warning(f"タブが応答しません: {e}")
+            return False
+
+    def _restart_browser(self):
+        """ブラウザを終了し、全タブを破棄（次の貸し出し時に起動し直す）"""
+        with self._lock:
+            shared, self._shared = self._shared, None
+            self._tabs.clear()
+            self._recycle_pending = False
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        if shared:
+            try:
+                shared.driver.quit()
+            except Exception as e:
+                logger.debug(f"ブラウザ終了時のエラー: {e}")
+
+    def _is_stale(self, page: TabPage) -> bool:
+        """ブラウザの再起動前に開いたタブか"""
+        with self._lock:
+            return page.shared is not self._shared or page.handle not in self._tabs
+
+    def acquire_page(self, timeout: Optional[float] = None) -> TabPage:
+        """
+        タブを借りる
+
+        Args:
+            timeout: 空きタブを待つ最大秒数（Noneの場合は無制限）
+
+        Returns:
+            ページハンドル
+        """
+        if self._closed:
+            raise RuntimeError("タブプールは終了しています")
+
+        try:
+            page = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve():
+                return self._open_tab()
+            page = self._idle.get(timeout=timeout)
+
+        if not self._is_healthy(page):
+            try:
+                page = self._reopen_tab(page)
+            except Exception as e:
+                # タブを開けない場合はブラウザごと落ちているため起動し直す
+                logger.warning(f"ブラウザを再起動します: {e}")
+                self._restart_browser()
+                if not self._reserve():
+                    raise
+                page = self._open_tab()
+        return page
+
+    def release_page(self, page: TabPage):
+        """
+        タブを返す
+
+        Args:
+            page: acquire_pageで借りたタブ
+        """
+        if self._closed or self._is_stale(page):
+            return
+
+        recycle = bool(self.max_pages and page.pages >= self.max_pages)
+        if recycle:
+            logger.info(f"タブを開き直します: ページ数={page.pages}")
+        if recycle or not self._is_healthy(page):
+            try:
+                page = self._reopen_tab(page)
+            except Exception as e:
+                logger.error(f"タブを開き直せませんでした（次回の貸し出し時に再試行します）: {e}")
+                return
+
+        if self.max_rss_mb and not self._recycle_pending:
+            rss_mb = self.rss_mb()
+            if rss_mb is not None and rss_mb >= self.max_rss_mb:
+                logger.info(f"全タブの返却後にブラウザを再起動します: メモリ使用量={rss_mb:.0f}MB")
+                self._recycle_pending = True
+
+        with self._lock:
+            all_idle = self._idle.qsize() + 1 >= len(self._tabs)
+        if self._recycle_pending and all_idle:
+            self._restart_browser()
+            return
+
+        self._idle.put(page)
+
+    def record_page(self, page: TabPage):
+        """タブで読み込んだページ数を記録"""
+        page.pages += 1
+
+    def rss_mb(self) -> Optional[float]:
+        """ブラウザのメモリ使用量（MB、psutilが無い場合はNone）"""
+        shared = self._shared
+        return driver_rss_mb(shared.driver) if shared else None
+
+    def close(self):
+        """ブラウザを終了"""
+        self._closed = True
+        self._restart_browser()
+
+    def __enter__(self):
+        """with文のenter処理"""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
+
+
+PagePool = Union[BrowserPool, TabPool]  # PlaywrightPool は TabPool のサブクラス
+
+
+def create_page_pool(mode: str = 'browsers', size: int = 4, headless: bool = True, max_pages: int = 200,
+                     max_rss_mb: int = 1024, prewarm: bool = True, backend: str = 'selenium') -> PagePool:
+    """
+    設定に応じたページハンドルのプールを作成
+
+    Args:
+        mode: browsers（ブラウザを複数起動）/ tabs（1つのブラウザのタブを使う）。Seleniumバックエンドのみ
+        size: 同時に貸し出せるページ数（ブラウザ数またはタブ数）
+        headless: ヘッドレスモードで実行するか
+        max_pages: ブラウザ・タブを作り直すまでの最大ページ数
+        max_rss_mb: ブラウザを再起動するメモリ使用量（MB）
+        prewarm: 開始時に起動しておくか
+        backend: selenium / playwright（playwrightは1つのブラウザのコンテキストを使う）
+
+    Returns:
+        BrowserPool、TabPool または PlaywrightPool
+    """
+    if backend == 'playwright':
+        from src.playwright_backend import PlaywrightPool
+        return PlaywrightPool(size=size, headless=headless, max_pages=max_pages, max_rss_mb=max_rss_mb, prewarm=prewarm)
+    if backend != 'selenium':
+        logger.warning(f"不明なブラウザバックエンドのため selenium を使います: {backend}")
+    if mode == 'tabs':
+        return TabPool(size=size, headless=headless, max_pages=max_pages, max_rss_mb=max_rss_mb, prewarm=prewarm)
+    if mode != 'browsers':
+        logger.warning(f"不明なブラウザモードのため browsers を使います: {mode}")
+    return BrowserPool(size=size, headless=headless, max_pages=max_pages, max_rss_mb=max_rss_mb, prewarm=prewarm)
+
+
+def create_browser_page(headless: bool = True, backend: str = 'selenium') -> PageHandle:
+    """
+    プールを使わずに専用のブラウザを起動し、そのページハンドルを返す（閉じるとブラウザも終了）
+
+    Args:
+        headless: ヘッドレスモードで実行するか
+        backend: selenium / playwright
+
+    Returns:
+        ページハンドル
+    """
+    if backend == 'playwright':
+        from src.playwright_backend import PlaywrightBrowser
+        return PlaywrightBrowser(headless).new_page(owns_browser=True)
+    if backend != 'selenium':
+        logger.warning(f"不明なブラウザバックエンドのため selenium を使います: {backend}")
+    return DriverPage(create_chrome_driver(headless))
@@ -0,0 +1,139 @@
+"""
+マーケットプレイスごとのサーキットブレーカー
+
+ブロックページ（ロボット確認・アクセス拒否）を検知したらそのマーケットプレイスへの
+リクエストを止め、待機時間を倍々に延ばしながら1件だけ試行して回復を確認する。
+"""
+
+import asyncio
+import threading
+import time
+from loguru import logger
+
+from src.page_readiness import PageState
+
+
+class CircuitBreaker:
+    """ブロック検知時にリクエストを一時停止するサーキットブレーカー"""
+
+    CLOSED = 'closed'  # 通常どおりリクエストする
+    OPEN = 'open'  # 待機中（リクエストしない）
+    HALF_OPEN = 'half_open'  # 回復確認のため1件だけ試行中
+
+    def __init__(self, name: str, base_cooldown: float = 60, max_cooldown: float = 600, max_trips: int = 3):
+        """
+        Args:
+            name: ログに表示する名前（マーケットプレイス名）
+            base_cooldown: 最初のブロック検知後の待機秒数
+            max_cooldown: 待機秒数の上限
+            max_trips: 連続してブロックされた場合に諦めるまでの回数
+        """
+        self.name = name
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_trips = max(1, max_trips)
+        self.state = self.CLOSED
+        self.trips = 0  # 連続でブロックを検知した回数
+        self.open_until = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def gave_up(self) -> bool:
+        """ブロックが続いたため、このマーケットプレイスへのリクエストを諦めたか"""
+        return self.trips >= self.max_trips
+
+    def _remaining(self) -> float:
+        """待機の残り秒数（ロック内で呼ぶ）"""
+        return max(0.0, self.open_until - time.monotonic())
+
+    def acquire(self) -> bool:
+        """
+        リクエストしてよいか確認（待機中は解除されるまでブロックする）
+
+        待機時間が過ぎた後は最初の1件だけを回復確認として通し、
+        その結果が出るまで他のリクエストは待たせる。
+
+        Returns:
+            リクエストしてよい場合はTrue、諦めた場合はFalse
+        """
+        with self._cond:
+            while True:
+                if self.gave_up:
+                    return False
+                if self.state == self.CLOSED:
+                    return True
+                if self.state == self.OPEN:
+                    remaining = self._remaining()
+                    if remaining <= 0:
+                        self.state = self.HALF_OPEN
+                        logger.info(f"[{self.name}] 回復確認のため1件だけリクエストします")
+                        return True
+                    self._cond.wait(remaining)
+                else:
+                    # 回復確認の結果を待つ
+                    self._cond.wait()
+
+    async def wait_async(self) -> bool:
+        """
+        待機中であれば解除されるまで非同期に待つ（スレッドやブラウザを占有しない）
+
+        Returns:
+            リクエストを続けてよい場合はTrue、諦めた場合はFalse
+        """
+        while True:
+            with self._cond:
+                if self.gave_up:
+                    return False
+                if self.state == self.CLOSED:
+                    return True
+                delay = self._remaining() if self.state == self.OPEN else 0.5
+                if self.state == self.OPEN and delay <= 0:
+                    return True
+            await asyncio.sleep(min(max(delay, 0.1), 5.0))
+
+    def record_success(self):
+        """結果ページ（該当なしを含む）を取得できたことを記録"""
+        with self._cond:
+            if self.state == self.OPEN:
+                # 待機に入る前に送っていたリクエストの結果では解除しない
+                return
+            if self.state == self.HALF_OPEN:
+                logger.info(f"[{self.name}] ブロックが解除されました。リクエストを再開します")
+            self.state = self.CLOSED
+            self.trips = 0
+            self._cond.notify_all()
+
+    def record_block(self):
+        """ブロックページを検知したことを記録"""
+        with self._cond:
+            if self.state == self.OPEN:
+                # 待機に入る前に送っていたリクエストの分は数えない
+                return
+            self.trips += 1
+            self.state = self.OPEN
+            if self.gave_up:
+                logger.error(f"[{self.name}] {self.trips} 回連続でブロックされたため、残りの検索を中止します")
+            else:
+                cooldown = min(self.base_cooldown * (2 ** (self.trips - 1)), self.max_cooldown)
+                self.open_until = time.monotonic() + cooldown
+                logger.warning(f"[{self.name}] ブロックを検知しました。{cooldown:.0f}秒間リクエストを停止します（{self.trips}/{self.max_trips}回目）")
+            self._cond.notify_all()
+
+    def record_result(self, state: str):
+        """
+        ページの判定結果を記録
+
+        Args:
+            state: PageStateのいずれか
+        """
+        if state == PageState.BLOCKED:
+            self.record_block()
+        elif state in (PageState.READY, PageState.NO_RESULTS):
+            self.record_success()
+        else:
+            with self._cond:
+                if self.state == self.HALF_OPEN:
+                    # 回復を確認できなかったので、次のリクエストで改めて確認する
+                    self.state = self.OPEN
+                    self.open_until = time.monotonic()
+                    self._cond.notify_all()
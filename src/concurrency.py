@@ -0,0 +1,120 @@
+"""
+応答時間とエラー率に応じて同時実行数を調整するAIMDコントローラー
+
+健全な間は同時実行数を1ずつ増やし（加算増加）、ブロック・エラー・応答の遅れを
+検知したら一気に減らす（乗算減少）。判断はページ取得の結果を一定件数ためるごとに行う。
+"""
+
+import asyncio
+import threading
+import time
+from typing import List, Tuple
+from loguru import logger
+
+from src.page_readiness import PageState
+
+
+class AdaptiveConcurrency:
+    """マーケットプレイスごとの同時実行数をAIMDで調整するクラス"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 1,
+        minimum: int = 1,
+        maximum: int = 8,
+        window: int = 10,
+        latency_target: float = 8.0,
+        error_threshold: float = 0.2,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Args:
+            name: ログに表示する名前（マーケットプレイス名）
+            initial: 開始時の同時実行数
+            minimum: 同時実行数の下限
+            maximum: 同時実行数の上限
+            window: 調整を判断するまでに集めるページ数
+            latency_target: これを超えたら減らす平均応答時間（秒）
+            error_threshold: これを超えたら減らすエラー率（タイムアウト・例外の割合）
+            decrease_factor: 減らすときに掛ける係数
+        """
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.window = max(1, window)
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self.active = 0
+        self._samples: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    async def acquire_async(self):
+        """同時実行数の枠が空くまで非同期に待ち、枠を1つ使う"""
+        while True:
+            with self._lock:
+                if self.active < self.limit:
+                    self.active += 1
+                    return
+            await asyncio.sleep(0.1)
+
+    def acquire(self):
+        """同時実行数の枠が空くまでスレッドを止めて待ち、枠を1つ使う"""
+        while True:
+            with self._lock:
+                if self.active < self.limit:
+                    self.active += 1
+                    return
+            time.sleep(0.1)
+
+    def release(self):
+        """使っていた枠を返す"""
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+    def record_page(self, state: str, elapsed: float):
+        """
+        ページ取得の結果を記録し、一定件数たまったら同時実行数を見直す
+
+        Args:
+            state: PageStateのいずれか（例外で終わった場合はTIMEOUT）
+            elapsed: リクエスト開始から判定までの秒数
+        """
+        with self._lock:
+            self._samples.append((state, elapsed))
+            # ブロックは待たずにすぐ減らす
+            if state == PageState.BLOCKED or len(self._samples) >= self.window:
+                self._adjust()
+
+    def _adjust(self):
+        """集めた結果から同時実行数を決める（ロック内で呼ぶ）"""
+        samples, self._samples = self._samples, []
+        blocked = sum(1 for state, _ in samples if state == PageState.BLOCKED)
+        errors = sum(1 for state, _ in samples if state == PageState.TIMEOUT)
+        latencies = [elapsed for state, elapsed in samples if state in (PageState.READY, PageState.NO_RESULTS)]
+        error_rate = errors / len(samples)
+        average = sum(latencies) / len(latencies) if latencies else 0.0
+
+        if blocked:
+            reason = f"ブロックを検知（{blocked}件）"
+        elif error_rate > self.error_threshold:
+            reason = f"エラー率 {error_rate:.0%} が上限 {self.error_threshold:.0%} を超過"
+        elif average > self.latency_target:
+            reason = f"平均応答 {average:.1f}秒 が目標 {self.latency_target:.1f}秒 を超過"
+        else:
+            if self.limit < self.maximum:
+                self._set_limit(self.limit + 1, f"健全（平均応答 {average:.1f}秒, エラー率 {error_rate:.0%}）")
+            return
+
+        self._set_limit(max(self.minimum, int(self.limit * self.decrease_factor)), reason)
+
+    def _set_limit(self, limit: int, reason: str):
+        """同時実行数を変更してログに残す（ロック内で呼ぶ）"""
+        if limit == self.limit:
+            logger.debug(f"[{self.name}] 同時実行数 {limit} を維持: {reason}")
+            return
+        direction = '増加' if limit > self.limit else '削減'
+        logger.info(f"[{self.name}] 同時実行数を{direction}: {self.limit} → {limit}（{reason}）")
+        self.limit = limit
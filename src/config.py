@@ -27,6 +27,83 @@ MAX_SEARCH_PAGES = int(os.getenv('MAX_SEARCH_PAGES', '5'))  # 最大検索ペー
 HEADLESS_MODE = os.getenv('HEADLESS_MODE', 'True').lower() == 'true'  # ヘッドレスモード
 REQUEST_DELAY_MIN = float(os.getenv('REQUEST_DELAY_MIN', '2'))  # 最小リクエスト間隔（秒）
 REQUEST_DELAY_MAX = float(os.getenv('REQUEST_DELAY_MAX', '5'))  # 最大リクエスト間隔（秒）
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# レート制限設定（ホストごとのトークンバケット、未指定時はREQUEST_DELAY_MIN/MAXの平均間隔から算出）
+_DEFAULT_RATE_LIMIT = 2 / (REQUEST_DELAY_MIN + REQUEST_DELAY_MAX) if REQUEST_DELAY_MIN + REQUEST_DELAY_MAX > 0 else 1.0
+AMAZON_RATE_LIMIT = float(os.getenv('AMAZON_RATE_LIMIT', str(_DEFAULT_RATE_LIMIT)))  # Amazonへの1秒あたりのリクエスト数
+RAKUTEN_RATE_LIMIT = float(os.getenv('RAKUTEN_RATE_LIMIT', str(_DEFAULT_RATE_LIMIT)))  # 楽天への1秒あたりのリクエスト数
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '1'))  # 連続して許可するリクエスト数
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', '2'))  # マーケットプレイスごとに同時実行するキーワード検索数
+AMAZON_CONCURRENCY = int(os.getenv('AMAZON_CONCURRENCY', str(SCRAPE_CONCURRENCY)))  # Amazonレーンのワーカー数
+RAKUTEN_CONCURRENCY = int(os.getenv('RAKUTEN_CONCURRENCY', str(SCRAPE_CONCURRENCY)))  # 楽天レーンのワーカー数
+
+# 同時実行数の自動調整設定（AIMD: 健全なら1ずつ増やし、劣化したら半分に減らす）
+ADAPTIVE_CONCURRENCY = os.getenv('ADAPTIVE_CONCURRENCY', 'True').lower() == 'true'  # 有効な場合、*_CONCURRENCYは開始時の値になる
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', '6'))  # マーケットプレイスごとの同時実行数の上限
+CONCURRENCY_WINDOW = int(os.getenv('CONCURRENCY_WINDOW', '10'))  # 同時実行数を見直すまでのページ数
+LATENCY_TARGET = float(os.getenv('LATENCY_TARGET', '8'))  # これを超えたら同時実行数を減らす平均応答時間（秒）
+ERROR_RATE_THRESHOLD = float(os.getenv('ERROR_RATE_THRESHOLD', '0.2'))  # これを超えたら同時実行数を減らすエラー率
+
+# ブロック検知設定（マーケットプレイスごとのサーキットブレーカー）
+BLOCK_COOLDOWN = float(os.getenv('BLOCK_COOLDOWN', '60'))  # ブロック検知後にリクエストを止める秒数（連続するたびに倍増）
+BLOCK_MAX_COOLDOWN = float(os.getenv('BLOCK_MAX_COOLDOWN', '600'))  # 停止秒数の上限
+BLOCK_MAX_TRIPS = int(os.getenv('BLOCK_MAX_TRIPS', '3'))  # 連続してブロックされたら残りの検索を中止する回数
+
+# 検索ページ数の調整設定（Rankingsシートの履歴を利用）
+ADAPTIVE_DEPTH = os.getenv('ADAPTIVE_DEPTH', 'True').lower() == 'true'  # 長期圏外の組み合わせの検索ページ数を減らす
+OUT_OF_RANGE_DAYS = int(os.getenv('OUT_OF_RANGE_DAYS', '7'))  # 何日連続で圏外なら長期圏外とみなすか
+OUT_OF_RANGE_PROBE_PAGES = int(os.getenv('OUT_OF_RANGE_PROBE_PAGES', '1'))  # 長期圏外の組み合わせを普段確認するページ数
+OUT_OF_RANGE_FULL_SCAN_DAYS = int(os.getenv('OUT_OF_RANGE_FULL_SCAN_DAYS', '7'))  # 長期圏外の組み合わせを最大ページ数まで確認する間隔（日）
+
+# 取得方式設定
+FETCH_BACKEND = os.getenv('FETCH_BACKEND', 'http').lower()  # http: HTTP取得を優先し失敗時のみブラウザ / selenium: 常にブラウザ
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '15'))  # HTTP取得のタイムアウト（秒）
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # ホストごとに保持するHTTP接続数
+PREFETCH_PAGES = int(os.getenv('PREFETCH_PAGES', '0'))  # 現在のページの解析中にHTTPで先読みする後続ページ数（0で先読みしない）
+EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'html').lower()  # ブラウザでの結果抽出方法（html: page_sourceを解析 / js: ページ内のJavaScriptで抽出）
+
+# 取得・解析パイプライン設定（取得ワーカーと解析プロセスを分けて、ブラウザとCPUを並行して使う）
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'False').lower() == 'true'  # 有効な場合、先読み（PREFETCH_PAGES）は使わない
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '0'))  # 解析プロセス数（0でCPUコア数）
+PARSE_QUEUE_SIZE = int(os.getenv('PARSE_QUEUE_SIZE', '32'))  # 解析待ちのページを置いておく上限（満杯になると取得を待たせる）
+PIPELINE_STATS_INTERVAL = float(os.getenv('PIPELINE_STATS_INTERVAL', '30'))  # キューの深さと稼働率をログに出す間隔（秒）
+
+# SERPアーカイブ設定（取得したページを圧縮して保存し、パーサー修正後に reparse で順位を計算し直せるようにする）
+SERP_ARCHIVE = os.getenv('SERP_ARCHIVE', 'False').lower() == 'true'
+SERP_ARCHIVE_PATH = os.getenv('SERP_ARCHIVE_PATH', str(DATA_DIR / 'serp_archive.sqlite3'))
+SERP_ARCHIVE_LEVEL = int(os.getenv('SERP_ARCHIVE_LEVEL', '9'))  # 圧縮レベル（zstandardが無い場合はzlib）
+
+# SERPスナップショット設定（検索で確認した全商品を日ごとにParquetで保存し、後から任意の商品の順位を引けるようにする）
+SERP_SNAPSHOT = os.getenv('SERP_SNAPSHOT', 'False').lower() == 'true'  # pyarrowが必要
+SERP_SNAPSHOT_DIR = os.getenv('SERP_SNAPSHOT_DIR', str(DATA_DIR / 'serp_snapshots'))
+
+# 実行ジャーナル設定（キーワードごとの結果を検索し終えるたびに記録し、--resume で続きから再開できるようにする）
+RUN_JOURNAL = os.getenv('RUN_JOURNAL', 'True').lower() == 'true'
+RUN_JOURNAL_PATH = os.getenv('RUN_JOURNAL_PATH', str(DATA_DIR / 'run_journal.sqlite3'))
+
+# シートへの順次書き込み設定（検索中に完了した行を少しずつ書き込む、実行ジャーナルが必要）
+SHEET_STREAMING = os.getenv('SHEET_STREAMING', 'False').lower() == 'true'
+SHEET_BATCH_ROWS = int(os.getenv('SHEET_BATCH_ROWS', '200'))  # 1回に書き込む最大行数
+SHEET_FLUSH_INTERVAL = float(os.getenv('SHEET_FLUSH_INTERVAL', '60'))  # 行数がたまらなくても書き込むまでの秒数
+SHEET_MIN_WRITE_INTERVAL = float(os.getenv('SHEET_MIN_WRITE_INTERVAL', '5'))  # 書き込みの最小間隔（秒、Sheets APIの上限対策）
+
+# スケジューラー設定（優先度・前回確認からの日数・順位の変動の順に検索し、--time-budget に収まらない分は見送る）
+SCHEDULER = os.getenv('SCHEDULER', 'True').lower() == 'true'  # 無効な場合は入力シートの順に全キーワードを検索する
+TIME_BUDGET = os.getenv('TIME_BUDGET', '')  # 時間の上限（例: 90m, 2h、空欄で上限なし、--time-budget で上書き）
+DEFAULT_PRIORITY = int(os.getenv('DEFAULT_PRIORITY', '3'))  # 入力シートの「優先度」が空欄のSKUの優先度（1が最優先）
+DEFAULT_KEYWORD_COST = float(os.getenv('DEFAULT_KEYWORD_COST', '30'))  # 実測値の無いキーワードの見積もり秒数
+
+# 常駐モード設定（python src/main.py daemon、入力シートの「更新頻度」列の区分ごとの間隔で検索し続ける）
+DAEMON_HOT_INTERVAL = float(os.getenv('DAEMON_HOT_INTERVAL', '3600'))  # 毎時（hot）の検索間隔（秒）
+DAEMON_NORMAL_INTERVAL = float(os.getenv('DAEMON_NORMAL_INTERVAL', '86400'))  # 毎日（normal）の検索間隔（秒）
+DAEMON_COLD_INTERVAL = float(os.getenv('DAEMON_COLD_INTERVAL', '604800'))  # 毎週（cold）の検索間隔（秒）
+DAEMON_DEFAULT_TIER = os.getenv('DAEMON_DEFAULT_TIER', 'normal').lower()  # 更新頻度が空欄のSKUの区分（hot / normal / cold）
+DAEMON_TICK_INTERVAL = float(os.getenv('DAEMON_TICK_INTERVAL', '60'))  # 検索時刻を過ぎたキーワードを確認する間隔（秒）
+DAEMON_MAX_KEYWORDS_PER_TICK = int(os.getenv('DAEMON_MAX_KEYWORDS_PER_TICK', '20'))  # 1回にまとめて検索する最大キーワード数
+DAEMON_RETRY_INTERVAL = float(os.getenv('DAEMON_RETRY_INTERVAL', '900'))  # 「不明」になったキーワードを検索し直すまでの秒数
+DAEMON_RELOAD_INTERVAL = float(os.getenv('DAEMON_RELOAD_INTERVAL', '3600'))  # 入力シートを読み直す間隔（秒）
+DAEMON_STATUS_PATH = os.getenv('DAEMON_STATUS_PATH', str(DATA_DIR / 'daemon_status.json'))  # キューの状態を書き出すファイル
 
 # ログ設定
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -36,4 +113,19 @@ LOG_FILE = LOGS_DIR / 'search_ranking_monitor.log'
 SKIP_IF_ALREADY_RUN_TODAY = os.getenv('SKIP_IF_ALREADY_RUN_TODAY', 'True').lower() == 'true'  # 当日既に実行済みの場合スキップ
 
 # ChromeDriver設定
-CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH', None)  # Noneの場合は自動ダウンロード
\ No newline at end of file
+CHROME_DRIVER_PATH = os.getenv('CHROME_DRIVER_PATH', None)  # Noneの場合は自動ダウンロード
+
+# ブラウザプール設定
+BROWSER_BACKEND = os.getenv('BROWSER_BACKEND', 'selenium').lower()  # selenium / playwright（要 pip install playwright && playwright install chromium）
+BROWSER_MODE = os.getenv('BROWSER_MODE', 'browsers').lower()  # browsers: ブラウザを複数起動 / tabs: 1つのブラウザのタブを使う（どちらが軽いかは benchmark_browsers.py で確認）
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '4'))  # 同時に使うブラウザ数（tabsの場合はタブ数、両レーンのワーカー数の合計が目安）
+BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', '200'))  # ブラウザを再起動するまでの最大ページ数（0で無制限）
+BROWSER_MAX_RSS_MB = int(os.getenv('BROWSER_MAX_RSS_MB', '1024'))  # ブラウザを再起動するメモリ使用量（MB、0で無制限）
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', 'media').lower()  # 読み込みをブロックするリソース（none / media: 画像・フォント・動画 / aggressive: さらにCSS・外部広告/計測スクリプト）
+PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'eager').lower()  # ページ読み込みの待ち方（normal / eager: DOM構築まで / none: 待たない）
+PAGE_READY_TIMEOUT = float(os.getenv('PAGE_READY_TIMEOUT', '10'))  # 結果・該当なし・ブロックの判定を待つ最大秒数
+PAGE_LOAD_TIMEOUT = float(os.getenv('PAGE_LOAD_TIMEOUT', '30'))  # driver.get がページの読み込みを待つ最大秒数（0で無制限）
+
+# ウォッチドッグ設定（期限を過ぎたブラウザを強制終了して作り直し、残りの検索を続ける）
+PAGE_DEADLINE = float(os.getenv('PAGE_DEADLINE', '60'))  # 1ページの取得（読み込み・判定・抽出）の期限（秒、0で無効）
+KEYWORD_DEADLINE = float(os.getenv('KEYWORD_DEADLINE', '300'))  # 1キーワードの検索の期限（秒、0で無効、過ぎたら残りは「不明」）
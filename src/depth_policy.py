@@ -0,0 +1,108 @@
+"""
+ランキング履歴から（SKU, キーワード, マーケットプレイス）ごとの検索ページ数を決めるモジュール
+
+長期間「圏外」が続いている組み合わせは、普段は先頭ページだけを確認し、
+数日に1回だけ最大ページ数まで確認する。全量確認の日は組み合わせごとにずらして、
+特定の日にページ数が集中しないようにする。
+
+浅いページだけを確認して見つからなかった日は「>48位」のように記録し、「圏外」とは区別する
+（連続圏外回数には数えないため、全量確認の日の結果だけで長期圏外かどうかが決まる）。
+
+上位で安定している組み合わせは、全ての検索対象が見つかった時点で巡回を打ち切るため
+通常は1ページ目で終わる。順位が下がった日に誤って「圏外」と記録しないよう、
+こちらのページ数は制限しない。
+"""
+
+import zlib
+from datetime import date
+from typing import List, Dict, Any, Tuple
+
+from src.ranking import NOT_RANKED_LABEL, UNKNOWN_LABEL, is_rank_beyond
+
+
+class DepthPolicy:
+    """ランキング履歴に基づく検索ページ数の決定ルール"""
+
+    def __init__(
+        self,
+        history: List[Dict[str, Any]],
+        max_pages: int = 5,
+        out_of_range_days: int = 7,
+        probe_pages: int = 1,
+        full_scan_interval: int = 7
+    ):
+        """
+        Args:
+            history: GoogleSheetsClient.read_ranking_history が返す履歴行のリスト
+            max_pages: 通常の最大検索ページ数
+            out_of_range_days: 何日連続で「圏外」なら長期圏外とみなすか
+            probe_pages: 長期圏外の組み合わせを普段確認するページ数
+            full_scan_interval: 長期圏外の組み合わせを最大ページ数まで確認する間隔（日）
+        """
+        self.max_pages = max_pages
+        self.out_of_range_days = max(1, out_of_range_days)
+        self.probe_pages = max(1, min(probe_pages, max_pages))
+        self.full_scan_interval = max(1, full_scan_interval)
+        self._out_of_range_streaks = self._count_streaks(history)
+
+    @staticmethod
+    def _count_streaks(history: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], int]:
+        """
+        組み合わせごとに、直近から連続して「圏外」だった日数を数える（「不明」と浅い確認の「>48位」は飛ばす）
+
+        Args:
+            history: 履歴行のリスト
+
+        Returns:
+            （SKU名, キーワード, マーケットプレイス）と連続圏外日数の辞書
+        """
+        # 同じ日に複数の行がある場合（常駐モードの毎時の検索など）は、シートで後にある行だけを使う
+        observations: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+        for row in history:
+            for marketplace in ('amazon', 'rakuten'):
+                cell = row.get(f'{marketplace}_rank', '')
+                if cell in ('', UNKNOWN_LABEL) or is_rank_beyond(cell):
+                    continue
+                key = (row['sku_name'], row['keyword'], marketplace)
+                observations.setdefault(key, {})[row['date']] = cell
+
+        streaks = {}
+        for key, cells in observations.items():
+            streak = 0
+            for _, cell in sorted(cells.items(), reverse=True):
+                if cell != NOT_RANKED_LABEL:
+                    break
+                streak += 1
+            streaks[key] = streak
+        return streaks
+
+    def _is_full_scan_day(self, key: Tuple[str, str, str], today: date) -> bool:
+        """長期圏外の組み合わせを最大ページ数まで確認する日か（組み合わせごとに日をずらす）"""
+        offset = zlib.crc32('\t'.join(key).encode('utf-8'))
+        return (today.toordinal() + offset) % self.full_scan_interval == 0
+
+    def depth(self, sku_name: str, keyword: str, marketplace: str, today: date) -> int:
+        """
+        組み合わせの検索ページ数を決める
+
+        Args:
+            sku_name: SKU名
+            keyword: キーワード
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            today: 実行日
+
+        Returns:
+            検索ページ数
+        """
+        key = (sku_name, keyword, marketplace)
+        if self._out_of_range_streaks.get(key, 0) < self.out_of_range_days:
+            return self.max_pages
+        if self._is_full_scan_day(key, today):
+            return self.max_pages
+        return self.probe_pages
+
+    @property
+    def long_term_out_of_range(self) -> int:
+        """長期圏外とみなされる組み合わせの数"""
+        return sum(1 for streak in self._out_of_range_streaks.values() if streak >= self.out_of_range_days)
+
@@ -7,6 +7,19 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from loguru import logger
 
+from src.ranking import RANKING_HEADERS, ranking_row
+
+
+# ランキングシートの最終列（RANKING_HEADERSの列数から求める）
+RANKING_LAST_COLUMN = chr(ord('A') + len(RANKING_HEADERS) - 1)
+
+# 入力シートの「更新頻度」列の表記と常駐モード（daemon）の更新区分
+REFRESH_TIERS = {
+    'hot': 'hot', '毎時': 'hot',
+    'normal': 'normal', '毎日': 'normal',
+    'cold': 'cold', '毎週': 'cold',
+}
+
 
 class GoogleSheetsClient:
     """Google Sheets APIクライアント"""
@@ -18,6 +31,7 @@ class GoogleSheetsClient:
             spreadsheet_id: 操作対象のスプレッドシートID
         """
         self.spreadsheet_id = spreadsheet_id
+        self._prepared_sheets = set()  # 作成・ヘッダーの確認が済んだランキングシート
         
         try:
             credentials = service_account.Credentials.from_service_account_file(
@@ -85,6 +99,10 @@ class GoogleSheetsClient:
             
             headers = values[0]
             data = []
+            # 優先度列（任意、1が最優先）
+            priority_col = headers.index('優先度') if '優先度' in headers else None
+            # 更新頻度列（任意、常駐モードで使う）
+            tier_col = headers.index('更新頻度') if '更新頻度' in headers else None
             
             for row_idx, row in enumerate(values[1:], start=2):
                 if len(row) < 3:  # 最低限SKU名、Amazon URL、楽天URLが必要
@@ -96,9 +114,22 @@ class GoogleSheetsClient:
                     'amazon_url': row[1] if len(row) > 1 else '',
                     'rakuten_url': row[2] if len(row) > 2 else '',
                     'asin': '',
-                    'keywords': []
+                    'keywords': [],
+                    'priority': None,
+                    'tier': None
                 }
                 
+                if priority_col is not None and priority_col < len(row) and row[priority_col].strip():
+                    try:
+                        sku_data['priority'] = max(1, int(row[priority_col]))
+                    except ValueError:
+                        logger.warning(f"優先度を数値として読み取れません: {row[priority_col]} ({sku_data['sku_name']})")
+                
+                if tier_col is not None and tier_col < len(row) and row[tier_col].strip():
+                    sku_data['tier'] = REFRESH_TIERS.get(row[tier_col].strip().lower())
+                    if not sku_data['tier']:
+                        logger.warning(f"更新頻度を読み取れません（毎時・毎日・毎週のいずれか）: {row[tier_col]} ({sku_data['sku_name']})")
+                
                 # Amazon URLからASINを抽出
                 if sku_data['amazon_url']:
                     extracted_asin = self.extract_asin_from_url(sku_data['amazon_url'])
@@ -131,37 +162,8 @@ class GoogleSheetsClient:
             sheet_name: 書き込むシート名
         """
         try:
-            # シートが存在するか確認
-            sheet_metadata = self.sheets.get(spreadsheetId=self.spreadsheet_id).execute()
-            sheets = sheet_metadata.get('sheets', [])
-            
-            sheet_exists = any(sheet['properties']['title'] == sheet_name for sheet in sheets)
-            
-            if not sheet_exists:
-                # シートを作成
-                request_body = {
-                    'requests': [{
-                        'addSheet': {
-                            'properties': {
-                                'title': sheet_name
-                            }
-                        }
-                    }]
-                }
-                self.sheets.batchUpdate(
-                    spreadsheetId=self.spreadsheet_id,
-                    body=request_body
-                ).execute()
-                
-                # ヘッダーを追加
-                headers = [['日付', 'SKU名', 'キーワード', 'Amazon順位', '楽天順位']]
-                self.sheets.values().update(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=f'{sheet_name}!A1:E1',
-                    valueInputOption='RAW',
-                    body={'values': headers}
-                ).execute()
-                logger.info(f"新しいシート '{sheet_name}' を作成しました")
+            # シートが無ければ作成し、ヘッダーを揃える（同じシートへの2回目以降の書き込みでは確認しない）
+            self._prepare_ranking_sheet(sheet_name)
             
             # 既存データの行数を取得
             result = self.sheets.values().get(
@@ -173,21 +175,13 @@ class GoogleSheetsClient:
             next_row = existing_rows + 1
             
             # データを準備
-            values = []
-            for data in ranking_data:
-                values.append([
-                    data['date'],
-                    data['sku_name'],
-                    data['keyword'],
-                    data['amazon_rank'] if data['amazon_rank'] else '圏外',
-                    data['rakuten_rank'] if data['rakuten_rank'] else '圏外'
-                ])
+            values = [ranking_row(data) for data in ranking_data]
             
             if values:
                 # データを追記
                 self.sheets.values().update(
                     spreadsheetId=self.spreadsheet_id,
-                    range=f'{sheet_name}!A{next_row}:E{next_row + len(values) - 1}',
+                    range=f'{sheet_name}!A{next_row}:{RANKING_LAST_COLUMN}{next_row + len(values) - 1}',
                     valueInputOption='RAW',
                     body={'values': values}
                 ).execute()
@@ -198,6 +192,154 @@ class GoogleSheetsClient:
             logger.error(f"スプレッドシートへの書き込みエラー: {e}")
             raise
     
+    def upsert_ranking_data(self, ranking_data: List[Dict[str, Any]], sheet_name: str = 'Rankings'):
+        """
+        ランキングデータを（日付, SKU名, キーワード）ごとに1行として書き込む
+        
+        同じ日に同じSKU×キーワードの行が既にあればその行を上書きし、無ければ追記する。
+        1日に何度も検索する常駐モードでも、履歴は1日1行のまま最新の順位になる。
+        
+        Args:
+            ranking_data: ランキングデータのリスト
+            sheet_name: 書き込むシート名
+        """
+        try:
+            self._prepare_ranking_sheet(sheet_name)
+            
+            result = self.sheets.values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f'{sheet_name}!A:C'
+            ).execute()
+            
+            # （日付, SKU名, キーワード）→ シートの行番号（重複がある場合は最後の行）
+            existing = {
+                tuple(row[:3]): row_number
+                for row_number, row in enumerate(result.get('values', []), start=1)
+                if row_number > 1 and len(row) >= 3
+            }
+            
+            updates = []
+            appends = []
+            for data in ranking_data:
+                row_number = existing.get((data['date'], data['sku_name'], data['keyword']))
+                if row_number is None:
+                    appends.append(data)
+                else:
+                    updates.append({
+                        'range': f'{sheet_name}!A{row_number}:{RANKING_LAST_COLUMN}{row_number}',
+                        'values': [ranking_row(data)]
+                    })
+            
+            if updates:
+                self.sheets.values().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={'valueInputOption': 'RAW', 'data': updates}
+                ).execute()
+                logger.info(f"{len(updates)} 件のランキングデータを同じ日付の行に上書きしました")
+        
+        except HttpError as e:
+            logger.error(f"スプレッドシートへの書き込みエラー: {e}")
+            raise
+        
+        if appends:
+            self.write_ranking_data(appends, sheet_name)
+    
+    def _prepare_ranking_sheet(self, sheet_name: str):
+        """
+        ランキングシートが無ければ作成し、ヘッダーを書き込む
+        
+        Args:
+            sheet_name: ランキングデータのシート名
+        """
+        if sheet_name in self._prepared_sheets:
+            return
+        
+        # シートが存在するか確認
+        sheet_metadata = self.sheets.get(spreadsheetId=self.spreadsheet_id).execute()
+        sheets = sheet_metadata.get('sheets', [])
+        
+        sheet_exists = any(sheet['properties']['title'] == sheet_name for sheet in sheets)
+        
+        if not sheet_exists:
+            # シートを作成
+            request_body = {
+                'requests': [{
+                    'addSheet': {
+                        'properties': {
+                            'title': sheet_name
+                        }
+                    }
+                }]
+            }
+            self.sheets.batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body=request_body
+            ).execute()
+            
+            # ヘッダーを追加
+            self._write_ranking_headers(sheet_name)
+            logger.info(f"新しいシート '{sheet_name}' を作成しました")
+        else:
+            # 列を追加する前に作成したシートはヘッダーを広げる
+            header = self.sheets.values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f'{sheet_name}!A1:{RANKING_LAST_COLUMN}1'
+            ).execute().get('values', [[]])
+            if not header or len(header[0]) < len(RANKING_HEADERS):
+                self._write_ranking_headers(sheet_name)
+                logger.info(f"シート '{sheet_name}' のヘッダーに列を追加しました")
+        
+        self._prepared_sheets.add(sheet_name)
+    
+    def _write_ranking_headers(self, sheet_name: str):
+        """
+        ランキングシートの1行目にヘッダーを書き込む
+        
+        Args:
+            sheet_name: ランキングデータのシート名
+        """
+        self.sheets.values().update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f'{sheet_name}!A1:{RANKING_LAST_COLUMN}1',
+            valueInputOption='RAW',
+            body={'values': [RANKING_HEADERS]}
+        ).execute()
+    
+    def read_ranking_history(self, sheet_name: str = 'Rankings') -> List[Dict[str, Any]]:
+        """
+        ランキング履歴を読み取る
+        
+        Args:
+            sheet_name: ランキングデータのシート名
+            
+        Returns:
+            履歴行（date, sku_name, keyword, amazon_rank, rakuten_rank）のリスト
+            順位はシートの表記のまま（数値の文字列、「圏外」、「不明」）
+        """
+        try:
+            result = self.sheets.values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f'{sheet_name}!A:E'
+            ).execute()
+        except HttpError as e:
+            logger.warning(f"ランキング履歴を読み取れませんでした: {e}")
+            return []
+        
+        history = []
+        for row in result.get('values', [])[1:]:  # ヘッダーを除く
+            if len(row) < 3:
+                continue
+            history.append({
+                'date': row[0],
+                'sku_name': row[1],
+                'keyword': row[2],
+                'amazon_rank': row[3] if len(row) > 3 else '',
+                'rakuten_rank': row[4] if len(row) > 4 else ''
+            })
+        
+        logger.debug(f"ランキング履歴を {len(history)} 件読み取りました")
+        return history
+    
     def get_last_execution_date(self, sheet_name: str = 'Rankings') -> str:
         """
         最後の実行日を取得
@@ -0,0 +1,94 @@
+"""
+ブラウザを使わずに検索結果ページを取得する軽量HTTPクライアント
+"""
+
+from typing import Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from loguru import logger
+
+from src.config import USER_AGENT
+from src.page_readiness import PageMarkers, PageState, classify_html
+
+try:
+    import brotli  # noqa: F401  brotliがあればbr圧縮も受け付ける
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class HttpFetcher:
+    """keep-aliveと圧縮を有効にしたHTTPセッションで検索結果ページを取得するクラス"""
+
+    def __init__(self, timeout: float = 15, pool_size: int = 10):
+        """
+        Args:
+            timeout: リクエストのタイムアウト（秒）
+            pool_size: ホストごとに保持する接続数
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        # 503・429はブロック（ロボット確認・スロットリング）の可能性があるため再試行せず判定に回す
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 504], raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'ja-JP,ja;q=0.9',
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+        })
+
+    def fetch(self, url: str, markers: PageMarkers) -> Tuple[str, Optional[str]]:
+        """
+        ページを取得し、検索結果・該当なし・ブロックのいずれかを判定
+
+        Args:
+            url: 取得するURL
+            markers: 判定用の目印
+
+        Returns:
+            ページの状態（PageState）と、検索結果がある場合はページのHTML
+            （判定できない場合はTIMEOUTを返すので、呼び出し側でブラウザ取得に切り替える）
+        """
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug(f"HTTP取得エラー: {url} - {e}")
+            return PageState.TIMEOUT, None
+
+        # charset未指定時にrequestsが仮定するISO-8859-1では日本語が化けるためUTF-8とみなす
+        encoding = response.encoding
+        if not encoding or encoding.lower() == 'iso-8859-1':
+            encoding = 'utf-8'
+        html = response.content.decode(encoding, errors='replace')
+
+        state = classify_html(html, markers)
+        if response.status_code == 429:
+            state = PageState.BLOCKED
+        elif response.status_code != 200 and state != PageState.BLOCKED:
+            logger.debug(f"HTTP取得失敗: {url} - ステータス {response.status_code}")
+            return PageState.TIMEOUT, None
+
+        if state != PageState.READY:
+            logger.debug(f"HTTP取得結果に検索結果が含まれていません（{state}）: {url}")
+            return state, None
+
+        return state, html
+
+    def close(self):
+        """セッションを閉じる"""
+        self.session.close()
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
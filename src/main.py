@@ -5,9 +5,14 @@ Amazon・楽天検索順位モニタリングツール
 """
 
 import sys
+import argparse
+import csv
+import signal
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from loguru import logger
 
 # プロジェクトルートをパスに追加
@@ -15,8 +20,23 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import *
 from src.google_sheets import GoogleSheetsClient
-from src.amazon_scraper import AmazonScraper
-from src.rakuten_scraper import RakutenScraper
+from src.search_planner import SearchPlan
+from src.depth_policy import DepthPolicy
+from src.browser_pool import PagePool, create_page_pool
+from src.http_fetcher import HttpFetcher
+from src.async_engine import AsyncSearchEngine
+from src.pipeline import SearchPipeline
+from src.serp_archive import SerpArchive
+from src.reparse import reparse_archive
+from src.serp_snapshot import SerpSnapshot
+from src.run_journal import RunJournal
+from src.sheet_sink import SheetSink
+from src.run_scheduler import RunScheduler, parse_duration, report_schedule
+from src.refresh_daemon import RefreshDaemon
+from src.circuit_breaker import CircuitBreaker
+from src.concurrency import AdaptiveConcurrency
+from src.rate_limiter import create_rate_limiter
+from src.ranking import RANK_UNKNOWN, RANKING_HEADERS, format_rank, ranking_row
 
 
 def setup_logging():
@@ -40,12 +60,16 @@ def setup_logging():
     )
 
 
-def check_already_run_today(sheets_client: GoogleSheetsClient) -> bool:
+def check_already_run_today(sheets_client: GoogleSheetsClient, sku_list: List[Dict[str, Any]]) -> bool:
     """
     本日既に実行済みかチェック
     
+    常駐モードは一部のキーワードだけを本日の日付で書き込むため、最後の行の日付ではなく、
+    全てのSKU×キーワードに本日の行があるかで判定する。
+    
     Args:
         sheets_client: Google Sheetsクライアント
+        sku_list: 入力シートのSKU情報のリスト
         
     Returns:
         実行済みの場合True
@@ -54,86 +78,483 @@ def check_already_run_today(sheets_client: GoogleSheetsClient) -> bool:
         return False
     
     today = datetime.now().strftime('%Y-%m-%d')
-    last_execution_date = sheets_client.get_last_execution_date(OUTPUT_SHEET_NAME)
+    if sheets_client.get_last_execution_date(OUTPUT_SHEET_NAME) != today:
+        return False
     
-    if last_execution_date == today:
-        logger.info(f"本日（{today}）は既に実行済みです")
-        return True
+    written = {
+        (row['sku_name'], row['keyword'])
+        for row in sheets_client.read_ranking_history(OUTPUT_SHEET_NAME)
+        if row['date'] == today
+    }
+    missing = [
+        (sku_data['sku_name'], keyword)
+        for sku_data in sku_list
+        for keyword in sku_data['keywords']
+        if (sku_data['sku_name'], keyword) not in written
+    ]
+    if missing:
+        logger.info(f"本日（{today}）の行が無いSKU×キーワードが {len(missing)} 件あるため実行します")
+        return False
     
-    return False
+    logger.info(f"本日（{today}）は既に実行済みです")
+    return True
 
 
-def search_rankings(sku_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def create_concurrency_controllers() -> Dict[str, AdaptiveConcurrency]:
     """
-    SKUに対して全キーワードの検索を実行
+    設定ファイルの値でマーケットプレイスごとの同時実行数コントローラーを作成
+    
+    Returns:
+        マーケットプレイス名とコントローラーの辞書
+    """
+    initial = {'amazon': AMAZON_CONCURRENCY, 'rakuten': RAKUTEN_CONCURRENCY}
+    return {
+        marketplace: AdaptiveConcurrency(
+            marketplace,
+            initial=initial[marketplace],
+            maximum=max(MAX_CONCURRENCY, initial[marketplace]),
+            window=CONCURRENCY_WINDOW,
+            latency_target=LATENCY_TARGET,
+            error_threshold=ERROR_RATE_THRESHOLD
+        )
+        for marketplace in initial
+    }
+
+
+def create_configured_pool(prewarm: bool = True) -> PagePool:
+    """
+    設定ファイルの値でブラウザ・タブのプールを作成
     
     Args:
-        sku_data: SKU情報（sku_name, asin, rakuten_url, keywords）
+        prewarm: 開始時にブラウザを起動しておくか
         
     Returns:
-        ランキング結果のリスト
+        ページハンドルのプール
     """
-    results = []
-    today = datetime.now().strftime('%Y-%m-%d')
+    return create_page_pool(
+        mode=BROWSER_MODE,
+        size=BROWSER_POOL_SIZE,
+        headless=HEADLESS_MODE,
+        max_pages=BROWSER_MAX_PAGES,
+        max_rss_mb=BROWSER_MAX_RSS_MB,
+        prewarm=prewarm,
+        backend=BROWSER_BACKEND
+    )
+
+
+def run_search_plan(plan: SearchPlan, rate_scale: float = 1.0, run_date: Optional[str] = None,
+                    pool: Optional[PagePool] = None) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+    """
+    検索計画をマーケットプレイスごとのレーンで実行
     
-    logger.info(f"=== {sku_data['sku_name']} の検索開始 ===")
+    Args:
+        plan: 検索計画
+        rate_scale: レート制限に掛ける係数（複数プロセスで分担する場合は 1/プロセス数）
+        run_date: 実行ジャーナルに記録する実行日（Noneの場合は記録しない）
+        pool: 使い回すブラウザ・タブのプール（Noneの場合は実行中だけ起動する）
+        
+    Returns:
+        マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+    """
+    # HTTP取得を優先する場合、ブラウザは必要になった時点で起動する
+    http_fetcher = HttpFetcher(timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE) if FETCH_BACKEND == 'http' else None
+    archive = SerpArchive(SERP_ARCHIVE_PATH, SERP_ARCHIVE_LEVEL) if SERP_ARCHIVE else None
+    snapshot = SerpSnapshot(SERP_SNAPSHOT_DIR) if SERP_SNAPSHOT else None
+    # ジャーナルはプロセスごとに開く（検索し終えたキーワードから順に記録する）
+    journal = RunJournal(RUN_JOURNAL_PATH, run_date) if run_date else None
     
-    # Amazon検索
-    if sku_data['asin']:
-        logger.info(f"Amazon検索開始: ASIN={sku_data['asin']}")
-        try:
-            with AmazonScraper(headless=HEADLESS_MODE) as amazon:
-                amazon_results = amazon.search_multiple_keywords(
-                    sku_data['keywords'],
-                    sku_data['asin'],
-                    MAX_SEARCH_PAGES
+    try:
+        with nullcontext(pool) if pool else create_configured_pool(prewarm=http_fetcher is None) as pool:
+            engine = AsyncSearchEngine(
+                pool=pool,
+                http_fetcher=http_fetcher,
+                rate_limiter=create_rate_limiter(rate_scale),
+                lane_workers={'amazon': AMAZON_CONCURRENCY, 'rakuten': RAKUTEN_CONCURRENCY},
+                headless=HEADLESS_MODE,
+                max_pages=MAX_SEARCH_PAGES,
+                extraction_mode=EXTRACTION_MODE,
+                page_ready_timeout=PAGE_READY_TIMEOUT,
+                circuit_breakers={
+                    marketplace: CircuitBreaker(marketplace, BLOCK_COOLDOWN, BLOCK_MAX_COOLDOWN, BLOCK_MAX_TRIPS)
+                    for marketplace in ('amazon', 'rakuten')
+                },
+                concurrency=create_concurrency_controllers() if ADAPTIVE_CONCURRENCY else None,
+                prefetch_pages=PREFETCH_PAGES,
+                archive=archive,
+                snapshot=snapshot,
+                journal=journal,
+                page_deadline=PAGE_DEADLINE,
+                keyword_deadline=KEYWORD_DEADLINE
+            )
+            if PIPELINE_MODE:
+                pipeline = SearchPipeline(
+                    engine.create_scraper,
+                    fetch_workers={'amazon': AMAZON_CONCURRENCY, 'rakuten': RAKUTEN_CONCURRENCY},
+                    parse_workers=PARSE_WORKERS,
+                    queue_size=PARSE_QUEUE_SIZE,
+                    max_pages=MAX_SEARCH_PAGES,
+                    concurrency=engine.concurrency,
+                    stats_interval=PIPELINE_STATS_INTERVAL,
+                    journal=journal,
+                    keyword_deadline=KEYWORD_DEADLINE
                 )
-        except Exception as e:
-            logger.error(f"Amazon検索エラー: {e}")
-            amazon_results = {kw: None for kw in sku_data['keywords']}
-    else:
-        logger.warning(f"ASINが設定されていません: {sku_data['sku_name']}")
-        amazon_results = {kw: None for kw in sku_data['keywords']}
+                return pipeline.run(plan)
+            return engine.run(plan)
+    finally:
+        if http_fetcher:
+            http_fetcher.close()
+        if archive:
+            archive.close()
+        if snapshot:
+            snapshot.close()
+        if journal:
+            journal.close()
+
+
+def _search_shard(worker_id: int, plan: SearchPlan, rate_scale: float,
+                  run_date: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+    """
+    ワーカープロセスで分割された検索計画を実行
     
-    # 楽天検索
-    if sku_data['rakuten_url']:
-        logger.info(f"楽天検索開始: URL={sku_data['rakuten_url']}")
-        try:
-            with RakutenScraper(headless=HEADLESS_MODE) as rakuten:
-                rakuten_results = rakuten.search_multiple_keywords(
-                    sku_data['keywords'],
-                    sku_data['rakuten_url'],
-                    MAX_SEARCH_PAGES
-                )
-        except Exception as e:
-            logger.error(f"楽天検索エラー: {e}")
-            rakuten_results = {kw: None for kw in sku_data['keywords']}
-    else:
-        logger.warning(f"楽天URLが設定されていません: {sku_data['sku_name']}")
-        rakuten_results = {kw: None for kw in sku_data['keywords']}
-    
-    # 結果を整形
-    for keyword in sku_data['keywords']:
-        result = {
-            'date': today,
-            'sku_name': sku_data['sku_name'],
-            'keyword': keyword,
-            'amazon_rank': amazon_results.get(keyword),
-            'rakuten_rank': rakuten_results.get(keyword)
+    Args:
+        worker_id: ワーカー番号
+        plan: 分割された検索計画
+        rate_scale: レート制限に掛ける係数
+        run_date: 実行ジャーナルに記録する実行日（Noneの場合は記録しない）
+        
+    Returns:
+        マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+    """
+    setup_logging()
+    # ワーカー内の全ログにワーカー番号を付けて、進捗と失敗をワーカーごとに追えるようにする
+    prefix = f"[ワーカー{worker_id}] "
+    logger.configure(patcher=lambda record: record.update(message=prefix + record['message']))
+    
+    logger.info(f"{len(plan.keywords)} キーワードの検索を開始します")
+    ranks = run_search_plan(plan, rate_scale, run_date)
+    logger.info("検索が完了しました")
+    return ranks
+
+
+def run_sharded_search_plan(plan: SearchPlan, workers: int,
+                            run_date: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+    """
+    検索計画をキーワード単位で分割し、複数プロセスで並行して実行
+    
+    各ワーカーは自分専用のブラウザを持ち、レート制限はワーカー数で等分する。
+    
+    Args:
+        plan: 検索計画
+        workers: ワーカープロセス数
+        run_date: 実行ジャーナルに記録する実行日（Noneの場合は記録しない）
+        
+    Returns:
+        マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+    """
+    shards = plan.shard(workers)
+    rate_scale = 1.0 / len(shards) if shards else 1.0
+    ranks = {'amazon': {}, 'rakuten': {}}
+    
+    logger.info(f"{len(shards)} 個のワーカープロセスで検索を実行します")
+    
+    with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+        futures = {
+            executor.submit(_search_shard, worker_id, shard, rate_scale, run_date): (worker_id, shard)
+            for worker_id, shard in enumerate(shards, start=1)
         }
-        results.append(result)
         
+        completed = 0
+        for future in as_completed(futures):
+            worker_id, shard = futures[future]
+            completed += 1
+            try:
+                shard_ranks = future.result()
+            except Exception as e:
+                # 失敗したワーカーのキーワードは「不明」として書き込む
+                logger.error(
+                    f"[ワーカー{worker_id}] 失敗しました（{len(shard.keywords)} キーワード）: {e} "
+                    f"({completed}/{len(shards)})"
+                )
+                for keyword, targets in shard.amazon_targets.items():
+                    ranks['amazon'][keyword] = {target: RANK_UNKNOWN for target in targets}
+                for keyword, targets in shard.rakuten_targets.items():
+                    ranks['rakuten'][keyword] = {target: RANK_UNKNOWN for target in targets}
+                continue
+            
+            for marketplace, keyword_ranks in shard_ranks.items():
+                ranks[marketplace].update(keyword_ranks)
+            logger.info(f"[ワーカー{worker_id}] 結果を受け取りました ({completed}/{len(shards)})")
+    
+    return ranks
+
+
+def search_all_rankings(
+    sku_list: List[Dict[str, Any]],
+    workers: int = 1,
+    depth_policy: Optional[DepthPolicy] = None,
+    journal: Optional[RunJournal] = None,
+    resume: bool = False,
+    sink: Optional[SheetSink] = None,
+    scheduler: Optional[RunScheduler] = None,
+    time_budget: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    全SKUのキーワードをキーワード単位にまとめて検索を実行
+    
+    同じキーワードを持つSKUが複数あっても、検索結果ページの巡回は
+    キーワード・マーケットプレイスごとに1回だけ行う。
+    
+    Args:
+        sku_list: SKU情報（sku_name, asin, rakuten_url, keywords）のリスト
+        workers: ワーカープロセス数（2以上の場合は複数プロセスで分担）
+        depth_policy: ランキング履歴に基づく検索ページ数の決定ルール（Noneの場合は常に最大ページ数）
+        journal: 実行ジャーナル（指定した場合は検索し終えたキーワードから記録し、結果はジャーナルから作る）
+        resume: ジャーナルに記録済みのキーワードを検索せずに続きから再開するか
+        sink: 検索中に完了した行をシートに書き込むシンク（ジャーナルの結果から書き込む）
+        scheduler: 検索するキーワードを選んで並べ替えるスケジューラー（Noneの場合は入力シートの順に全て検索）
+        time_budget: スケジューラーに渡す時間の上限（秒、Noneの場合は上限なし）
+        
+    Returns:
+        ランキング結果のリスト
+    """
+    now = datetime.now()
+    today = journal.run_date if journal else now.strftime('%Y-%m-%d')
+    plan = SearchPlan(sku_list)
+    if depth_policy:
+        plan.apply_depth_policy(depth_policy, now.date())
+    
+    if sink:
+        sink.start(plan)
+    
+    search_plan = plan
+    if journal and resume:
+        done = journal.completed({marketplace: plan.targets(marketplace) for marketplace in ('amazon', 'rakuten')})
+        search_plan = plan.excluding(done)
         logger.info(
-            f"  {keyword}: "
-            f"Amazon={result['amazon_rank'] or '圏外'}, "
-            f"楽天={result['rakuten_rank'] or '圏外'}"
+            f"ジャーナルから再開します: 検索済みの Amazon {len(done['amazon'])} キーワード, "
+            f"楽天 {len(done['rakuten'])} キーワードは検索しません"
+        )
+    
+    deferred = False
+    if scheduler:
+        schedule = scheduler.schedule(search_plan, time_budget, now.date())
+        report_schedule(schedule, time_budget, DATA_DIR / f'deferred_{today}.csv')
+        search_plan = schedule.plan
+        deferred = bool(schedule.deferred)
+    
+    run_date = journal.run_date if journal else None
+    ranks = {'amazon': {}, 'rakuten': {}}
+    if not search_plan.amazon_targets and not search_plan.rakuten_targets:
+        logger.info("検索するキーワードはありません")
+    elif workers > 1:
+        ranks = run_sharded_search_plan(search_plan, workers, run_date)
+    else:
+        ranks = run_search_plan(search_plan, run_date=run_date)
+    
+    if journal:
+        # ジャーナルを正とする（再開前の実行や、途中で落ちたワーカーが記録した結果も使う）
+        journaled = journal.load()
+        for marketplace in ranks:
+            ranks[marketplace].update(journaled.get(marketplace, {}))
+    
+    # 結果を整形（見送ったキーワードは「圏外」と書き込まないよう、結果がそろった行だけにする）
+    results = plan.build_results(ranks['amazon'], ranks['rakuten'], today, complete_only=deferred)
+    for result in results:
+        logger.info(
+            f"  {result['sku_name']} / {result['keyword']}: "
+            f"Amazon={format_rank(result['amazon_rank'])}, "
+            f"楽天={format_rank(result['rakuten_rank'])}"
         )
     
     return results
 
 
+def search_rankings(sku_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    SKUに対して全キーワードの検索を実行
+    
+    Args:
+        sku_data: SKU情報（sku_name, asin, rakuten_url, keywords）
+        
+    Returns:
+        ランキング結果のリスト
+    """
+    logger.info(f"=== {sku_data['sku_name']} の検索開始 ===")
+    
+    if not sku_data['asin']:
+        logger.warning(f"ASINが設定されていません: {sku_data['sku_name']}")
+    if not sku_data['rakuten_url']:
+        logger.warning(f"楽天URLが設定されていません: {sku_data['sku_name']}")
+    
+    return search_all_rankings([sku_data])
+
+
+def export_results(results: List[Dict[str, Any]], output: Path, sheet: Optional[str],
+                   sheets_client: GoogleSheetsClient):
+    """
+    ランキング結果をCSV（と指定があればシート）に書き出す
+    
+    Args:
+        results: ランキング結果のリスト
+        output: 書き出すCSVファイル
+        sheet: 結果を書き込むシート名（Noneの場合は書き込まない）
+        sheets_client: Google Sheetsクライアント
+    """
+    with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(RANKING_HEADERS)
+        for result in results:
+            writer.writerow(ranking_row(result))
+    logger.info(f"{len(results)} 件の結果を書き出しました: {output}")
+    
+    if sheet:
+        sheets_client.write_ranking_data(results, sheet)
+        logger.info(f"{len(results)} 件の結果をシート '{sheet}' に書き込みました")
+
+
+def run_reparse(args: argparse.Namespace, sheets_client: GoogleSheetsClient):
+    """
+    SERPアーカイブのページから順位を計算し直し、CSV（と指定があればシート）に書き出す
+    
+    マーケットプレイスにはアクセスしない。検索対象は現在の入力シートから読み取る。
+    
+    Args:
+        args: コマンドライン引数
+        sheets_client: Google Sheetsクライアント
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    since = args.since or today
+    until = args.until or today
+    
+    if not Path(SERP_ARCHIVE_PATH).exists():
+        logger.error(f"SERPアーカイブが見つかりません: {SERP_ARCHIVE_PATH}")
+        sys.exit(1)
+    
+    sku_list = sheets_client.read_input_data(INPUT_SHEET_NAME)
+    with SerpArchive(SERP_ARCHIVE_PATH, SERP_ARCHIVE_LEVEL) as archive:
+        results = reparse_archive(archive, SearchPlan(sku_list), since, until, MAX_SEARCH_PAGES)
+    if not results:
+        return
+    
+    output = Path(args.output) if args.output else DATA_DIR / f'reparse_{since}_{until}.csv'
+    export_results(results, output, args.sheet, sheets_client)
+
+
+def run_lookup(args: argparse.Namespace, sheets_client: GoogleSheetsClient):
+    """
+    SERPスナップショットから入力シートの全SKU×キーワードの順位を引き、CSV（と指定があればシート）に書き出す
+    
+    競合商品や新しいSKUを入力シートに追加した場合も、検索し直さずにその日の順位が分かる。
+    
+    Args:
+        args: コマンドライン引数
+        sheets_client: Google Sheetsクライアント
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    since = args.since or today
+    until = args.until or today
+    
+    sku_list = sheets_client.read_input_data(INPUT_SHEET_NAME)
+    with SerpSnapshot(SERP_SNAPSHOT_DIR) as snapshot:
+        results = snapshot.rank_results(SearchPlan(sku_list), since, until)
+    if not results:
+        logger.warning(f"SERPスナップショットに {since}〜{until} の対象キーワードがありません")
+        return
+    
+    output = Path(args.output) if args.output else DATA_DIR / f'lookup_{since}_{until}.csv'
+    export_results(results, output, args.sheet, sheets_client)
+
+
+def run_daemon(args: argparse.Namespace, sheets_client: GoogleSheetsClient):
+    """
+    daemonコマンド: 更新区分ごとの間隔でキーワードを検索し続ける
+    
+    Args:
+        args: コマンドライン引数
+        sheets_client: Google Sheetsクライアント
+    """
+    if not RUN_JOURNAL:
+        logger.error("常駐モードには実行ジャーナルが必要です（RUN_JOURNAL=True にしてください）")
+        sys.exit(1)
+    if args.workers > 1:
+        logger.warning("常駐モードではブラウザを使い回すため --workers は使いません（1プロセスで実行します）")
+    
+    # 毎時のキーワードも履歴が1日1行になるよう、本日分の行があれば上書きする
+    def write_results(rows: List[Dict[str, Any]]):
+        sheets_client.upsert_ranking_data(rows, OUTPUT_SHEET_NAME)
+    
+    # ブラウザはtickの間も閉じずに使い回す
+    with create_configured_pool(prewarm=FETCH_BACKEND != 'http') as pool:
+        daemon = RefreshDaemon(
+            load_sku_list=lambda: sheets_client.read_input_data(INPUT_SHEET_NAME),
+            search=lambda plan, run_date: run_search_plan(plan, run_date=run_date, pool=pool),
+            write_results=write_results,
+            journal_path=RUN_JOURNAL_PATH,
+            tier_intervals={
+                'hot': DAEMON_HOT_INTERVAL,
+                'normal': DAEMON_NORMAL_INTERVAL,
+                'cold': DAEMON_COLD_INTERVAL
+            },
+            default_tier=DAEMON_DEFAULT_TIER,
+            tick_interval=DAEMON_TICK_INTERVAL,
+            max_keywords_per_tick=DAEMON_MAX_KEYWORDS_PER_TICK,
+            retry_interval=DAEMON_RETRY_INTERVAL,
+            reload_interval=DAEMON_RELOAD_INTERVAL,
+            status_path=DAEMON_STATUS_PATH
+        )
+        # SIGTERMでも実行中のtickを終えてから止める
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            daemon.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    コマンドライン引数を解析
+    
+    Args:
+        argv: 引数のリスト（Noneの場合はsys.argv）
+        
+    Returns:
+        解析結果
+    """
+    parser = argparse.ArgumentParser(description='Amazon・楽天検索順位モニタリングツール')
+    parser.add_argument(
+        'command',
+        nargs='?',
+        choices=['run', 'reparse', 'lookup', 'daemon'],
+        default='run',
+        help='run: 検索して順位を記録（既定） / reparse: SERPアーカイブのページから順位を計算し直す'
+             ' / lookup: SERPスナップショットから順位を引く / daemon: 更新頻度ごとの間隔で検索し続ける'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='検索を分担するワーカープロセス数（各ワーカーが専用のブラウザを持つ）'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='本日の実行ジャーナルに記録済みのキーワードを検索せず、続きから再開する'
+    )
+    parser.add_argument(
+        '--time-budget',
+        type=parse_duration,
+        help='検索にかける時間の上限（例: 90m, 2h、単位なしは分）。収まらないキーワードは価値の低いものから見送る'
+    )
+    parser.add_argument('--since', help='reparse・lookup: 開始日（YYYY-MM-DD、既定は今日）')
+    parser.add_argument('--until', help='reparse・lookup: 終了日（YYYY-MM-DD、既定は今日）')
+    parser.add_argument('--output', help='reparse・lookup: 結果を書き出すCSVファイル（既定は data/<コマンド>_開始日_終了日.csv）')
+    parser.add_argument('--sheet', help='reparse・lookup: 結果を書き込むシート名（指定した場合のみ書き込む）')
+    return parser.parse_args(argv)
+
+
 def main():
     """メイン処理"""
+    args = parse_args()
     setup_logging()
     logger.info("検索順位モニタリングツールを開始します")
     
@@ -153,10 +574,36 @@ def main():
             SPREADSHEET_ID
         )
         
-        # 本日既に実行済みかチェック
-        if check_already_run_today(sheets_client):
+        if args.command == 'reparse':
+            run_reparse(args, sheets_client)
+            return
+        if args.command == 'lookup':
+            run_lookup(args, sheets_client)
+            return
+        if args.command == 'daemon':
+            run_daemon(args, sheets_client)
             return
         
+        journal = RunJournal(RUN_JOURNAL_PATH, datetime.now().strftime('%Y-%m-%d')) if RUN_JOURNAL else None
+        if args.resume and not journal:
+            logger.warning("RUN_JOURNAL=False のため --resume は使えません（最初から実行します）")
+        if args.resume and journal and journal.written(OUTPUT_SHEET_NAME):
+            logger.info(f"本日（{journal.run_date}）の結果は書き込み済みです")
+            return
+        
+        sink = None
+        if SHEET_STREAMING and not journal:
+            logger.warning("RUN_JOURNAL=False のため SHEET_STREAMING は使えません（最後にまとめて書き込みます）")
+        elif SHEET_STREAMING:
+            sink = SheetSink(
+                sheets_client,
+                OUTPUT_SHEET_NAME,
+                journal,
+                batch_rows=SHEET_BATCH_ROWS,
+                flush_interval=SHEET_FLUSH_INTERVAL,
+                min_write_interval=SHEET_MIN_WRITE_INTERVAL
+            )
+        
         # 入力データを読み取る
         logger.info("入力データを読み取っています...")
         sku_list = sheets_client.read_input_data(INPUT_SHEET_NAME)
@@ -165,19 +612,66 @@ def main():
             logger.warning("処理対象のSKUがありません")
             return
         
+        # 本日既に実行済みかチェック（再開する場合は途中まで書き込んだ行があるためジャーナルで判定する）
+        if not args.resume and check_already_run_today(sheets_client, sku_list):
+            return
+        
         logger.info(f"{len(sku_list)} 個のSKUを処理します")
         
-        # 全SKUに対して検索を実行
-        all_results = []
-        for sku_data in sku_list:
-            results = search_rankings(sku_data)
-            all_results.extend(results)
+        time_budget = args.time_budget
+        if time_budget is None and TIME_BUDGET:
+            time_budget = parse_duration(TIME_BUDGET)
+        use_scheduler = SCHEDULER or time_budget is not None
+        history = sheets_client.read_ranking_history(OUTPUT_SHEET_NAME) if ADAPTIVE_DEPTH or use_scheduler else []
+        
+        # 履歴から長期圏外の組み合わせを調べ、検索ページ数を決める
+        depth_policy = None
+        if ADAPTIVE_DEPTH:
+            depth_policy = DepthPolicy(
+                history,
+                max_pages=MAX_SEARCH_PAGES,
+                out_of_range_days=OUT_OF_RANGE_DAYS,
+                probe_pages=OUT_OF_RANGE_PROBE_PAGES,
+                full_scan_interval=OUT_OF_RANGE_FULL_SCAN_DAYS
+            )
+        
+        # 優先度・前回確認からの日数・順位の変動と、ジャーナルに記録した検索秒数から検索する順を決める
+        scheduler = None
+        if use_scheduler:
+            scheduler = RunScheduler(
+                history,
+                journal.keyword_costs() if journal else {},
+                lane_workers={
+                    'amazon': AMAZON_CONCURRENCY * max(1, args.workers),
+                    'rakuten': RAKUTEN_CONCURRENCY * max(1, args.workers)
+                },
+                default_cost=DEFAULT_KEYWORD_COST,
+                default_priority=DEFAULT_PRIORITY
+            )
+        
+        # 全SKUに対して検索を実行（キーワード単位で1回ずつ巡回）
+        all_results = search_all_rankings(
+            sku_list,
+            workers=args.workers,
+            depth_policy=depth_policy,
+            journal=journal,
+            resume=args.resume,
+            sink=sink,
+            scheduler=scheduler,
+            time_budget=time_budget
+        )
         
         # 結果をスプレッドシートに書き込む
-        if all_results:
+        if sink:
+            written = sink.finish(all_results)
+            logger.info(f"合計 {written} 件の結果を書き込みました（検索中の順次書き込みを含む）")
+        elif all_results:
             logger.info("結果をスプレッドシートに書き込んでいます...")
-            sheets_client.write_ranking_data(all_results, OUTPUT_SHEET_NAME)
+            # 常駐モードが本日分を書き込んでいたSKU×キーワードは、その行を上書きする
+            sheets_client.upsert_ranking_data(all_results, OUTPUT_SHEET_NAME)
             logger.info(f"合計 {len(all_results)} 件の結果を書き込みました")
+        if journal and all_results:
+            journal.mark_written(OUTPUT_SHEET_NAME, len(all_results))
         
         logger.info("検索順位モニタリングツールが正常に完了しました")
         
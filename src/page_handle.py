@@ -0,0 +1,314 @@
+"""
+スクレイパーが操作するページのハンドル
+
+スクレイパーはブラウザ（WebDriver）を直接扱わず、ページハンドル経由で
+ページの読み込み・スクリプト実行・HTML取得を行う。
+ブラウザを1つ占有する DriverPage と、1つのブラウザのタブを共有する TabPage がある。
+"""
+
+import os
+import signal
+import threading
+import time
+from typing import Any, Callable, Optional
+from urllib.request import urlopen
+from selenium.common.exceptions import TimeoutException
+from loguru import logger
+
+try:
+    import psutil
+except ImportError:  # psutilが無い場合はプロセスグループごと終了する
+    psutil = None
+
+
+# 子プロセスを同じプロセスグループにまとめて起動するための subprocess.Popen の引数
+# （psutilが無くても、グループごと終了すれば子プロセスまで終了できる）
+NEW_SESSION_POPEN_KW = {'start_new_session': True} if os.name == 'posix' else {}
+
+
+def kill_process_tree(pid: int):
+    """
+    プロセスとその子プロセス（ChromeDriverの下のChrome本体など）を強制終了
+
+    psutilが無い場合、プロセスがグループのリーダー（NEW_SESSION_POPEN_KW で起動した）なら
+    プロセスグループごと、それ以外はそのプロセスだけを終了する。
+
+    Args:
+        pid: プロセスID
+    """
+    if psutil is None:
+        try:
+            if hasattr(os, 'killpg') and os.getpgid(pid) == pid:
+                os.killpg(pid, signal.SIGKILL)
+            else:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError:
+            pass
+        return
+    try:
+        process = psutil.Process(pid)
+        processes = process.children(recursive=True) + [process]
+    except psutil.Error:
+        return
+    for child in processes:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+
+
+def kill_driver(driver):
+    """
+    応答しないSeleniumドライバーのプロセスを強制終了（止まっているコマンドはエラーで戻る）
+
+    Args:
+        driver: Seleniumドライバー
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is not None:
+        kill_process_tree(process.pid)
+
+
+class PageHandle:
+    """ページハンドルの共通インターフェース"""
+
+    def get(self, url: str):
+        """URLを読み込む"""
+        raise NotImplementedError
+
+    def execute_script(self, script: str, *args) -> Any:
+        """ページ内でJavaScriptを実行して結果を返す"""
+        raise NotImplementedError
+
+    @property
+    def page_source(self) -> str:
+        """現在のページのHTML"""
+        raise NotImplementedError
+
+    def close(self):
+        """ページ（ブラウザ・タブ）を閉じる"""
+        raise NotImplementedError
+
+    def kill(self):
+        """応答しないページを強制的に止める（ウォッチドッグの監視スレッドから呼ばれる）"""
+        raise NotImplementedError
+
+    @property
+    def killed(self) -> bool:
+        """ページのブラウザが強制終了されたか（同じブラウザの別のページが期限を過ぎた場合を含む）"""
+        return False
+
+
+class DriverPage(PageHandle):
+    """Chromeを1つ占有するページハンドル"""
+
+    def __init__(self, driver):
+        """
+        Args:
+            driver: Seleniumドライバー
+        """
+        self.driver = driver
+        self._killed = False
+
+    def get(self, url: str):
+        """
+        URLを読み込む
+
+        ページ読み込みのタイムアウト（set_page_load_timeout）を過ぎた場合は読み込みを止めて戻る。
+        途中まで読み込めていれば結果を判定できるため、判定は wait_for_page に任せる。
+        """
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            logger.warning(f"ページの読み込みがタイムアウトしたため中断します: {url}")
+            self.driver.execute_script('window.stop()')
+
+    def execute_script(self, script: str, *args) -> Any:
+        """ページ内でJavaScriptを実行して結果を返す"""
+        return self.driver.execute_script(script, *args)
+
+    @property
+    def page_source(self) -> str:
+        """現在のページのHTML"""
+        return self.driver.page_source
+
+    def close(self):
+        """ブラウザを終了"""
+        self.driver.quit()
+
+    def kill(self):
+        """ブラウザを強制終了（プールに返すと作り直される）"""
+        self._killed = True
+        kill_driver(self.driver)
+
+    @property
+    def killed(self) -> bool:
+        """ブラウザを強制終了したか"""
+        return self._killed
+
+
+class SharedDriver:
+    """複数のタブから共有されるSeleniumドライバー
+
+    WebDriverは同時に1つのウィンドウしか操作できないため、コマンドごとに
+    ロックを取って対象のタブに切り替える。ページの読み込みはロックを持たずに
+    待つので、複数タブの読み込みは並行して進む。
+    """
+
+    def __init__(self, driver):
+        """
+        Args:
+            driver: pageLoadStrategy=none で起動したSeleniumドライバー
+        """
+        self.driver = driver
+        self.lock = threading.RLock()
+        self.killed = False  # ブラウザを強制終了したか（全タブの操作がエラーで戻る）
+        self._current_handle: Optional[str] = None
+
+    def run(self, handle: str, command: Callable[[Any], Any]) -> Any:
+        """
+        指定したタブに切り替えてコマンドを実行
+
+        Args:
+            handle: タブのウィンドウハンドル
+            command: ドライバーを受け取って処理する関数
+
+        Returns:
+            commandの戻り値
+        """
+        with self.lock:
+            if self._current_handle != handle:
+                self.driver.switch_to.window(handle)
+                self._current_handle = handle
+            return command(self.driver)
+
+    def open_tab(self) -> str:
+        """
+        新しいタブを開く
+
+        Returns:
+            タブのウィンドウハンドル
+        """
+        with self.lock:
+            self.driver.switch_to.new_window('tab')
+            self._current_handle = self.driver.current_window_handle
+            return self._current_handle
+
+    def close_tab(self, handle: str):
+        """タブを閉じる"""
+        with self.lock:
+            self.run(handle, lambda driver: driver.close())
+            self._current_handle = None
+
+    def close_target(self, handle: str, timeout: float = 5) -> bool:
+        """
+        WebDriverを経由せずにタブを閉じる（応答しないコマンドが共有ドライバーのロックを持っていても使える）
+
+        ChromeのリモートデバッグのHTTPエンドポイント（/json/close）でタブのターゲットを閉じる。
+        ChromeDriverのウィンドウハンドルはCDPのターゲットIDと同じ。タブが閉じると止まっていた
+        コマンドはエラーで戻るため、ロックが空くまで待ち、操作対象を残っているタブに移す。
+
+        Args:
+            handle: タブのウィンドウハンドル
+            timeout: タブを閉じる要求とロックが空くのを待つ最大秒数
+
+        Returns:
+            タブを閉じ、ロックが空いた場合True
+        """
+        address = (self.driver.capabilities.get('goog:chromeOptions') or {}).get('debuggerAddress')
+        if not address:
+            return False
+        try:
+            urlopen(f'http://{address}/json/close/{handle}', timeout=timeout).close()
+        except Exception as e:
+            logger.warning(f"タブを閉じられませんでした: {e}")
+            return False
+
+        if not self.lock.acquire(timeout=timeout):
+            return False
+        try:
+            self._current_handle = None
+            handles = self.driver.window_handles
+            if handles:
+                self.driver.switch_to.window(handles[0])
+                self._current_handle = handles[0]
+        except Exception as e:
+            logger.debug(f"残っているタブへの切り替えエラー: {e}")
+        finally:
+            self.lock.release()
+        return True
+
+    def kill(self):
+        """ブラウザを強制終了（全タブの操作がエラーで戻る）"""
+        self.killed = True
+        kill_driver(self.driver)
+
+
+class TabPage(PageHandle):
+    """1つのChromeのタブを使うページハンドル"""
+
+    def __init__(self, shared: SharedDriver, handle: str, navigation_timeout: float = 5):
+        """
+        Args:
+            shared: タブを持つ共有ドライバー
+            handle: タブのウィンドウハンドル
+            navigation_timeout: 新しいページへの切り替わりを待つ最大秒数
+        """
+        self.shared = shared
+        self.handle = handle
+        self.navigation_timeout = navigation_timeout
+        self.pages = 0  # このタブで読み込んだページ数
+
+    def get(self, url: str):
+        """
+        URLの読み込みを開始し、新しいドキュメントに切り替わるまで待つ
+
+        読み込み完了までは待たない（結果の判定は wait_for_page で行う）。
+        切り替わりを確認するのは、前に表示していたページを新しいページと誤判定しないため。
+        """
+        def navigate(driver):
+            origin = driver.execute_script('return performance.timeOrigin')
+            driver.execute_script('window.location.href = arguments[0]', url)
+            return origin
+
+        origin = self.shared.run(self.handle, navigate)
+        deadline = time.monotonic() + self.navigation_timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.execute_script('return performance.timeOrigin') != origin:
+                    return
+            except Exception as e:
+                logger.debug(f"タブの切り替わり確認エラー: {e}")
+            time.sleep(0.05)
+        logger.debug(f"タブが新しいページに切り替わりませんでした: {url}")
+
+    def execute_script(self, script: str, *args) -> Any:
+        """タブ内でJavaScriptを実行して結果を返す"""
+        return self.shared.run(self.handle, lambda driver: driver.execute_script(script, *args))
+
+    @property
+    def page_source(self) -> str:
+        """タブに表示中のページのHTML"""
+        return self.shared.run(self.handle, lambda driver: driver.page_source)
+
+    def close(self):
+        """タブを閉じる"""
+        self.shared.close_tab(self.handle)
+
+    def kill(self):
+        """
+        応答しないタブだけを閉じる（閉じられない場合はブラウザごと強制終了する）
+
+        応答しないコマンドは共有ドライバーのロックを持ったままのため、他のタブも操作できない。
+        まずCDPでこのタブだけを閉じ、ロックが空かない場合はブラウザを強制終了する
+        （他のタブで取得中のページは killed を見て新しいブラウザで取得し直される）。
+        """
+        if self.shared.close_target(self.handle):
+            logger.info(f"応答しないタブを閉じました: {self.handle}")
+            return
+        self.shared.kill()
+
+    @property
+    def killed(self) -> bool:
+        """タブを持つブラウザが強制終了されたか"""
+        return self.shared.killed
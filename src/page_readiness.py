@@ -0,0 +1,135 @@
+"""
+検索結果ページの準備完了を検知するモジュール
+
+暗黙的待機（implicitly_wait）と明示的待機を重ねず、1回のスクリプト実行で
+「結果あり・該当なし・ブロック」のいずれかになった時点ですぐに戻る。
+"""
+
+import time
+from typing import List, NamedTuple, Optional
+from loguru import logger
+
+
+class PageState:
+    """ページの判定結果"""
+    READY = 'ready'  # 検索結果が表示された
+    NO_RESULTS = 'no_results'  # 該当商品なしのページ
+    BLOCKED = 'blocked'  # ロボット確認・アクセス拒否などのブロックページ
+    TIMEOUT = 'timeout'  # いずれも検知できないまま時間切れ
+    CANCELLED = 'cancelled'  # 先読みが不要になりリクエストしなかった
+
+
+class PageMarkers(NamedTuple):
+    """ページの状態を判定するための目印"""
+    ready_selector: str  # 検索結果カードのCSSセレクタ
+    ready_marker: str  # HTMLに含まれていれば結果ありとみなす文字列
+    no_results_texts: List[str]  # 該当商品なしのページに含まれる文言
+    blocked_selectors: List[str]  # ブロックページに含まれる要素のCSSセレクタ
+    blocked_texts: List[str]  # ブロックページに含まれる文言
+
+
+class Readiness(NamedTuple):
+    """ページの判定結果と準備完了までの時間"""
+    state: str
+    elapsed: float  # 読み込み開始から判定までの秒数
+
+
+AMAZON_MARKERS = PageMarkers(
+    ready_selector='[data-component-type="s-search-result"]',
+    ready_marker='s-search-result',
+    no_results_texts=['に一致する商品はありませんでした', 'No results for'],
+    blocked_selectors=['form[action="/errors/validateCaptcha"]', '#captchacharacters'],
+    blocked_texts=[
+        'ロボットではないことを証明', 'Enter the characters you see below',
+        'api-services-support@amazon.com', '/errors/validateCaptcha',
+    ],
+)
+
+RAKUTEN_MARKERS = PageMarkers(
+    ready_selector='.searchresultitem',
+    ready_marker='searchresultitem',
+    no_results_texts=['該当する商品が見つかりませんでした', '該当する商品はありませんでした'],
+    blocked_selectors=['iframe[src*="recaptcha"]', '#px-captcha'],
+    blocked_texts=['Access Denied', 'アクセスが集中', '不正なアクセス'],
+)
+
+
+# 1回のポーリングで状態を判定するスクリプト
+# 結果カードがあってもDOMの構築中（readyState=loading）は、カードが出揃っていないため待つ
+# （PAGE_LOAD_STRATEGY=none でも途中までのカードで数えないようにする）
+_CLASSIFY_SCRIPT = r"""
+const m = arguments[0];
+if (document.querySelector(m.ready_selector)) {
+    return document.readyState === 'loading' ? null : 'ready';
+}
+if (m.blocked_selectors.some(s => document.querySelector(s))) {
+    return 'blocked';
+}
+if (document.readyState === 'loading' || !document.body) {
+    return null;
+}
+const text = document.body.textContent || '';
+if (m.blocked_texts.some(t => text.includes(t))) {
+    return 'blocked';
+}
+if (m.no_results_texts.some(t => text.includes(t))) {
+    return 'no_results';
+}
+return null;
+"""
+
+
+def wait_for_page(page, markers: PageMarkers, timeout: float = 10, poll_interval: float = 0.1,
+                  started_at: Optional[float] = None) -> Readiness:
+    """
+    ページが判定可能な状態になるまで待つ
+
+    Args:
+        page: ページハンドル（src.page_handle、implicitly_waitは0であること）
+        markers: 判定用の目印
+        timeout: 最大待ち時間（秒）
+        poll_interval: 判定の間隔（秒）
+        started_at: 読み込み開始時刻（time.monotonic()、Noneの場合は呼び出し時点）
+
+    Returns:
+        判定結果と準備完了までの時間
+    """
+    started_at = started_at if started_at is not None else time.monotonic()
+    deadline = started_at + timeout
+    script_args = markers._asdict()
+
+    while True:
+        try:
+            state = page.execute_script(_CLASSIFY_SCRIPT, script_args)
+        except Exception as e:
+            logger.debug(f"ページ状態の判定エラー: {e}")
+            state = None
+
+        now = time.monotonic()
+        if state:
+            return Readiness(state, now - started_at)
+        if now >= deadline:
+            return Readiness(PageState.TIMEOUT, now - started_at)
+        time.sleep(min(poll_interval, deadline - now))
+
+
+def classify_html(html: Optional[str], markers: PageMarkers) -> str:
+    """
+    取得済みのHTMLからページの状態を判定（HTTP取得用）
+
+    Args:
+        html: ページのHTML
+        markers: 判定用の目印
+
+    Returns:
+        PageStateのいずれか（判定できない場合はTIMEOUT）
+    """
+    if not html:
+        return PageState.TIMEOUT
+    if markers.ready_marker in html:
+        return PageState.READY
+    if any(text in html for text in markers.blocked_texts):
+        return PageState.BLOCKED
+    if any(text in html for text in markers.no_results_texts):
+        return PageState.NO_RESULTS
+    return PageState.TIMEOUT
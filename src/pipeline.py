@@ -0,0 +1,330 @@
+"""
+ページの取得と解析を別々のワーカーで並行して進めるパイプライン
+
+取得ワーカー（スレッド）はマーケットプレイスごとに検索結果ページを取得し、解析前のページを
+上限付きのキューに入れる。解析ワーカーはキューから取り出して別プロセスで解析し、
+キーワードの順位を更新する。続きのページが必要なキーワードは取得キューに戻す。
+
+1キーワードにつき取得中・解析中のページは常に1つだけなので、ページの順番と打ち切りの判定は
+キーワードごとの逐次検索と同じで、取得ページ数も増えない。取得ワーカーはあるキーワードの解析を
+待たずに別のキーワードのページを取得するため、ブラウザもCPUも空きにくい。
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from src.concurrency import AdaptiveConcurrency
+from src.page_readiness import PageState
+from src.rank_state import RankState
+from src.run_journal import RunJournal
+from src.search_planner import SearchPlan
+from src.serp_parser import RawPage, parse_raw_page
+
+
+class StageStats:
+    """パイプラインの1段階の稼働時間の集計"""
+
+    def __init__(self, name: str, workers: int):
+        """
+        Args:
+            name: ログに表示する段階の名前
+            workers: 段階のワーカー数
+        """
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0  # ワーカーが処理していた秒数の合計
+        self._lock = threading.Lock()
+
+    def add(self, busy: float):
+        """1件分の処理時間を記録"""
+        with self._lock:
+            self.items += 1
+            self.busy += busy
+
+    def utilization(self, elapsed: float) -> float:
+        """経過時間に対するワーカーの稼働率（0〜1）"""
+        if elapsed <= 0 or self.workers <= 0:
+            return 0.0
+        return min(1.0, self.busy / (elapsed * self.workers))
+
+
+class SearchPipeline:
+    """取得と解析を分けて検索計画を実行するクラス"""
+
+    def __init__(
+        self,
+        scraper_factory: Callable[[str], Any],
+        fetch_workers: Dict[str, int],
+        parse_workers: int = 0,
+        queue_size: int = 32,
+        max_pages: int = 5,
+        concurrency: Optional[Dict[str, AdaptiveConcurrency]] = None,
+        stats_interval: float = 30,
+        journal: Optional[RunJournal] = None,
+        keyword_deadline: float = 0
+    ):
+        """
+        Args:
+            scraper_factory: マーケットプレイス名からスクレイパーを作る関数（AsyncSearchEngine.create_scraper）
+            fetch_workers: マーケットプレイスごとの取得ワーカー数（concurrencyを指定した場合はその上限を使う）
+            parse_workers: 解析プロセス数（0の場合はCPUコア数）
+            queue_size: 解析待ちのページを置いておくキューの上限（満杯になると取得ワーカーが待つ）
+            max_pages: 最大検索ページ数
+            concurrency: マーケットプレイスごとの同時実行数コントローラー（取得ワーカーの同時実行数を調整）
+            stats_interval: キューの深さと稼働率をログに出す間隔（秒）
+            journal: 検索し終えたキーワードの順位を記録するジャーナル（Noneの場合は記録しない）
+            keyword_deadline: 1キーワードの検索の期限（秒、1ページ目の取得開始から数える、0で無効）
+        """
+        self.scraper_factory = scraper_factory
+        self.concurrency = concurrency or {}
+        self.fetch_workers = {
+            marketplace: max(1, self.concurrency[marketplace].maximum if marketplace in self.concurrency else workers)
+            for marketplace, workers in fetch_workers.items()
+        }
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = max(1, queue_size)
+        self.max_pages = max_pages
+        self.stats_interval = stats_interval
+        self.journal = journal
+        self.keyword_deadline = keyword_deadline
+
+        self._fetch_queues: Dict[str, queue.Queue] = {}
+        self._parse_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._fetch_stats = StageStats('取得', sum(self.fetch_workers.values()))
+        self._parse_stats = StageStats('解析', self.parse_workers)
+        self._queue_wait = 0.0  # キューが満杯で取得ワーカーが待った秒数の合計
+        self._depth_samples = 0
+        self._depth_total = 0
+        self._depth_max = 0
+        self._started_at = 0.0
+        self._pending = 0  # 順位が確定していないキーワード数
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def _put_parse(self, item: tuple):
+        """解析待ちのキューにページを入れる（満杯の場合は空くまで待つ）"""
+        started_at = time.monotonic()
+        self._parse_queue.put(item)
+        with self._lock:
+            self._queue_wait += time.monotonic() - started_at
+            depth = self._parse_queue.qsize()
+            self._depth_samples += 1
+            self._depth_total += depth
+            self._depth_max = max(self._depth_max, depth)
+
+    def _fetch_worker(self, marketplace: str):
+        """取得キューのページを取得し、解析前のページを解析キューに入れる"""
+        fetch_queue = self._fetch_queues[marketplace]
+        concurrency = self.concurrency.get(marketplace)
+        while True:
+            job = fetch_queue.get()
+            if job is None:
+                return
+            rank_state, page = job
+
+            state, raw_page = PageState.TIMEOUT, None
+            try:
+                state, raw_page = self._fetch_page(marketplace, concurrency, rank_state, page)
+            except Exception as e:
+                logger.error(f"{marketplace}取得エラー: キーワード='{rank_state.keyword}', ページ={page} - {e}")
+            finally:
+                # 取得に失敗してもページは必ず解析キューに渡す（解析側でキーワードを終わらせる）
+                self._put_parse((marketplace, rank_state, page, state, raw_page))
+
+    def _fetch_page(self, marketplace: str, concurrency: Optional[AdaptiveConcurrency],
+                    rank_state: RankState, page: int) -> Tuple[str, Optional[RawPage]]:
+        """
+        1ページを取得（同時実行数の枠を使い、かかった時間を記録する）
+
+        Returns:
+            ページの状態（PageState）と、結果ありの場合は解析前のページ
+        """
+        if concurrency:
+            concurrency.acquire()
+        started_at = time.monotonic()
+        if rank_state.started_at is None:
+            rank_state.started_at = started_at
+        try:
+            # ブラウザはページごとにプールから借りて返す（解析中に他のキーワードが使えるように）
+            with self.scraper_factory(marketplace) as scraper:
+                return scraper.fetch_search_page(rank_state.keyword, page)
+        finally:
+            if concurrency:
+                concurrency.release()
+            elapsed = time.monotonic() - started_at
+            self._fetch_stats.add(elapsed)
+            rank_state.elapsed += elapsed
+
+    def _keyword_expired(self, rank_state: RankState) -> bool:
+        """キーワードの検索の期限を過ぎたか"""
+        if not self.keyword_deadline or rank_state.started_at is None:
+            return False
+        return time.monotonic() - rank_state.started_at >= self.keyword_deadline
+
+    def _parse_worker(self, executor: ProcessPoolExecutor, counters: Dict[str, Callable],
+                      recorders: Dict[str, Callable], results: Dict[str, Dict[str, Dict[str, Optional[int]]]]):
+        """解析キューのページを別プロセスで解析し、順位を更新する"""
+        while True:
+            item = self._parse_queue.get()
+            if item is None:
+                return
+            marketplace, rank_state, page, state, raw_page = item
+
+            # 途中で例外が出てもキーワードは終わらせる（残りが0にならないと run が戻らない）
+            done = True
+            try:
+                started_at = time.monotonic()
+                try:
+                    parsed_page = None
+                    if raw_page is not None:
+                        parsed_page = executor.submit(parse_raw_page, marketplace, raw_page).result()
+                    rank_state.add_page(page, state, parsed_page, counters[marketplace])
+                except Exception as e:
+                    logger.error(f"{marketplace}解析エラー: キーワード='{rank_state.keyword}', ページ={page} - {e}")
+                    rank_state.fail()
+                elapsed = time.monotonic() - started_at
+                self._parse_stats.add(elapsed)
+                rank_state.elapsed += elapsed
+
+                if not rank_state.done and self._keyword_expired(rank_state):
+                    # 残りのターゲットは「不明」になり、--resume や常駐モードで検索し直す
+                    logger.warning(f"{marketplace}検索の期限（{self.keyword_deadline:.0f}秒）を過ぎたため打ち切ります: キーワード='{rank_state.keyword}'")
+                    rank_state.add_page(page + 1, PageState.TIMEOUT, None, counters[marketplace])
+
+                done = rank_state.done
+                if not done:
+                    self._fetch_queues[marketplace].put((rank_state, page + 1))
+                    continue
+
+                ranks = rank_state.finish()
+                results[marketplace][rank_state.keyword] = ranks
+                recorders[marketplace](rank_state)
+                if self.journal:
+                    self.journal.record(marketplace, rank_state.keyword, ranks, rank_state.elapsed)
+            except Exception as e:
+                logger.error(f"{marketplace}集計エラー: キーワード='{rank_state.keyword}', ページ={page} - {e}")
+                results[marketplace][rank_state.keyword] = rank_state.fail()
+            finally:
+                if done:
+                    self._complete_keyword(marketplace, len(results[marketplace]))
+
+    def _complete_keyword(self, marketplace: str, completed: int):
+        """キーワードを1件終えたことを記録し、全て終わったら run に知らせる"""
+        with self._lock:
+            self._pending -= 1
+            pending = self._pending
+        logger.info(f"[{marketplace}] 進捗: {completed} キーワード完了（残り {pending}）")
+        if pending == 0:
+            self._finished.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キューの深さと段階ごとの稼働率
+
+        Returns:
+            経過秒数、取得・解析の稼働率と件数、解析キューの深さ（現在・平均・最大）、
+            取得ワーカーがキューの空きを待った秒数
+        """
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            average_depth = self._depth_total / self._depth_samples if self._depth_samples else 0.0
+            depth_max = self._depth_max
+            queue_wait = self._queue_wait
+        return {
+            'elapsed': elapsed,
+            'fetch_utilization': self._fetch_stats.utilization(elapsed),
+            'parse_utilization': self._parse_stats.utilization(elapsed),
+            'fetched_pages': self._fetch_stats.items,
+            'parsed_pages': self._parse_stats.items,
+            'queue_depth': self._parse_queue.qsize(),
+            'queue_depth_average': average_depth,
+            'queue_depth_max': depth_max,
+            'queue_size': self.queue_size,
+            'queue_wait': queue_wait,
+            'fetch_backlog': {marketplace: q.qsize() for marketplace, q in self._fetch_queues.items()},
+        }
+
+    def _log_stats(self, final: bool = False):
+        """キューの深さと稼働率をログに出す"""
+        stats = self.stats()
+        # 解析キューが埋まって取得が待たされているなら解析、空に近いなら取得が律速
+        bottleneck = '解析' if stats['queue_depth_average'] >= self.queue_size * 0.8 else '取得'
+        logger.info(
+            f"パイプライン{'統計' if final else '状況'}: "
+            f"取得 {stats['fetched_pages']}ページ（稼働率 {stats['fetch_utilization']:.0%}）, "
+            f"解析 {stats['parsed_pages']}ページ（稼働率 {stats['parse_utilization']:.0%}）, "
+            f"解析キュー {stats['queue_depth']}/{self.queue_size}"
+            f"（平均 {stats['queue_depth_average']:.1f}, 最大 {stats['queue_depth_max']}）, "
+            f"キュー待ち {stats['queue_wait']:.1f}秒, ボトルネック: {bottleneck}"
+        )
+
+    def run(self, plan: SearchPlan) -> Dict[str, Dict[str, Dict[str, Optional[int]]]]:
+        """
+        検索計画の全キーワードを取得・解析のパイプラインで検索
+
+        Args:
+            plan: 検索計画
+
+        Returns:
+            マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+        """
+        results: Dict[str, Dict[str, Dict[str, Optional[int]]]] = {marketplace: {} for marketplace in self.fetch_workers}
+        counters = {}
+        recorders = {}
+        self._fetch_queues = {marketplace: queue.Queue() for marketplace in self.fetch_workers}
+        for marketplace in self.fetch_workers:
+            scraper = self.scraper_factory(marketplace)
+            counters[marketplace] = scraper.counts_toward_rank
+            recorders[marketplace] = scraper.record_snapshot
+            depths = plan.depths(marketplace)
+            for keyword, targets in plan.targets(marketplace).items():
+                rank_state = scraper.new_rank_state(keyword, targets, self.max_pages, depths.get(keyword))
+                if rank_state.done:
+                    results[marketplace][keyword] = rank_state.ranks
+                    continue
+                self._pending += 1
+                self._fetch_queues[marketplace].put((rank_state, 1))
+
+        if not self._pending:
+            return results
+
+        logger.info(
+            f"パイプラインで {self._pending} 件のキーワード検索を開始します"
+            f"（取得ワーカー {self.fetch_workers}, 解析プロセス {self.parse_workers}, 解析キュー上限 {self.queue_size}）"
+        )
+        self._started_at = time.monotonic()
+        # 取得ワーカーのスレッドがある状態でforkしないよう、解析プロセスはspawnで起動する
+        with ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            threads: List[threading.Thread] = []
+            for marketplace, workers in self.fetch_workers.items():
+                threads += [
+                    threading.Thread(target=self._fetch_worker, args=(marketplace,), name=f'{marketplace}-fetch', daemon=True)
+                    for _ in range(workers)
+                ]
+            parsers = [
+                threading.Thread(target=self._parse_worker, args=(executor, counters, recorders, results), name='parse', daemon=True)
+                for _ in range(self.parse_workers)
+            ]
+            for thread in threads + parsers:
+                thread.start()
+
+            while not self._finished.wait(self.stats_interval):
+                self._log_stats()
+
+            for marketplace, workers in self.fetch_workers.items():
+                for _ in range(workers):
+                    self._fetch_queues[marketplace].put(None)
+            for _ in parsers:
+                self._parse_queue.put(None)
+            for thread in threads + parsers:
+                thread.join()
+
+        self._log_stats(final=True)
+        return results
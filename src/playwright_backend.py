@@ -0,0 +1,285 @@
+"""
+Playwright（非同期API）を使うブラウザバックエンド
+
+Playwrightのイベントループを専用スレッドで動かし、スクレイパーからは
+他のバックエンドと同じページハンドル（src.page_handle.PageHandle）として使う。
+ページごとにブラウザコンテキストを分けるため、1つのChromiumで複数ページを並行して読み込める。
+リソースのブロックはPlaywrightのリクエストインターセプトで行う。
+
+playwrightは任意の依存パッケージ（pip install playwright && playwright install chromium）。
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+from fnmatch import fnmatch
+from typing import Any, Optional
+from loguru import logger
+
+from src.config import USER_AGENT, BLOCK_RESOURCES
+from src.browser_pool import BLOCK_PROFILES, TabPool
+from src.page_handle import PageHandle, kill_process_tree
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:  # playwrightが無い場合はSeleniumバックエンドのみ使える
+    async_playwright = None
+
+try:
+    import psutil
+except ImportError:  # psutilが無い場合はRSSによる再起動を行わない
+    psutil = None
+
+
+# URLのパターンに加えて、拡張子の無い画像・フォントもリソースの種類で止める
+_BLOCKED_RESOURCE_TYPES = {
+    'none': set(),
+    'media': {'image', 'font', 'media'},
+    'aggressive': {'image', 'font', 'media', 'stylesheet'},
+}
+
+# Seleniumの execute_script と同じく、スクリプトを関数本体として実行し arguments で引数を渡す
+_SCRIPT_WRAPPER = "args => (function() {\n%s\n}).apply(null, args)"
+
+
+class PlaywrightBrowser:
+    """専用スレッドのイベントループで動くChromium"""
+
+    def __init__(self, headless: bool = True, block_profile: str = BLOCK_RESOURCES):
+        """
+        Args:
+            headless: ヘッドレスモードで実行するか
+            block_profile: 読み込みをブロックするリソースのプロファイル（none / media / aggressive）
+        """
+        if async_playwright is None:
+            raise RuntimeError("playwrightがインストールされていません（pip install playwright && playwright install chromium）")
+        if block_profile not in BLOCK_PROFILES:
+            logger.warning(f"不明なリソースブロック設定のため無効にします: {block_profile}")
+            block_profile = 'none'
+
+        self.blocked_urls = BLOCK_PROFILES[block_profile]
+        self.blocked_types = _BLOCKED_RESOURCE_TYPES[block_profile]
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='playwright', daemon=True)
+        self._thread.start()
+
+        self.killed = False  # ブラウザを強制終了したか（全ページの操作がエラーで戻る）
+        self._playwright = self.run(async_playwright().start())
+        self._browser = self.run(self._playwright.chromium.launch(
+            headless=headless,
+            args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-blink-features=AutomationControlled'],
+        ))
+        # 強制終了・RSSの計測用に、Chromium本体のプロセスIDを覚えておく
+        self._pid = self.run(self._browser_pid(), timeout=30)
+
+    async def _browser_pid(self) -> Optional[int]:
+        """CDP（SystemInfo.getProcessInfo）でChromium本体のプロセスIDを取得（取得できない場合はNone）"""
+        try:
+            session = await self._browser.new_browser_cdp_session()
+            info = await session.send('SystemInfo.getProcessInfo')
+            await session.detach()
+        except Exception as e:
+            logger.warning(f"ブラウザのプロセスIDを取得できませんでした: {e}")
+            return None
+        return next((process['id'] for process in info.get('processInfo', []) if process.get('type') == 'browser'), None)
+
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """
+        コルーチンをブラウザのイベントループで実行して結果を待つ
+
+        Args:
+            coro: 実行するコルーチン
+            timeout: 結果を待つ最大秒数（Noneの場合は無制限、過ぎたらコルーチンを取り消して TimeoutError）
+
+        Returns:
+            コルーチンの戻り値
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def _route(self, route):
+        """ブロック対象のリソースを読み込まずに中断する"""
+        request = route.request
+        if request.resource_type in self.blocked_types or any(fnmatch(request.url, p) for p in self.blocked_urls):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_page(self):
+        """新しいブラウザコンテキストとページを作成"""
+        context = await self._browser.new_context(user_agent=USER_AGENT, locale='ja-JP')
+        if self.blocked_urls or self.blocked_types:
+            await context.route('**/*', self._route)
+        return context, await context.new_page()
+
+    def new_page(self, navigation_timeout: float = 30, owns_browser: bool = False,
+                 command_timeout: float = 30) -> 'PlaywrightPage':
+        """
+        新しいページハンドルを作成
+
+        Args:
+            navigation_timeout: ページ遷移の開始を待つ最大秒数
+            owns_browser: ページを閉じるときにブラウザも終了するか
+            command_timeout: スクリプト実行・HTML取得の結果を待つ最大秒数
+
+        Returns:
+            ページハンドル
+        """
+        context, page = self.run(self._new_page(), timeout=command_timeout)
+        return PlaywrightPage(self, context, page, navigation_timeout, owns_browser, command_timeout)
+
+    def is_connected(self) -> bool:
+        """ブラウザが動いているか"""
+        return self._browser.is_connected()
+
+    def rss_mb(self) -> Optional[float]:
+        """Chromium本体とその子プロセスのメモリ使用量（MB、psutilが無い場合はNone）"""
+        if psutil is None or self._pid is None:
+            return None
+        try:
+            process = psutil.Process(self._pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception as e:
+            logger.debug(f"メモリ使用量の取得エラー: {e}")
+            return None
+
+    def kill(self):
+        """
+        Chromiumのプロセスを強制終了（待っている操作はエラーで戻る）
+
+        PlaywrightはChromiumを新しいプロセスグループで起動するため、psutilが無くてもグループごと終了できる。
+        """
+        self.killed = True
+        if self._pid is None:
+            logger.warning("ブラウザのプロセスIDが分からないため、応答しないブラウザを強制終了できません")
+            return
+        kill_process_tree(self._pid)
+
+    def close(self):
+        """ブラウザとイベントループを終了"""
+        try:
+            self.run(self._browser.close(), timeout=30)
+            self.run(self._playwright.stop(), timeout=30)
+        except Exception as e:
+            logger.debug(f"ブラウザ終了時のエラー: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+class PlaywrightPage(PageHandle):
+    """Playwrightのブラウザコンテキスト1つを使うページハンドル"""
+
+    def __init__(self, browser: PlaywrightBrowser, context, page, navigation_timeout: float = 30,
+                 owns_browser: bool = False, command_timeout: float = 30):
+        """
+        Args:
+            browser: ページを持つブラウザ
+            context: Playwrightのブラウザコンテキスト
+            page: Playwrightのページ
+            navigation_timeout: ページ遷移の開始を待つ最大秒数
+            owns_browser: ページを閉じるときにブラウザも終了するか
+            command_timeout: スクリプト実行・HTML取得の結果を待つ最大秒数
+        """
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self.navigation_timeout = navigation_timeout
+        self.owns_browser = owns_browser
+        self.command_timeout = command_timeout
+        self.pages = 0  # このコンテキストで読み込んだページ数
+        # TabPool の管理に使う属性（shared: 属するブラウザ / handle: プール内の識別子）
+        self.shared = browser
+        self.handle = str(id(self))
+
+    def get(self, url: str):
+        """
+        URLの読み込みを開始し、新しいドキュメントに切り替わるまで待つ
+
+        読み込み完了までは待たない（結果の判定は wait_for_page で行う）。
+        """
+        # goto自体のタイムアウトで戻らない場合（ドライバーが応答しない）に備えて、待つ側にも上限を設ける
+        self.browser.run(
+            self.page.goto(url, wait_until='commit', timeout=self.navigation_timeout * 1000),
+            timeout=self.navigation_timeout + self.command_timeout
+        )
+
+    def execute_script(self, script: str, *args) -> Any:
+        """ページ内でJavaScriptを実行して結果を返す"""
+        return self.browser.run(self.page.evaluate(_SCRIPT_WRAPPER % script, list(args)), timeout=self.command_timeout)
+
+    @property
+    def page_source(self) -> str:
+        """現在のページのHTML"""
+        return self.browser.run(self.page.content(), timeout=self.command_timeout)
+
+    def kill(self):
+        """
+        応答しないページのコンテキストだけを閉じる（閉じられない場合はブラウザごと強制終了する）
+
+        コンテキストを閉じると待っている操作はエラーで戻り、プールがコンテキストを作り直す。
+        ブラウザごと強制終了した場合、同じブラウザの他のページは killed を見て新しいブラウザで取得し直される。
+        """
+        try:
+            self.browser.run(self.context.close(), timeout=5)
+            logger.info("応答しないブラウザコンテキストを閉じました")
+            return
+        except Exception as e:
+            logger.warning(f"ブラウザコンテキストを閉じられないため、ブラウザを強制終了します: {e}")
+        self.browser.kill()
+
+    @property
+    def killed(self) -> bool:
+        """ページを持つブラウザが強制終了されたか"""
+        return self.browser.killed
+
+    def close(self):
+        """ブラウザコンテキストを閉じる"""
+        try:
+            self.browser.run(self.context.close(), timeout=30)
+        finally:
+            if self.owns_browser:
+                self.browser.close()
+
+
+class PlaywrightPool(TabPool):
+    """1つのChromiumのブラウザコンテキストを貸し出し・返却するプール
+
+    貸し出し・返却・作り直しの流れは TabPool と同じで、タブの代わりにコンテキストを使う。
+    """
+
+    def _launch_browser(self) -> PlaywrightBrowser:
+        """コンテキストを持つブラウザを起動"""
+        return PlaywrightBrowser(self.headless)
+
+    def _new_tab(self) -> PlaywrightPage:
+        """新しいコンテキストを開く"""
+        return self._browser().new_page()
+
+    def _is_healthy(self, page: PlaywrightPage) -> bool:
+        """ブラウザとページが応答するか確認"""
+        return page.browser.is_connected() and super()._is_healthy(page)
+
+    def _restart_browser(self):
+        """ブラウザを終了し、全コンテキストを破棄（次の貸し出し時に起動し直す）"""
+        with self._lock:
+            browser, self._shared = self._shared, None
+            self._tabs.clear()
+            self._recycle_pending = False
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        if browser:
+            browser.close()
+
+    def rss_mb(self) -> Optional[float]:
+        """ブラウザのメモリ使用量（MB、psutilが無い場合はNone）"""
+        browser = self._shared
+        return browser.rss_mb() if browser else None
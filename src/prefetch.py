@@ -0,0 +1,108 @@
+"""
+1キーワード内の後続ページを先読みするモジュール
+
+現在のページを解析している間に次のページをHTTPで並行して取得しておく。
+結果はページ順に取り出すため、オーガニック順位の数え方は変わらない。
+ターゲットが見つかって巡回を打ち切ったら、未使用の先読みはすぐに取り消す。
+先読みはレート制限のトークンを予約しないため、他のリクエストに押されて待ち続けることがある。
+取り出すときの待ち時間には上限を設け、過ぎたらその先読みを取り消して呼び出し側で取得し直す。
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
+from loguru import logger
+
+from src.page_readiness import PageState
+from src.serp_parser import ParsedPage
+
+PageResult = Tuple[str, Optional[ParsedPage]]
+
+
+class PagePrefetcher:
+    """後続ページを先読みし、ページ順に結果を渡すクラス"""
+
+    def __init__(
+        self,
+        fetch_func: Callable[[int, threading.Event], PageResult],
+        last_page: int,
+        window: int = 1
+    ):
+        """
+        Args:
+            fetch_func: ページを取得する関数（ページ番号, 取り消しイベント）。ワーカースレッドから呼ばれる
+            last_page: 先読みする最後のページ番号
+            window: 現在のページより先に取得しておくページ数（0で先読みしない）
+        """
+        self.fetch_func = fetch_func
+        self.last_page = last_page
+        self.window = max(0, window)
+        self._futures: Dict[int, Future] = {}
+        self._cancelled: Dict[int, threading.Event] = {}  # ページごとの取り消しイベント
+        self._next_page = 2  # 次に先読みを始めるページ番号（1ページ目は呼び出し側が取得する）
+        self._executor = ThreadPoolExecutor(max_workers=self.window, thread_name_prefix='prefetch') if self.window else None
+
+    def schedule(self, page: int):
+        """
+        現在のページに続く window ページ分の先読みを開始
+
+        Args:
+            page: 現在のページ番号
+        """
+        if not self._executor:
+            return
+        last = min(page + self.window, self.last_page)
+        while self._next_page <= last:
+            cancelled = threading.Event()
+            self._cancelled[self._next_page] = cancelled
+            self._futures[self._next_page] = self._executor.submit(self.fetch_func, self._next_page, cancelled)
+            self._next_page += 1
+
+    def take(self, page: int, timeout: float = 0) -> Optional[PageResult]:
+        """
+        先読みしたページの結果を取り出す（取得中の場合は完了を待つ）
+
+        Args:
+            page: ページ番号
+            timeout: 完了を待つ最大秒数（0で無制限）。過ぎたら先読みを取り消してNoneを返す
+
+        Returns:
+            ページの状態と解析結果、先読みしていない・先読みで判定できなかった・待ちきれなかった場合はNone
+        """
+        future = self._futures.pop(page, None)
+        cancelled = self._cancelled.pop(page, None)
+        if future is None:
+            return None
+        try:
+            state, parsed_page = future.result(timeout=timeout or None)
+        except FutureTimeoutError:
+            # レート制限の空きを待ち続けている先読みは諦め、呼び出し側で取得し直す
+            cancelled.set()
+            logger.debug(f"先読みが{timeout:.0f}秒以内に終わらないため取り消しました: ページ {page}")
+            return None
+        except Exception as e:
+            logger.debug(f"先読みエラー: ページ {page} - {e}")
+            return None
+        if state in (PageState.TIMEOUT, PageState.CANCELLED):
+            return None
+        return state, parsed_page
+
+    def close(self):
+        """未使用の先読みを取り消す"""
+        for cancelled in self._cancelled.values():
+            cancelled.set()
+        unused = [page for page, future in self._futures.items() if future.cancel() or not future.done()]
+        if unused:
+            logger.debug(f"未使用の先読みを取り消しました: ページ {unused}")
+        self._futures.clear()
+        self._cancelled.clear()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
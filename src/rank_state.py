@@ -0,0 +1,197 @@
+"""
+1キーワード分の検索結果をページ順にたどって順位を集計する状態
+
+スクレイパーの逐次検索と、取得・解析を分けたパイプライン（src.pipeline）の両方で使う。
+ページは必ず1ページ目から順に反映する（途中のページを飛ばすと以降の順位がずれるため）。
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+
+from src.page_readiness import PageState
+from src.serp_parser import ParsedPage, SerpItem
+from src.ranking import RANK_UNKNOWN, is_rank_beyond, rank_beyond
+
+
+class SerpRanks(dict):
+    """
+    ターゲットと順位の辞書に、同じ走査で得たオーガニック順位・広告位置・検索結果数を添えたもの
+
+    dictとしては従来どおり「ターゲット → 順位」として扱える。
+    """
+
+    def __init__(
+        self,
+        ranks: Dict[str, Optional[int]],
+        organic_ranks: Optional[Dict[str, Optional[int]]] = None,
+        ad_positions: Optional[Dict[str, List[int]]] = None,
+        total_results: Optional[int] = None
+    ):
+        """
+        Args:
+            ranks: ターゲットと順位の辞書
+            organic_ranks: ターゲットと広告を除いた順位の辞書
+            ad_positions: ターゲットと広告として表示された位置（広告を含めた表示順）のリスト
+            total_results: キーワードの検索結果の総数
+        """
+        super().__init__(ranks)
+        self.organic_ranks = organic_ranks or {}
+        self.ad_positions = ad_positions or {}
+        self.total_results = total_results
+
+
+class RankState:
+    """1キーワード分の検索の進み具合とターゲットの順位"""
+
+    def __init__(
+        self,
+        keyword: str,
+        targets: Iterable[str],
+        max_pages: int = 5,
+        target_depths: Optional[Dict[str, int]] = None,
+        id_label: str = 'ASIN',
+        rank_label: str = '順位',
+        record_items: bool = False
+    ):
+        """
+        Args:
+            keyword: 検索キーワード
+            targets: 検索対象のASINまたは楽天商品ID
+            max_pages: 最大検索ページ数
+            target_depths: ターゲットごとの検索ページ数（指定のないターゲットはmax_pages）
+            id_label: ログに表示するIDの名前
+            rank_label: ログに表示する順位の名前
+            record_items: 確認した全商品を items に記録するか（SERPスナップショット用）
+        """
+        self.keyword = keyword
+        self.id_label = id_label
+        self.rank_label = rank_label
+        self.ranks: Dict[str, Optional[int]] = {target: None for target in targets if target}
+        self.remaining = set(self.ranks)
+        # 履歴から長期圏外と分かっているターゲットは浅いページだけ確認する
+        self.depths = {target: min(max_pages, (target_depths or {}).get(target, max_pages)) for target in self.ranks}
+        self.page_limit = max(self.depths.values(), default=0)
+        self.max_pages = max_pages
+        self.record_items = record_items
+        self.items: List[Tuple[int, SerpItem, Optional[int]]] = []  # 確認した商品（ページ番号, 商品, 順位に数えた場合の順位）
+        self.exhaustive = False  # 最終ページまたは最大検索ページ数まで確認したか
+        self.counter = 0  # 順位に数えた商品数
+        self.slot = 0  # 広告を含めて確認した商品数（表示順）
+        self.organic = 0  # 広告を除いて確認した商品数
+        self.organic_ranks: Dict[str, Optional[int]] = {target: None for target in self.ranks}
+        self.ad_positions: Dict[str, List[int]] = {target: [] for target in self.ranks}
+        self.total_results: Optional[int] = None
+        self.incomplete = False  # 途中のページを確認できなかったか
+        self.elapsed = 0.0  # 取得・解析にかかった秒数の合計
+        self.started_at: Optional[float] = None  # 1ページ目の取得を始めた時刻（time.monotonic()、パイプラインで記録）
+        self.done = not self.remaining
+
+    def add_page(self, page: int, state: str, parsed_page: Optional[ParsedPage],
+                 counts_toward_rank: Callable[[SerpItem], bool]):
+        """
+        1ページ分の結果を反映し、続けて次のページを確認するか判定する（終了したらdoneをセット）
+
+        Args:
+            page: ページ番号
+            state: ページの状態（PageState）
+            parsed_page: 結果ありの場合はページの解析結果
+            counts_toward_rank: 商品を順位に数えるか判定する関数
+        """
+        if state == PageState.NO_RESULTS:
+            logger.info(f"該当する商品がありません: ページ {page}")
+            self.exhaustive = True
+            self.done = True
+            return
+        if state != PageState.READY:
+            # 読めなかったページを飛ばすと以降の順位がずれるため、ここで打ち切る
+            logger.warning(f"検索結果を確認できませんでした（{state}）: ページ {page}")
+            self.incomplete = True
+            self.done = True
+            return
+
+        if self.total_results is None:
+            self.total_results = parsed_page.total_results
+
+        for item in parsed_page.items:
+            # 順位とは別に、同じ走査で広告の表示位置とオーガニック順位も記録する
+            self.slot += 1
+            if item.is_sponsored:
+                if item.item_id in self.ad_positions:
+                    self.ad_positions[item.item_id].append(self.slot)
+            else:
+                self.organic += 1
+                if item.item_id in self.organic_ranks and self.organic_ranks[item.item_id] is None:
+                    self.organic_ranks[item.item_id] = self.organic
+
+            if not counts_toward_rank(item):
+                if self.record_items:
+                    self.items.append((page, item, None))
+                continue
+            self.counter += 1
+            if self.record_items:
+                self.items.append((page, item, self.counter))
+
+            # ターゲットと一致するかチェック
+            if item.item_id and item.item_id in self.remaining:
+                logger.info(f"商品発見: {self.id_label}={item.item_id}, {self.rank_label}={self.counter}")
+                self.ranks[item.item_id] = self.counter
+                self.remaining.discard(item.item_id)
+
+        self.exhaustive = not parsed_page.has_next or page >= self.max_pages
+        if not self.remaining:
+            self.done = True
+        elif all(self.depths[target] <= page for target in self.remaining):
+            logger.info(f"残りのターゲットの検索ページ数の上限に到達しました: ページ {page}")
+            self.done = True
+        elif not parsed_page.has_next:
+            logger.info("最終ページに到達しました")
+            self.done = True
+        elif page >= self.page_limit:
+            self.done = True
+
+    def _result(self) -> SerpRanks:
+        """順位にオーガニック順位・広告位置・検索結果数を添える"""
+        organic_ranks = {}
+        for target, organic_rank in self.organic_ranks.items():
+            if organic_rank is None:
+                if target in self.remaining and is_rank_beyond(self.ranks[target]):
+                    organic_rank = rank_beyond(self.organic)
+                elif target in self.remaining:
+                    organic_rank = self.ranks[target]
+                elif not self.exhaustive:
+                    # 広告として見つけた時点で打ち切った場合、オーガニック順位は確認できていない
+                    organic_rank = RANK_UNKNOWN
+            organic_ranks[target] = organic_rank
+        return SerpRanks(self.ranks, organic_ranks, self.ad_positions, self.total_results)
+
+    def finish(self) -> SerpRanks:
+        """
+        見つからなかったターゲットを確定して順位を返す
+
+        Returns:
+            ターゲットと順位の辞書（圏外はNone、確認できなかった場合はRANK_UNKNOWN、
+            検索ページ数を減らして確認した範囲に無かった場合はrank_beyondの値）
+        """
+        for target in self.remaining:
+            if self.incomplete:
+                logger.warning(f"順位を確認できませんでした: {self.id_label}={target}")
+                self.ranks[target] = RANK_UNKNOWN
+            elif not self.exhaustive:
+                # 最終ページ・最大ページ数まで確認していないため「圏外」とは確定しない
+                logger.info(f"確認した {self.counter} 位までに見つかりませんでした: {self.id_label}={target}")
+                self.ranks[target] = rank_beyond(self.counter)
+            else:
+                logger.info(f"商品が見つかりませんでした: {self.id_label}={target}")
+        return self._result()
+
+    def fail(self) -> SerpRanks:
+        """
+        エラーで中断した場合に、見つかっていないターゲットを「不明」にして順位を返す
+
+        Returns:
+            ターゲットと順位の辞書
+        """
+        for target in self.remaining:
+            self.ranks[target] = RANK_UNKNOWN
+        self.done = True
+        return self._result()
@@ -0,0 +1,129 @@
+"""
+順位の値とスプレッドシート上の表記
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+# 検索結果を最後まで確認できなかった（タイムアウト・ブロック等）ことを表す順位
+RANK_UNKNOWN = 'unknown'
+
+# 検索ページ数を減らして確認した範囲に無かったことを表す順位の接頭辞（'>48' は48位までに無かった）
+RANK_BEYOND_PREFIX = '>'
+
+NOT_RANKED_LABEL = '圏外'
+UNKNOWN_LABEL = '不明'
+
+Rank = Union[int, str, None]
+
+
+def rank_beyond(checked: int) -> str:
+    """
+    検索ページ数を減らして確認した範囲に見つからなかったことを表す順位
+
+    最大ページ数まで確認していないため「圏外」とは確定できず、履歴の連続圏外回数にも数えない。
+
+    Args:
+        checked: 確認した順位の数
+
+    Returns:
+        「>確認した順位の数」の形の順位
+    """
+    return f'{RANK_BEYOND_PREFIX}{checked}'
+
+
+def is_rank_beyond(value: Any) -> bool:
+    """
+    rank_beyond の順位、またはそのシートの表記（「>48位」）か
+
+    Args:
+        value: 順位またはセルの値
+
+    Returns:
+        確認した範囲に見つからなかったことを表す場合True
+    """
+    return isinstance(value, str) and value.startswith(RANK_BEYOND_PREFIX)
+
+# ランキングシート・CSVの列
+RANKING_HEADERS = [
+    '日付', 'SKU名', 'キーワード', 'Amazon順位', '楽天順位',
+    'Amazon広告位置', 'Amazon検索結果数', '楽天オーガニック順位', '楽天広告位置', '楽天検索結果数'
+]
+
+
+def format_rank(rank: Rank) -> Union[int, str]:
+    """
+    順位をスプレッドシートの表記に変換
+
+    Args:
+        rank: 順位（見つからない場合はNone、確認できなかった場合はRANK_UNKNOWN、減らしたページ数で見つからなかった場合はrank_beyondの値）
+
+    Returns:
+        順位、「圏外」、「不明」または「>48位」の形の表記
+    """
+    if rank == RANK_UNKNOWN:
+        return UNKNOWN_LABEL
+    if is_rank_beyond(rank):
+        return f'{rank}位'
+    if not rank:
+        return NOT_RANKED_LABEL
+    return rank
+
+
+def format_positions(positions: Optional[List[int]]) -> str:
+    """
+    広告の表示位置をスプレッドシートの表記に変換
+
+    Args:
+        positions: 表示位置のリスト（広告として表示されなかった場合は空）
+
+    Returns:
+        カンマ区切りの表示位置（無い場合は空文字）
+    """
+    return ', '.join(str(position) for position in positions) if positions else ''
+
+
+def ranking_row(data: Dict[str, Any]) -> List[Any]:
+    """
+    ランキング結果1件をシート・CSVの行に変換（列はRANKING_HEADERSの順）
+
+    Args:
+        data: SearchPlan.build_results が返すランキング結果
+
+    Returns:
+        行の値のリスト
+    """
+    amazon_total = data.get('amazon_total_results')
+    rakuten_total = data.get('rakuten_total_results')
+    return [
+        data['date'],
+        data['sku_name'],
+        data['keyword'],
+        format_rank(data['amazon_rank']),
+        format_rank(data['rakuten_rank']),
+        format_positions(data.get('amazon_ad_positions')),
+        amazon_total if amazon_total is not None else '',
+        format_rank(data.get('rakuten_organic_rank', data['rakuten_rank'])),
+        format_positions(data.get('rakuten_ad_positions')),
+        rakuten_total if rakuten_total is not None else ''
+    ]
+
+
+def parse_rank_cell(value: str, not_ranked: int = 999) -> float:
+    """
+    スプレッドシートの順位セルを数値に変換
+
+    Args:
+        value: セルの値
+        not_ranked: 「圏外」（確認した範囲に見つからなかった「>48位」なども含む）に割り当てる数値
+
+    Returns:
+        順位、「不明」や空欄の場合はNaN
+    """
+    if value == NOT_RANKED_LABEL or is_rank_beyond(value):
+        return not_ranked
+    if value in (UNKNOWN_LABEL, '', None):
+        return float('nan')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return float('nan')
@@ -0,0 +1,177 @@
+"""
+ホストごとのトークンバケットによるリクエスト間隔の制御
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from loguru import logger
+
+from src.config import AMAZON_RATE_LIMIT, RAKUTEN_RATE_LIMIT, RATE_LIMIT_BURST
+
+
+class TokenBucket:
+    """一定レートでトークンが補充されるバケット（スレッドセーフ）"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: 1秒あたりに補充されるトークン数（=許可するリクエスト数）
+            burst: バケットに貯められる最大トークン数
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        トークンを1つ予約し、使えるようになるまでの待ち時間を返す
+
+        Returns:
+            待ち時間（秒）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            # 不足分が補充されるまで待つ（予約済みのため後続はさらに後ろに並ぶ）
+            return -self._tokens / self.rate
+
+    def _try_take(self) -> float:
+        """
+        トークンがあれば1つ使う（予約はしない）
+
+        Returns:
+            使えた場合は0、足りない場合はトークンが補充されるまでの秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, cancelled: Optional[threading.Event] = None) -> float:
+        """
+        トークンが使えるようになるまで現在のスレッドを待たせる
+
+        cancelled を渡した場合は予約せずに待ち、取り消されたらトークンを使わずに戻る
+        （先読みのように不要になるかもしれないリクエスト用。予約したリクエストが優先される）。
+
+        Args:
+            cancelled: セットされたら待つのをやめるイベント（戻った後に呼び出し側で確認する）
+
+        Returns:
+            待った秒数
+        """
+        if cancelled is None:
+            wait = self._reserve()
+            if wait > 0:
+                time.sleep(wait)
+            return max(0.0, wait)
+
+        started_at = time.monotonic()
+        while not cancelled.is_set():
+            wait = self._try_take()
+            if wait <= 0:
+                break
+            cancelled.wait(wait)
+        return time.monotonic() - started_at
+
+
+class RateLimiter:
+    """ホストごとのトークンバケットを管理するクラス"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], default: Optional[Tuple[float, int]] = None):
+        """
+        Args:
+            limits: ホスト名と（レート, バースト）の辞書
+            default: 未登録ホストに適用する（レート, バースト）、Noneの場合は制限しない
+        """
+        self.default = default
+        self._buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in limits.items()}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> Optional[TokenBucket]:
+        """
+        URLのホストに対応するバケットを取得
+
+        Args:
+            url: リクエスト先のURL
+
+        Returns:
+            トークンバケット、制限しない場合はNone
+        """
+        host = urlparse(url).hostname or url
+        with self._lock:
+            if host not in self._buckets:
+                if not self.default:
+                    return None
+                self._buckets[host] = TokenBucket(*self.default)
+            return self._buckets[host]
+
+    def acquire(self, url: str, cancelled: Optional[threading.Event] = None) -> float:
+        """
+        URLのホストへのリクエストが許可されるまで待つ
+
+        Args:
+            url: リクエスト先のURL
+            cancelled: セットされたらトークンを使わずに戻るイベント（TokenBucket.acquire を参照）
+
+        Returns:
+            待った秒数
+        """
+        bucket = self.bucket(url)
+        if bucket:
+            return bucket.acquire(cancelled)
+        return 0.0
+
+
+def create_rate_limiter(scale: float = 1.0) -> RateLimiter:
+    """
+    設定ファイルのレートでレートリミッターを作成
+
+    Args:
+        scale: レートに掛ける係数（複数プロセスで分担する場合は 1/プロセス数）
+
+    Returns:
+        レートリミッター
+    """
+    amazon_rate = AMAZON_RATE_LIMIT * scale
+    rakuten_rate = RAKUTEN_RATE_LIMIT * scale
+    logger.debug(
+        f"レートリミッター: Amazon={amazon_rate:.2f}件/秒, "
+        f"楽天={rakuten_rate:.2f}件/秒, バースト={RATE_LIMIT_BURST}"
+    )
+    return RateLimiter({
+        'www.amazon.co.jp': (amazon_rate, RATE_LIMIT_BURST),
+        'search.rakuten.co.jp': (rakuten_rate, RATE_LIMIT_BURST),
+    })
+
+
+_default_rate_limiter = None
+_default_lock = threading.Lock()
+
+
+def default_rate_limiter() -> RateLimiter:
+    """
+    設定ファイルのレートで作成したプロセス共通のレートリミッターを取得
+
+    Returns:
+        レートリミッター
+    """
+    global _default_rate_limiter
+    with _default_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = create_rate_limiter()
+        return _default_rate_limiter
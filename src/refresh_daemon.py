@@ -0,0 +1,319 @@
+"""
+キーワードを更新区分ごとの間隔で検索し続ける常駐モード
+
+キーワードは入力シートの「更新頻度」列で hot（毎時）/ normal（毎日）/ cold（毎週）に分ける
+（同じキーワードを持つSKUのうち最も頻度の高い区分を使う）。各キーワードの検索時刻は
+キーワードのハッシュで間隔内にずらして決めるため、1日の中で検索が均等に散らばり、
+サイトへのアクセスと自分たちのホストの負荷が一度に集中しない。
+
+一定間隔（tick）ごとに検索時刻を過ぎたキーワードを集め、1回の検索計画として検索する。
+ブラウザのプールは常駐中ずっと開いたままにし、tickの間も使い回す。
+最後に検索した日時は実行ジャーナル（src.run_journal）から読むため、再起動しても間隔は保たれる。
+キューの状態（区分ごとのキーワード数・検索時刻を過ぎた数・次に検索するキーワード・直近のtick）は
+tickごとにJSONファイルに書き出す。
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+from loguru import logger
+
+from src.run_journal import RunJournal
+from src.search_planner import SearchPlan
+from src.ranking import RANK_UNKNOWN
+
+
+TIERS = ('hot', 'normal', 'cold')  # 検索する頻度の高い順
+
+_DAY = 24 * 60 * 60
+
+
+class RefreshDaemon:
+    """更新区分ごとの間隔でキーワードを検索し続ける常駐スケジューラー"""
+
+    def __init__(
+        self,
+        load_sku_list: Callable[[], List[Dict[str, Any]]],
+        search: Callable[[SearchPlan, str], Dict[str, Dict[str, Dict[str, Optional[int]]]]],
+        write_results: Callable[[List[Dict[str, Any]]], None],
+        journal_path: Union[str, Path],
+        tier_intervals: Dict[str, float],
+        default_tier: str = 'normal',
+        tick_interval: float = 60,
+        max_keywords_per_tick: int = 20,
+        retry_interval: float = 900,
+        reload_interval: float = 3600,
+        status_path: Optional[Union[str, Path]] = None
+    ):
+        """
+        Args:
+            load_sku_list: 入力シートからSKU情報のリストを読む関数
+            search: 検索計画と実行日を受け取り、マーケットプレイスごとの「キーワード → 検索対象と順位」を返す関数
+            write_results: ランキング結果の行を書き込む関数
+            journal_path: 実行ジャーナルのSQLiteファイル（最後に検索した日時を読む）
+            tier_intervals: 更新区分ごとの検索間隔（秒）
+            default_tier: 更新頻度が空欄のSKUの区分
+            tick_interval: 検索時刻を過ぎたキーワードを確認する間隔（秒）
+            max_keywords_per_tick: 1回のtickで検索する最大キーワード数（停止後の再開などで一度に集中させない）
+            retry_interval: 「不明」になったキーワードを検索し直すまでの最短の秒数
+            reload_interval: 入力シートを読み直す間隔（秒）
+            status_path: キューの状態を書き出すJSONファイル（Noneの場合は書き出さない）
+        """
+        self.load_sku_list = load_sku_list
+        self.search = search
+        self.write_results = write_results
+        self.journal_path = Path(journal_path)
+        self.tier_intervals = {tier: max(60.0, tier_intervals[tier]) for tier in TIERS}
+        self.default_tier = default_tier if default_tier in TIERS else 'normal'
+        self.tick_interval = max(1.0, tick_interval)
+        self.max_keywords_per_tick = max(1, max_keywords_per_tick)
+        self.retry_interval = retry_interval
+        self.reload_interval = reload_interval
+        self.status_path = Path(status_path) if status_path else None
+
+        self.plan: Optional[SearchPlan] = None
+        self.tiers: Dict[str, str] = {}  # キーワード → 更新区分
+        self._journal: Optional[RunJournal] = None
+        self._last_refreshed: Dict[str, float] = {}  # キーワード → 最後に全マーケットプレイスの順位を確認できた時刻
+        self._attempted: Dict[str, float] = {}  # キーワード → 最後に検索した時刻（常駐中のみ）
+        self._started_at = time.time()
+        self._loaded_at = 0.0
+        self._ticks = 0
+        self._state = 'starting'
+        self._current: List[str] = []
+        self._last_tick: Dict[str, Any] = {}
+        self._stop = threading.Event()
+
+    def stop(self):
+        """実行中のtickが終わったら停止する（シグナルハンドラーから呼べる）"""
+        self._stop.set()
+
+    def _journal_for(self, run_date: str) -> RunJournal:
+        """実行日のジャーナル（日付が変わったら開き直す）"""
+        if self._journal is None or self._journal.run_date != run_date:
+            if self._journal:
+                self._journal.close()
+            self._journal = RunJournal(self.journal_path, run_date)
+        return self._journal
+
+    def _reload(self):
+        """入力シートを読み直し、キーワードの更新区分を決める（失敗した場合は前回の内容で続ける）"""
+        self._loaded_at = time.monotonic()
+        try:
+            sku_list = self.load_sku_list()
+        except Exception as e:
+            logger.error(f"入力シートを読み直せませんでした（前回の内容で続けます）: {e}")
+            return
+
+        plan = SearchPlan(sku_list)
+        tiers: Dict[str, str] = {}
+        for sku_data in sku_list:
+            tier = sku_data.get('tier') or self.default_tier
+            for keyword in sku_data['keywords']:
+                # 同じキーワードを持つSKUのうち、最も頻度の高い区分を使う
+                if keyword not in tiers or TIERS.index(tier) < TIERS.index(tiers[keyword]):
+                    tiers[keyword] = tier
+        self.plan = plan
+        self.tiers = tiers
+        self._refresh_history()
+
+        counts = {tier: sum(1 for value in tiers.values() if value == tier) for tier in TIERS}
+        logger.info(
+            f"常駐モード: 毎時 {counts['hot']}, 毎日 {counts['normal']}, 毎週 {counts['cold']} キーワードを更新します"
+        )
+
+    def _refresh_history(self):
+        """ジャーナルから最後に順位を確認できた日時を読み直す"""
+        journal = self._journal_for(datetime.now().strftime('%Y-%m-%d'))
+        self._last_refreshed = {
+            keyword: refreshed_at.timestamp() for keyword, refreshed_at in journal.last_refreshed().items()
+        }
+
+    @staticmethod
+    def _slot_after(moment: float, interval: float, phase: float) -> float:
+        """moment より後で、間隔 interval の中の位置が phase になる最初の時刻"""
+        return moment - (moment - phase) % interval + interval
+
+    def next_due(self, keyword: str) -> float:
+        """
+        キーワードを次に検索する時刻
+
+        区分の間隔の中でキーワードのハッシュから決めた位置に検索する。一度も検索していないキーワードは
+        常駐を開始してから1日（間隔が1日より短い場合はその間隔）の中に散らばらせる。
+
+        Args:
+            keyword: 検索キーワード
+
+        Returns:
+            UNIX時刻
+        """
+        interval = self.tier_intervals[self.tiers.get(keyword, self.default_tier)]
+        offset = zlib.crc32(keyword.encode('utf-8'))
+        last = self._last_refreshed.get(keyword)
+        if last is None:
+            window = min(interval, _DAY)
+            return self._slot_after(self._started_at, window, offset % window)
+        # 前回から半分以上間隔が空いた最初の位置（前回が位置からずれていても1間隔ごとに戻る）
+        return self._slot_after(last + interval / 2, interval, offset % interval)
+
+    def _ready_at(self, keyword: str) -> float:
+        """キーワードを検索できる時刻（検索時刻と、前回の検索から retry_interval 空けた時刻の遅い方）"""
+        return max(self.next_due(keyword), self._attempted.get(keyword, 0.0) + self.retry_interval)
+
+    def _keywords(self) -> List[str]:
+        """検索計画のキーワード（いずれかのマーケットプレイスに検索対象があるもの）"""
+        return list(dict.fromkeys([*self.plan.amazon_targets, *self.plan.rakuten_targets]))
+
+    def due_keywords(self, now: float) -> List[str]:
+        """
+        検索時刻を過ぎたキーワード（頻度の高い区分・検索時刻の早い順）
+
+        Args:
+            now: 現在のUNIX時刻
+
+        Returns:
+            キーワードのリスト
+        """
+        due = [keyword for keyword in self._keywords() if self._ready_at(keyword) <= now]
+        due.sort(key=lambda keyword: (TIERS.index(self.tiers.get(keyword, self.default_tier)), self.next_due(keyword)))
+        return due
+
+    def _tick(self, keywords: List[str]):
+        """検索時刻を過ぎたキーワードを検索し、結果を書き込む"""
+        run_date = datetime.now().strftime('%Y-%m-%d')
+        plan = self.plan.prioritized(keywords)
+        self._ticks += 1
+        self._state = 'searching'
+        self._current = keywords
+        self.write_status()
+
+        started_at = time.monotonic()
+        logger.info(f"tick {self._ticks}: {len(keywords)} キーワードを検索します")
+        try:
+            ranks = self.search(plan, run_date)
+        except Exception as e:
+            logger.error(f"tick {self._ticks}: 検索に失敗しました: {e}")
+            ranks = {}
+
+        searched = set(keywords)
+        rows = [
+            row for row in plan.build_results(ranks.get('amazon', {}), ranks.get('rakuten', {}), run_date, complete_only=True)
+            if row['keyword'] in searched
+        ]
+        written = 0
+        if rows:
+            try:
+                self.write_results(rows)
+                written = len(rows)
+            except Exception as e:
+                # 結果はジャーナルに残っているため、書き込めなくても次の検索時刻まで待つ
+                logger.error(f"tick {self._ticks}: 結果を書き込めませんでした: {e}")
+
+        now = time.time()
+        for keyword in keywords:
+            self._attempted[keyword] = now
+        self._refresh_history()
+        unknown = sum(
+            1 for keyword_ranks in (*ranks.get('amazon', {}).values(), *ranks.get('rakuten', {}).values())
+            if RANK_UNKNOWN in keyword_ranks.values()
+        )
+        self._last_tick = {
+            'tick': self._ticks,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'keywords': len(keywords),
+            'seconds': round(time.monotonic() - started_at, 1),
+            'unknown': unknown,
+            'rows_written': written,
+        }
+        self._current = []
+        logger.info(
+            f"tick {self._ticks}: {len(keywords)} キーワードを {self._last_tick['seconds']}秒で検索しました"
+            f"（不明 {unknown} 件, 書き込み {written} 行）"
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """
+        キューの状態
+
+        Returns:
+            状態・区分ごとのキーワード数・検索時刻を過ぎた数・次に検索するキーワード・直近のtickの辞書
+        """
+        now = time.time()
+        keywords = self._keywords() if self.plan else []
+        due_at = {keyword: self.next_due(keyword) for keyword in keywords}
+        tiers = {}
+        for tier in TIERS:
+            tier_keywords = [keyword for keyword in keywords if self.tiers.get(keyword, self.default_tier) == tier]
+            tiers[tier] = {
+                'interval_seconds': self.tier_intervals[tier],
+                'keywords': len(tier_keywords),
+                'due': sum(1 for keyword in tier_keywords if due_at[keyword] <= now),
+            }
+        upcoming = sorted(keywords, key=lambda keyword: due_at[keyword])[:20]
+        return {
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'state': self._state,
+            'started_at': datetime.fromtimestamp(self._started_at).isoformat(timespec='seconds'),
+            'ticks': self._ticks,
+            'current': self._current,
+            'tiers': tiers,
+            'due': sum(1 for seconds in due_at.values() if seconds <= now),
+            'next': [
+                {
+                    'keyword': keyword,
+                    'tier': self.tiers.get(keyword, self.default_tier),
+                    'due_at': datetime.fromtimestamp(due_at[keyword]).isoformat(timespec='seconds'),
+                }
+                for keyword in upcoming
+            ],
+            'last_tick': self._last_tick,
+        }
+
+    def write_status(self):
+        """キューの状態をJSONファイルに書き出す（読み手が書きかけのファイルを読まないよう置き換える）"""
+        if not self.status_path:
+            return
+        try:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.status_path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(self.status(), ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(temp_path, self.status_path)
+        except Exception as e:
+            logger.warning(f"常駐モードの状態を書き出せませんでした: {e}")
+
+    def run(self):
+        """stop() が呼ばれるまでtickを繰り返す"""
+        logger.info(f"常駐モードを開始します（確認間隔 {self.tick_interval:.0f}秒）")
+        try:
+            while not self._stop.is_set():
+                if self.plan is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+                    self._reload()
+                if self.plan is None:
+                    self._stop.wait(self.tick_interval)
+                    continue
+
+                due = self.due_keywords(time.time())
+                if due:
+                    self._tick(due[:self.max_keywords_per_tick])
+                    # 残りがあればすぐに次のtickへ進む（1tickの上限で区切って状態を更新する）
+                    if len(due) > self.max_keywords_per_tick:
+                        continue
+
+                self._state = 'idle'
+                self.write_status()
+                now = time.time()
+                wait = min([self.tick_interval, *[self._ready_at(keyword) - now for keyword in self._keywords()]])
+                self._stop.wait(max(1.0, wait))
+        finally:
+            self._state = 'stopped'
+            self._current = []
+            self.write_status()
+            if self._journal:
+                self._journal.close()
+            logger.info("常駐モードを停止しました")
@@ -0,0 +1,167 @@
+"""
+SERPアーカイブのページから順位を計算し直すモジュール
+
+マーケットプレイスにはアクセスせず、アーカイブに保存したページを現在のパーサーで解析し直す。
+（日付, マーケットプレイス, キーワード）ごとに別プロセスで解析するため、全CPUコアを使える。
+同じ日に同じページを複数回取得していた場合は、最後に取得したページを使う。
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+
+from src.async_engine import SCRAPER_CLASSES
+from src.page_readiness import PageState
+from src.search_planner import SearchPlan
+from src.serp_archive import SerpArchive
+from src.serp_parser import parse_raw_page
+from src.ranking import RANK_UNKNOWN
+
+
+_worker_archive: Optional[SerpArchive] = None  # 解析プロセスごとに開くアーカイブ
+
+
+def _init_worker(archive_path: str):
+    """解析プロセスの初期化（アーカイブを開き、ページごとのログは出さない）"""
+    global _worker_archive
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    _worker_archive = SerpArchive(archive_path)
+
+
+def _reparse_keyword(marketplace: str, keyword: str, pages: List[Tuple[int, str, str]],
+                     targets: Iterable[str], max_pages: int) -> Tuple[Dict[str, Optional[int]], int]:
+    """
+    1キーワード分のアーカイブのページを解析し直して順位を求める（解析プロセスで呼ばれる）
+
+    Args:
+        marketplace: マーケットプレイス名（amazon / rakuten）
+        keyword: 検索キーワード
+        pages: 1ページ目から連続する（ページ番号, ハッシュ, 種類）のリスト
+        targets: 検索対象のASINまたは楽天商品ID
+        max_pages: 最大検索ページ数
+
+    Returns:
+        検索対象と順位の辞書、解析したページ数
+    """
+    scraper = SCRAPER_CLASSES[marketplace]()
+    rank_state = scraper.new_rank_state(keyword, targets, max_pages)
+    parsed = 0
+    for page, digest, kind in pages:
+        if rank_state.done:
+            break
+        parsed_page = parse_raw_page(marketplace, _worker_archive.load(digest, kind))
+        parsed += 1
+        rank_state.add_page(page, PageState.READY, parsed_page, scraper.counts_toward_rank)
+
+    if not rank_state.done:
+        # 取得時に打ち切った先のページはアーカイブに無いため、見つからない検索対象は確認できない
+        rank_state.incomplete = True
+    return rank_state.finish(), parsed
+
+
+def _latest_pages(archive: SerpArchive, since: str, until: str) -> Dict[Tuple[str, str, str], List[Tuple[int, str, str]]]:
+    """
+    期間内のアーカイブを（日付, マーケットプレイス, キーワード）ごとの連続したページにまとめる
+
+    Args:
+        archive: SERPアーカイブ
+        since: 開始日（YYYY-MM-DD形式）
+        until: 終了日（YYYY-MM-DD形式）
+
+    Returns:
+        （日付, マーケットプレイス, キーワード）と（ページ番号, ハッシュ, 種類）のリストの辞書
+    """
+    latest: Dict[Tuple[str, str, str], Dict[int, Tuple[str, str]]] = {}
+    for archived in archive.pages(since, until):
+        key = (archived.fetched_at[:10], archived.marketplace, archived.keyword)
+        # 取得日時順に並んでいるため、後から来たページで上書きすると最後に取得したページが残る
+        latest.setdefault(key, {})[archived.page] = (archived.hash, archived.kind)
+
+    grouped = {}
+    for key, pages in latest.items():
+        contiguous = []
+        page = 1
+        while page in pages:
+            contiguous.append((page, *pages[page]))
+            page += 1
+        if contiguous:
+            grouped[key] = contiguous
+    return grouped
+
+
+def reparse_archive(
+    archive: SerpArchive,
+    plan: SearchPlan,
+    since: str,
+    until: str,
+    max_pages: int = 5,
+    workers: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    期間内のアーカイブから、検索計画の全SKU×キーワードの順位を計算し直す
+
+    Args:
+        archive: SERPアーカイブ
+        plan: 検索計画（現在の入力シートから作成）
+        since: 開始日（YYYY-MM-DD形式）
+        until: 終了日（YYYY-MM-DD形式）
+        max_pages: 最大検索ページ数
+        workers: 解析プロセス数（0の場合はCPUコア数）
+
+    Returns:
+        write_ranking_data に渡せるランキング結果のリスト（アーカイブにページが無い日付・キーワードは含まない）
+    """
+    grouped = _latest_pages(archive, since, until)
+    jobs = {
+        key: pages for key, pages in grouped.items()
+        if plan.targets(key[1]).get(key[2])
+    }
+    if not jobs:
+        logger.warning(f"アーカイブに {since}〜{until} の対象ページがありません")
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"{len(jobs)} 件（日付×マーケットプレイス×キーワード）をプロセス {workers} 個で解析し直します")
+    started_at = time.monotonic()
+    ranks: Dict[str, Dict[str, Dict[str, Dict[str, Optional[int]]]]] = {}
+    parsed_pages = 0
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(str(archive.path),)) as executor:
+        futures = {
+            executor.submit(_reparse_keyword, marketplace, keyword, pages, plan.targets(marketplace)[keyword], max_pages):
+                (date, marketplace, keyword)
+            for (date, marketplace, keyword), pages in jobs.items()
+        }
+        for future in as_completed(futures):
+            date, marketplace, keyword = futures[future]
+            day = ranks.setdefault(date, {'amazon': {}, 'rakuten': {}})
+            try:
+                day[marketplace][keyword], pages = future.result()
+                parsed_pages += pages
+            except Exception as e:
+                logger.error(f"解析し直せませんでした: {date} {marketplace} キーワード='{keyword}' - {e}")
+                day[marketplace][keyword] = {target: RANK_UNKNOWN for target in plan.targets(marketplace)[keyword]}
+
+    elapsed = time.monotonic() - started_at
+    logger.info(f"{parsed_pages} ページを {elapsed:.1f}秒で解析しました（{parsed_pages / elapsed if elapsed else 0:.0f} ページ/秒）")
+
+    results = []
+    for date in sorted(ranks):
+        day = ranks[date]
+        archived_keywords = set(day['amazon']) | set(day['rakuten'])
+        for marketplace in ('amazon', 'rakuten'):
+            # もう一方のマーケットプレイスだけアーカイブがあるキーワードは「不明」にする
+            for keyword in archived_keywords - set(day[marketplace]):
+                day[marketplace][keyword] = {target: RANK_UNKNOWN for target in plan.targets(marketplace).get(keyword, ())}
+        results += [
+            result for result in plan.build_results(day['amazon'], day['rakuten'], date)
+            if result['keyword'] in archived_keywords
+        ]
+    return results
@@ -0,0 +1,235 @@
+"""
+1日分の実行結果をキーワードごとに記録するジャーナル
+
+キーワードの検索が終わるたびに（実行日, マーケットプレイス, キーワード, 検索対象）ごとの順位を
+SQLite（WALモード）に追記する。途中で落ちても記録済みの結果は残るため、--resume で
+未完了のキーワードだけを検索し直せる。最後のシートへの書き込みもジャーナルの内容から行い、
+書き込み済みかどうかも記録するため、書き込みだけをやり直す場合に検索し直す必要がない。
+
+キーワードごとの検索にかかった秒数も（日をまたいで）記録し、スケジューラー（src.run_scheduler）が
+時間内に終わるキーワードを見積もるのに使う。
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+from loguru import logger
+
+from src.rank_state import SerpRanks
+from src.ranking import RANK_UNKNOWN
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_date TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    target TEXT NOT NULL,
+    rank TEXT,
+    organic_rank TEXT,
+    ad_positions TEXT,
+    total_results INTEGER,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (run_date, marketplace, keyword, target)
+);
+CREATE TABLE IF NOT EXISTS keyword_costs (
+    marketplace TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (marketplace, keyword)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    run_date TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    written_at TEXT NOT NULL,
+    PRIMARY KEY (run_date, sheet)
+);
+"""
+
+
+class RunJournal:
+    """1日分の実行結果のジャーナル（複数スレッド・複数プロセスから書き込める）"""
+
+    def __init__(self, path: Union[str, Path], run_date: str):
+        """
+        Args:
+            path: ジャーナルのSQLiteファイル
+            run_date: 実行日（YYYY-MM-DD形式）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.run_date = run_date
+        self._lock = threading.Lock()
+        # 複数プロセスから同時に書き込めるようWALモードにし、ロック待ちは長めにとる
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def record(self, marketplace: str, keyword: str, ranks: Dict[str, Optional[int]],
+               elapsed: Optional[float] = None):
+        """
+        検索し終えたキーワードの順位を記録（同じ日・キーワードの記録は置き換える）
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            keyword: 検索キーワード
+            ranks: 検索対象と順位の辞書（SerpRanksの場合は広告位置なども記録する）
+            elapsed: キーワードの検索にかかった秒数（Noneの場合は記録しない）
+        """
+        organic_ranks = getattr(ranks, 'organic_ranks', {})
+        ad_positions = getattr(ranks, 'ad_positions', {})
+        total_results = getattr(ranks, 'total_results', None)
+        recorded_at = datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (
+                self.run_date, marketplace, keyword, target,
+                json.dumps(rank),
+                json.dumps(organic_ranks.get(target, rank)),
+                json.dumps(ad_positions.get(target)),
+                total_results,
+                recorded_at
+            )
+            for target, rank in ranks.items()
+        ]
+        with self._lock:
+            # 1キーワード分は1トランザクションで記録する（途中で落ちても半端な記録は残らない）
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO results (run_date, marketplace, keyword, target, rank, organic_rank,'
+                    ' ad_positions, total_results, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                if elapsed is not None:
+                    self._record_cost(marketplace, keyword, elapsed, recorded_at)
+
+    def _record_cost(self, marketplace: str, keyword: str, elapsed: float, recorded_at: str,
+                     smoothing: float = 0.3):
+        """検索にかかった秒数を指数移動平均で記録（ロックとトランザクションの中で呼ぶ）"""
+        row = self._conn.execute(
+            'SELECT seconds, samples FROM keyword_costs WHERE marketplace = ? AND keyword = ?',
+            (marketplace, keyword)
+        ).fetchone()
+        seconds, samples = (elapsed, 1) if row is None else (row[0] + smoothing * (elapsed - row[0]), row[1] + 1)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO keyword_costs (marketplace, keyword, seconds, samples, updated_at)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (marketplace, keyword, seconds, samples, recorded_at)
+        )
+
+    def keyword_costs(self) -> Dict[Tuple[str, str], float]:
+        """
+        これまでに計測したキーワードごとの検索秒数
+
+        Returns:
+            （マーケットプレイス, キーワード）と検索秒数（指数移動平均）の辞書
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT marketplace, keyword, seconds FROM keyword_costs').fetchall()
+        return {(marketplace, keyword): seconds for marketplace, keyword, seconds in rows}
+
+    def last_refreshed(self) -> Dict[str, datetime]:
+        """
+        キーワードごとに、最後に全マーケットプレイスの順位を確認できた日時（「不明」の記録は含まない）
+
+        Returns:
+            キーワードと日時の辞書（実行日を問わず最新のもの）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT keyword, MIN(latest) FROM ('
+                ' SELECT marketplace, keyword, MAX(recorded_at) AS latest FROM results WHERE rank != ?'
+                ' GROUP BY marketplace, keyword'
+                ') GROUP BY keyword',
+                (json.dumps(RANK_UNKNOWN),)
+            ).fetchall()
+        return {keyword: datetime.fromisoformat(latest) for keyword, latest in rows}
+
+    def load(self) -> Dict[str, Dict[str, SerpRanks]]:
+        """
+        実行日の記録を読み出す
+
+        Returns:
+            マーケットプレイスごとの「キーワード → 検索対象と順位」の辞書
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT marketplace, keyword, target, rank, organic_rank, ad_positions, total_results'
+                ' FROM results WHERE run_date = ?',
+                (self.run_date,)
+            ).fetchall()
+
+        ranks: Dict[str, Dict[str, SerpRanks]] = {'amazon': {}, 'rakuten': {}}
+        for marketplace, keyword, target, rank, organic_rank, ad_positions, total_results in rows:
+            keyword_ranks = ranks.setdefault(marketplace, {}).get(keyword)
+            if keyword_ranks is None:
+                keyword_ranks = SerpRanks({}, {}, {}, total_results)
+                ranks[marketplace][keyword] = keyword_ranks
+            keyword_ranks[target] = json.loads(rank)
+            keyword_ranks.organic_ranks[target] = json.loads(organic_rank)
+            keyword_ranks.ad_positions[target] = json.loads(ad_positions)
+        return ranks
+
+    def completed(self, keyword_targets: Dict[str, Dict[str, Iterable[str]]]) -> Dict[str, Set[str]]:
+        """
+        実行日に順位を確認し終えたキーワード（「不明」の検索対象が無く、検索対象が全て記録済み）
+
+        Args:
+            keyword_targets: マーケットプレイスごとの「キーワード → 検索対象」の辞書
+
+        Returns:
+            マーケットプレイスごとの完了したキーワードの集合
+        """
+        journaled = self.load()
+        completed: Dict[str, Set[str]] = {}
+        for marketplace, targets_by_keyword in keyword_targets.items():
+            completed[marketplace] = set()
+            for keyword, targets in targets_by_keyword.items():
+                keyword_ranks = journaled.get(marketplace, {}).get(keyword)
+                if keyword_ranks is None:
+                    continue
+                if all(target in keyword_ranks and keyword_ranks[target] != RANK_UNKNOWN for target in targets):
+                    completed[marketplace].add(keyword)
+        return completed
+
+    def written(self, sheet: str) -> bool:
+        """実行日の結果をシートに書き込み済みか"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM writes WHERE run_date = ? AND sheet = ?', (self.run_date, sheet)
+            ).fetchone()
+        return row is not None
+
+    def mark_written(self, sheet: str, rows: int):
+        """
+        実行日の結果をシートに書き込んだことを記録
+
+        Args:
+            sheet: 書き込んだシート名
+            rows: 書き込んだ行数
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO writes (run_date, sheet, rows, written_at) VALUES (?, ?, ?, ?)',
+                    (self.run_date, sheet, rows, datetime.now().isoformat(timespec='seconds'))
+                )
+        logger.debug(f"ジャーナル: {self.run_date} の {rows} 件をシート '{sheet}' に書き込み済みとして記録しました")
+
+    def close(self):
+        """ジャーナルを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
@@ -0,0 +1,270 @@
+"""
+時間内に終わる分だけ、価値の高いキーワードから検索するスケジューラー
+
+キーワードの価値は、そのキーワードを持つSKUごとに
+  （1 / 優先度）×（1 + 最後に順位を確認してからの日数）×（1 + 最近の順位の変動の大きさ）
+を足し合わせたもの。優先度は入力シートの「優先度」列（1が最優先）、日数と変動はランキングシートの
+履歴から求める。
+
+検索にかかる秒数は実行ジャーナルに記録したキーワードごとの実測値（指数移動平均）を使い、
+記録の無いキーワードはマーケットプレイスごとの中央値（それも無い場合は既定値）で見積もる。
+マーケットプレイスごとのレーンは並行して進むため、レーンごとに「秒数の合計 / ワーカー数」が
+時間の上限に収まるよう、秒数あたりの価値が高いキーワードから選ぶ。選んだキーワードは
+価値の高い順に検索し、選ばなかったキーワードは見送ったものとして報告する。
+見積もりは実行前の予測であり、実行中に上限を超えても検索は打ち切らない。
+"""
+
+import csv
+import re
+import statistics
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+from loguru import logger
+
+from src.search_planner import SearchPlan
+from src.ranking import NOT_RANKED_LABEL, UNKNOWN_LABEL, is_rank_beyond
+
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(text: str) -> float:
+    """
+    時間の指定を秒数に変換
+
+    Args:
+        text: 「90s」「45m」「1.5h」などの文字列（単位が無い場合は分）
+
+    Returns:
+        秒数
+
+    Raises:
+        ValueError: 解釈できない場合
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', text.lower())
+    if not match:
+        raise ValueError(f"時間の指定を解釈できません: {text}（例: 90s, 45m, 1.5h）")
+    value, unit = match.groups()
+    return float(value) * _DURATION_UNITS[unit or 'm']
+
+
+class KeywordJob(NamedTuple):
+    """スケジュールするキーワード1件"""
+    keyword: str
+    value: float  # 検索する価値
+    costs: Dict[str, float]  # マーケットプレイスごとの見積もり秒数（検索対象が無いマーケットプレイスは含まない）
+    sku_names: List[str]
+
+
+class Schedule(NamedTuple):
+    """スケジュールの結果"""
+    plan: SearchPlan  # 選んだキーワードを価値の高い順に検索する検索計画
+    selected: List[KeywordJob]
+    deferred: List[KeywordJob]
+    predicted_seconds: float  # 選んだキーワードの検索にかかる見積もり秒数（最も遅いレーン）
+
+
+class RunScheduler:
+    """優先度・前回確認からの日数・順位の変動と、キーワードごとの実測秒数で検索するキーワードを選ぶ"""
+
+    def __init__(
+        self,
+        history: List[Dict[str, Any]],
+        costs: Dict[Tuple[str, str], float],
+        lane_workers: Dict[str, int],
+        default_cost: float = 30,
+        default_priority: int = 3,
+        max_staleness_days: int = 30,
+        volatility_window: int = 7
+    ):
+        """
+        Args:
+            history: GoogleSheetsClient.read_ranking_history が返す履歴行のリスト
+            costs: （マーケットプレイス, キーワード）と検索秒数の辞書（RunJournal.keyword_costs）
+            lane_workers: マーケットプレイスごとに並行して検索するキーワード数（全ワーカープロセスの合計）
+            default_cost: 実測値の無いキーワードの見積もり秒数（同じマーケットプレイスの実測値も無い場合）
+            default_priority: 優先度が空欄のSKUの優先度
+            max_staleness_days: 日数の上限（一度も確認していない組み合わせもこの日数とみなす）
+            volatility_window: 変動を見る直近の履歴の日数
+        """
+        self.costs = costs
+        self.lane_workers = {marketplace: max(1, workers) for marketplace, workers in lane_workers.items()}
+        self.default_priority = max(1, default_priority)
+        self.max_staleness_days = max_staleness_days
+        self.volatility_window = max(2, volatility_window)
+        self._fallback_costs = self._median_costs(costs, default_cost)
+        self._last_seen, self._volatility = self._summarize(history)
+
+    @staticmethod
+    def _median_costs(costs: Dict[Tuple[str, str], float], default_cost: float) -> Dict[str, float]:
+        """マーケットプレイスごとの実測秒数の中央値（実測値の無いキーワードの見積もりに使う）"""
+        by_marketplace: Dict[str, List[float]] = {}
+        for (marketplace, _), seconds in costs.items():
+            by_marketplace.setdefault(marketplace, []).append(seconds)
+        return {
+            marketplace: statistics.median(by_marketplace[marketplace]) if marketplace in by_marketplace else default_cost
+            for marketplace in ('amazon', 'rakuten')
+        }
+
+    @staticmethod
+    def _rank_value(cell: str) -> Optional[int]:
+        """履歴の順位のセルを数値にする（圏外・浅い確認で見つからなかった「>48位」は100位、不明・空欄はNone）"""
+        if cell == NOT_RANKED_LABEL or is_rank_beyond(cell):
+            return 100
+        if cell in ('', UNKNOWN_LABEL):
+            return None
+        try:
+            return min(int(cell), 100)
+        except ValueError:
+            return None
+
+    def _summarize(self, history: List[Dict[str, Any]]) -> Tuple[Dict[Tuple[str, str], date], Dict[Tuple[str, str], float]]:
+        """
+        履歴から（SKU名, キーワード）ごとの最後に確認した日と順位の変動の大きさを求める
+
+        Args:
+            history: 履歴行のリスト
+
+        Returns:
+            最後に確認した日の辞書、変動の大きさ（0〜3）の辞書
+        """
+        last_seen: Dict[Tuple[str, str], date] = {}
+        # 同じ日に複数の行がある場合（常駐モードの毎時の検索など）は、シートで後にある行だけを使う
+        observations: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        for row in history:
+            key = (row['sku_name'], row['keyword'])
+            for marketplace in ('amazon', 'rakuten'):
+                rank = self._rank_value(row.get(f'{marketplace}_rank', ''))
+                if rank is None:
+                    continue
+                observations.setdefault((*key, marketplace), {})[row['date']] = rank
+                try:
+                    seen = date.fromisoformat(row['date'])
+                except ValueError:
+                    continue
+                if key not in last_seen or last_seen[key] < seen:
+                    last_seen[key] = seen
+
+        volatility: Dict[Tuple[str, str], float] = {}
+        for (sku_name, keyword, _), ranks in observations.items():
+            recent = [rank for _, rank in sorted(ranks.items())[-self.volatility_window:]]
+            if len(recent) < 2:
+                continue
+            change = statistics.mean(abs(current - previous) for previous, current in zip(recent, recent[1:]))
+            # 10位動くごとに1、上限3（マーケットプレイスのうち大きい方を使う）
+            key = (sku_name, keyword)
+            volatility[key] = max(volatility.get(key, 0.0), min(change / 10, 3.0))
+        return last_seen, volatility
+
+    def _sku_value(self, sku_data: Dict[str, Any], keyword: str, today: date) -> float:
+        """SKU×キーワード1件の検索する価値"""
+        key = (sku_data['sku_name'], keyword)
+        last_seen = self._last_seen.get(key)
+        staleness = self.max_staleness_days if last_seen is None else (today - last_seen).days
+        staleness = min(max(staleness, 0), self.max_staleness_days)
+        priority = sku_data.get('priority') or self.default_priority
+        return (1 + staleness) * (1 + self._volatility.get(key, 0.0)) / priority
+
+    def _jobs(self, plan: SearchPlan, today: date) -> List[KeywordJob]:
+        """検索計画のキーワードごとの価値と見積もり秒数"""
+        values: Dict[str, float] = {}
+        sku_names: Dict[str, List[str]] = {}
+        for sku_data in plan.sku_list:
+            for keyword in sku_data['keywords']:
+                values[keyword] = values.get(keyword, 0.0) + self._sku_value(sku_data, keyword, today)
+                sku_names.setdefault(keyword, []).append(sku_data['sku_name'])
+
+        jobs = []
+        for keyword in dict.fromkeys([*plan.amazon_targets, *plan.rakuten_targets]):
+            costs = {
+                marketplace: self.costs.get((marketplace, keyword), self._fallback_costs[marketplace])
+                for marketplace in ('amazon', 'rakuten') if keyword in plan.targets(marketplace)
+            }
+            jobs.append(KeywordJob(keyword, values.get(keyword, 0.0), costs, sku_names.get(keyword, [])))
+        return jobs
+
+    def _lane_seconds(self, loads: Dict[str, float]) -> float:
+        """レーンごとの秒数の合計から、最も遅いレーンが終わるまでの秒数を見積もる"""
+        return max(
+            (seconds / self.lane_workers.get(marketplace, 1) for marketplace, seconds in loads.items()),
+            default=0.0
+        )
+
+    def schedule(self, plan: SearchPlan, budget: Optional[float], today: date) -> Schedule:
+        """
+        時間の上限に収まるキーワードを選び、価値の高い順に並べる
+
+        Args:
+            plan: 検索計画
+            budget: 時間の上限（秒、Noneの場合は全キーワードを選んで並べ替えるだけ）
+            today: 実行日
+
+        Returns:
+            スケジュールの結果
+        """
+        jobs = self._jobs(plan, today)
+        selected: List[KeywordJob] = []
+        deferred: List[KeywordJob] = []
+        loads: Dict[str, float] = {}
+
+        # 秒数あたりの価値が高い順に、上限に収まるものを詰める（収まらないものは飛ばして次を試す）
+        def density(job: KeywordJob) -> float:
+            return job.value / max(self._lane_seconds(job.costs), 1e-9)
+
+        for job in sorted(jobs, key=density, reverse=True):
+            candidate = dict(loads)
+            for marketplace, seconds in job.costs.items():
+                candidate[marketplace] = candidate.get(marketplace, 0.0) + seconds
+            if budget is not None and self._lane_seconds(candidate) > budget:
+                deferred.append(job)
+                continue
+            selected.append(job)
+            loads = candidate
+
+        selected.sort(key=lambda job: job.value, reverse=True)
+        deferred.sort(key=lambda job: job.value, reverse=True)
+        return Schedule(
+            plan.prioritized([job.keyword for job in selected]),
+            selected,
+            deferred,
+            self._lane_seconds(loads)
+        )
+
+
+def report_schedule(schedule: Schedule, budget: Optional[float], path: Union[str, Path]):
+    """
+    スケジュールの結果をログに出し、見送ったキーワードをCSVに書き出す
+
+    Args:
+        schedule: スケジュールの結果
+        budget: 時間の上限（秒）
+        path: 見送ったキーワードを書き出すCSVファイル（見送りが無い場合は書き出さない）
+    """
+    total_value = sum(job.value for job in schedule.selected + schedule.deferred)
+    selected_value = sum(job.value for job in schedule.selected)
+    budget_text = f"{budget / 60:.1f}分" if budget is not None else "上限なし"
+    logger.info(
+        f"スケジュール: {len(schedule.selected)} キーワードを見積もり {schedule.predicted_seconds / 60:.1f}分で検索します"
+        f"（時間の上限 {budget_text}、価値の {selected_value / total_value if total_value else 1:.0%}）"
+    )
+    if not schedule.deferred:
+        return
+
+    logger.warning(f"時間内に終わらない見込みの {len(schedule.deferred)} キーワードを見送ります（{path}）")
+    for job in schedule.deferred[:10]:
+        logger.info(f"  見送り: {job.keyword}（価値 {job.value:.1f}, SKU {len(job.sku_names)} 件）")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['キーワード', '価値', 'Amazon見積もり秒数', '楽天見積もり秒数', 'SKU名'])
+        for job in schedule.deferred:
+            writer.writerow([
+                job.keyword,
+                round(job.value, 2),
+                round(job.costs['amazon'], 1) if 'amazon' in job.costs else '',
+                round(job.costs['rakuten'], 1) if 'rakuten' in job.costs else '',
+                ', '.join(job.sku_names)
+            ])
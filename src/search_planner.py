@@ -0,0 +1,278 @@
+"""
+キーワード単位の検索計画を作成するモジュール
+
+SKUごとのキーワードリストを「キーワード → 検索対象（ASIN・楽天商品ID）」に
+組み替え、同じキーワードの検索結果ページを1回の巡回で全SKU分解決できるようにする。
+"""
+
+import copy
+from datetime import date
+from typing import List, Dict, Any, Optional, Set
+from loguru import logger
+
+from src.serp_parser import extract_product_id
+from src.depth_policy import DepthPolicy
+
+
+class SearchPlan:
+    """キーワードごとの検索対象をまとめた検索計画"""
+
+    def __init__(self, sku_list: List[Dict[str, Any]]):
+        """
+        Args:
+            sku_list: GoogleSheetsClient.read_input_data が返すSKU情報のリスト
+        """
+        self.sku_list = sku_list
+        self.amazon_targets: Dict[str, Set[str]] = {}  # キーワード → ASIN
+        self.rakuten_targets: Dict[str, Set[str]] = {}  # キーワード → 楽天商品ID
+        self.rakuten_ids: Dict[str, Optional[str]] = {}  # 楽天URL → 楽天商品ID
+        self.amazon_depths: Dict[str, Dict[str, int]] = {}  # キーワード → ASINごとの検索ページ数（未指定は最大ページ数）
+        self.rakuten_depths: Dict[str, Dict[str, int]] = {}  # キーワード → 楽天商品IDごとの検索ページ数
+
+        self._build()
+
+    def _build(self):
+        """SKU→キーワードのリストをキーワード→検索対象の辞書に変換"""
+        for sku_data in self.sku_list:
+            rakuten_id = self._rakuten_id(sku_data)
+            if sku_data.get('rakuten_url') and not rakuten_id:
+                logger.error(f"商品IDを抽出できませんでした: {sku_data['rakuten_url']}")
+
+            for keyword in sku_data['keywords']:
+                if sku_data.get('asin'):
+                    self.amazon_targets.setdefault(keyword, set()).add(sku_data['asin'])
+                if rakuten_id:
+                    self.rakuten_targets.setdefault(keyword, set()).add(rakuten_id)
+
+        total_pairs = sum(len(sku_data['keywords']) for sku_data in self.sku_list)
+        logger.info(
+            f"検索計画: SKU×キーワード {total_pairs} 件 → "
+            f"Amazon {len(self.amazon_targets)} キーワード, 楽天 {len(self.rakuten_targets)} キーワード"
+        )
+
+    def _rakuten_id(self, sku_data: Dict[str, Any]) -> Optional[str]:
+        """SKUの楽天URLから商品IDを取得（キャッシュ付き）"""
+        url = sku_data.get('rakuten_url')
+        if not url:
+            return None
+        if url not in self.rakuten_ids:
+            self.rakuten_ids[url] = extract_product_id(url)
+        return self.rakuten_ids[url]
+
+    @property
+    def keywords(self) -> List[str]:
+        """計画に含まれるキーワード（入力順・重複なし）"""
+        keywords = []
+        seen = set()
+        for sku_data in self.sku_list:
+            for keyword in sku_data['keywords']:
+                if keyword not in seen:
+                    seen.add(keyword)
+                    keywords.append(keyword)
+        return keywords
+
+    def targets(self, marketplace: str) -> Dict[str, Set[str]]:
+        """
+        マーケットプレイスのキーワードごとの検索対象
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+
+        Returns:
+            キーワードと検索対象の辞書
+        """
+        return self.amazon_targets if marketplace == 'amazon' else self.rakuten_targets
+
+    def depths(self, marketplace: str) -> Dict[str, Dict[str, int]]:
+        """
+        マーケットプレイスのキーワードごと・検索対象ごとの検索ページ数
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+
+        Returns:
+            キーワードと「検索対象 → ページ数」の辞書（指定のない検索対象は最大ページ数）
+        """
+        return self.amazon_depths if marketplace == 'amazon' else self.rakuten_depths
+
+    def apply_depth_policy(self, policy: DepthPolicy, today: date):
+        """
+        ランキング履歴に基づいて検索対象ごとの検索ページ数を設定
+
+        同じキーワード・検索対象を複数のSKUが持つ場合は、最も深いページ数を使う。
+
+        Args:
+            policy: 検索ページ数の決定ルール
+            today: 実行日
+        """
+        self.amazon_depths = {}
+        self.rakuten_depths = {}
+        limited = 0
+
+        for sku_data in self.sku_list:
+            targets = {'amazon': sku_data.get('asin'), 'rakuten': self._rakuten_id(sku_data)}
+            for keyword in sku_data['keywords']:
+                for marketplace, target in targets.items():
+                    if not target:
+                        continue
+                    depth = policy.depth(sku_data['sku_name'], keyword, marketplace, today)
+                    if depth < policy.max_pages:
+                        limited += 1
+                    keyword_depths = self.depths(marketplace).setdefault(keyword, {})
+                    keyword_depths[target] = max(depth, keyword_depths.get(target, 0))
+
+        logger.info(
+            f"検索ページ数: 長期圏外 {policy.long_term_out_of_range} 件のうち "
+            f"{limited} 件を {policy.probe_pages} ページの確認に制限します"
+        )
+
+    @staticmethod
+    def _target_result(keyword_ranks: Dict[str, Any], target: Optional[str]) -> Dict[str, Any]:
+        """
+        キーワードの検索結果から1つの検索対象の順位・オーガニック順位・広告位置・検索結果数を取り出す
+
+        Args:
+            keyword_ranks: 検索対象と順位の辞書（SerpRanksの場合は広告位置なども取り出す）
+            target: ASINまたは楽天商品ID（Noneの場合は全てNone）
+
+        Returns:
+            rank, organic_rank, ad_positions, total_results の辞書
+        """
+        if not target:
+            return {'rank': None, 'organic_rank': None, 'ad_positions': None, 'total_results': None}
+        rank = keyword_ranks.get(target)
+        return {
+            'rank': rank,
+            'organic_rank': getattr(keyword_ranks, 'organic_ranks', {}).get(target, rank),
+            'ad_positions': getattr(keyword_ranks, 'ad_positions', {}).get(target),
+            'total_results': getattr(keyword_ranks, 'total_results', None)
+        }
+
+    def build_results(
+        self,
+        amazon_ranks: Dict[str, Dict[str, Optional[int]]],
+        rakuten_ranks: Dict[str, Dict[str, Optional[int]]],
+        date: str,
+        complete_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        キーワード単位の検索結果をSKU×キーワードの結果行に展開
+
+        Args:
+            amazon_ranks: キーワードごとのASINと順位の辞書
+            rakuten_ranks: キーワードごとの楽天商品IDと順位の辞書
+            date: 実行日（YYYY-MM-DD形式）
+            complete_only: SKUの全マーケットプレイスの結果がそろったキーワードだけを返すか
+
+        Returns:
+            write_ranking_data に渡せるランキング結果のリスト
+        """
+        results = []
+
+        for sku_data in self.sku_list:
+            rakuten_id = self._rakuten_id(sku_data)
+
+            for keyword in sku_data['keywords']:
+                if complete_only and (
+                    (sku_data.get('asin') and keyword not in amazon_ranks)
+                    or (rakuten_id and keyword not in rakuten_ranks)
+                ):
+                    continue
+                amazon = self._target_result(amazon_ranks.get(keyword, {}), sku_data.get('asin'))
+                rakuten = self._target_result(rakuten_ranks.get(keyword, {}), rakuten_id)
+
+                results.append({
+                    'date': date,
+                    'sku_name': sku_data['sku_name'],
+                    'keyword': keyword,
+                    'amazon_rank': amazon['rank'],
+                    'rakuten_rank': rakuten['rank'],
+                    'amazon_ad_positions': amazon['ad_positions'],
+                    'amazon_total_results': amazon['total_results'],
+                    'rakuten_organic_rank': rakuten['organic_rank'],
+                    'rakuten_ad_positions': rakuten['ad_positions'],
+                    'rakuten_total_results': rakuten['total_results']
+                })
+
+        return results
+
+    def excluding(self, done: Dict[str, Set[str]]) -> 'SearchPlan':
+        """
+        検索済みのキーワードを除いた検索計画（SKUリストと検索ページ数はそのまま共有する）
+
+        Args:
+            done: マーケットプレイスごとの検索済みキーワードの集合
+
+        Returns:
+            残りのキーワードだけを検索する検索計画
+        """
+        plan = copy.copy(self)
+        plan.amazon_targets = {
+            keyword: targets for keyword, targets in self.amazon_targets.items()
+            if keyword not in done.get('amazon', ())
+        }
+        plan.rakuten_targets = {
+            keyword: targets for keyword, targets in self.rakuten_targets.items()
+            if keyword not in done.get('rakuten', ())
+        }
+        return plan
+
+    def prioritized(self, keywords: List[str]) -> 'SearchPlan':
+        """
+        指定したキーワードだけを指定した順に検索する検索計画（SKUリストと検索ページ数はそのまま共有する）
+
+        Args:
+            keywords: 検索するキーワード（先に検索するものから順に）
+
+        Returns:
+            並べ替えた検索計画
+        """
+        plan = copy.copy(self)
+        plan.amazon_targets = {
+            keyword: self.amazon_targets[keyword] for keyword in keywords if keyword in self.amazon_targets
+        }
+        plan.rakuten_targets = {
+            keyword: self.rakuten_targets[keyword] for keyword in keywords if keyword in self.rakuten_targets
+        }
+        return plan
+
+    def shard(self, count: int) -> List['SearchPlan']:
+        """
+        キーワード単位で検索計画を分割（同じキーワードは必ず同じ分割先に入る）
+
+        Args:
+            count: 分割数
+
+        Returns:
+            分割後の検索計画のリスト（空の分割は含まない）
+        """
+        count = max(1, count)
+        # 検索する順（prioritized で並べ替えた場合はその順）に各分割へ振り分ける
+        keywords = list(dict.fromkeys([*self.amazon_targets, *self.rakuten_targets]))
+        shards = []
+
+        for index in range(count):
+            shard_keywords = set(keywords[index::count])
+            if not shard_keywords:
+                continue
+
+            sku_list = []
+            for sku_data in self.sku_list:
+                sku_keywords = [keyword for keyword in sku_data['keywords'] if keyword in shard_keywords]
+                if sku_keywords:
+                    sku_list.append(dict(sku_data, keywords=sku_keywords))
+
+            shard = SearchPlan(sku_list)
+            for marketplace in ('amazon', 'rakuten'):
+                # excluding・prioritized で除いたキーワードは分割後も含めず、検索する順も引き継ぐ
+                targets = shard.targets(marketplace)
+                ordered = {keyword: targets[keyword] for keyword in self.targets(marketplace) if keyword in targets}
+                targets.clear()
+                targets.update(ordered)
+                shard.depths(marketplace).update({
+                    keyword: depths for keyword, depths in self.depths(marketplace).items()
+                    if keyword in shard_keywords
+                })
+            shards.append(shard)
+
+        return shards
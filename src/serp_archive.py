@@ -0,0 +1,201 @@
+"""
+取得した検索結果ページ（SERP）を圧縮して保存するアーカイブ
+
+ページの内容はハッシュ（SHA-256）をキーに1回だけ保存し（同じ内容のページは重複排除）、
+（マーケットプレイス, キーワード, ページ番号, 取得日時, ハッシュ）の索引と一緒にSQLiteに記録する。
+パーサーを直したときに、過去のページから順位を計算し直すために使う（src.reparse）。
+
+zstandardがあればzstdで、無ければzlibで圧縮する（どちらで圧縮したかはページごとに記録する）。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Union
+from loguru import logger
+
+from src.serp_parser import RawPage
+
+try:
+    import zstandard
+except ImportError:  # zstandardが無い場合はzlibで圧縮する
+    zstandard = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    marketplace TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs (hash),
+    PRIMARY KEY (marketplace, keyword, page, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+"""
+
+
+class ArchivedPage(NamedTuple):
+    """アーカイブの索引1件"""
+    marketplace: str
+    keyword: str
+    page: int
+    fetched_at: str  # ISO形式の取得日時
+    kind: str  # RawPage.kind（html / script）
+    hash: str
+
+
+class SerpArchive:
+    """検索結果ページの圧縮アーカイブ（複数スレッド・複数プロセスから書き込める）"""
+
+    def __init__(self, path: Union[str, Path], level: int = 9):
+        """
+        Args:
+            path: アーカイブのSQLiteファイル
+            level: 圧縮レベル（zstd・zlibとも1〜9程度）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self.codec = 'zstd' if zstandard is not None else 'zlib'
+        self.stored = 0  # 新しく保存したページ数
+        self.deduplicated = 0  # 同じ内容が保存済みだったページ数
+        self._lock = threading.Lock()
+        # 複数プロセスから同時に書き込めるようWALモードにし、ロック待ちは長めにとる
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _encode(raw_page: RawPage) -> bytes:
+        """解析前のページをバイト列にする（スクリプトの戻り値はJSON）"""
+        if raw_page.kind == 'html':
+            return raw_page.data.encode('utf-8')
+        return json.dumps(raw_page.data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+    @staticmethod
+    def _decode(kind: str, payload: bytes) -> RawPage:
+        """バイト列を解析前のページに戻す"""
+        text = payload.decode('utf-8')
+        return RawPage(kind, text if kind == 'html' else json.loads(text))
+
+    def _compress(self, payload: bytes) -> bytes:
+        """設定のコーデックで圧縮"""
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(payload)
+        return zlib.compress(payload, self.level)
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        """保存時のコーデックで展開"""
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("zstdで圧縮されたページを展開するにはzstandardが必要です")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def store(self, marketplace: str, keyword: str, page: int, raw_page: RawPage,
+              fetched_at: Optional[datetime] = None) -> str:
+        """
+        ページを保存
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            keyword: 検索キーワード
+            page: ページ番号
+            raw_page: 解析前のページ
+            fetched_at: 取得日時（Noneの場合は現在時刻）
+
+        Returns:
+            ページ内容のハッシュ
+        """
+        payload = self._encode(raw_page)
+        digest = hashlib.sha256(payload).hexdigest()
+        fetched_at = (fetched_at or datetime.now()).isoformat(timespec='milliseconds')
+
+        with self._lock:
+            exists = self._conn.execute('SELECT 1 FROM blobs WHERE hash = ?', (digest,)).fetchone()
+        # 圧縮はロックの外で行う（他のスレッドの保存を待たせない）
+        data = None if exists else self._compress(payload)
+
+        with self._lock:
+            if data is not None:
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)',
+                    (digest, self.codec, len(payload), data)
+                )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (marketplace, keyword, page, fetched_at, kind, hash) VALUES (?, ?, ?, ?, ?, ?)',
+                (marketplace, keyword, page, fetched_at, raw_page.kind, digest)
+            )
+            self._conn.commit()
+            if exists:
+                self.deduplicated += 1
+            else:
+                self.stored += 1
+        return digest
+
+    def pages(self, since: str, until: str, marketplace: Optional[str] = None) -> List[ArchivedPage]:
+        """
+        期間内に取得したページの索引
+
+        Args:
+            since: 開始日（YYYY-MM-DD形式、この日を含む）
+            until: 終了日（YYYY-MM-DD形式、この日を含む）
+            marketplace: マーケットプレイス名（Noneの場合は全て）
+
+        Returns:
+            取得日時順の索引のリスト
+        """
+        query = 'SELECT marketplace, keyword, page, fetched_at, kind, hash FROM pages WHERE substr(fetched_at, 1, 10) BETWEEN ? AND ?'
+        params = [since, until]
+        if marketplace:
+            query += ' AND marketplace = ?'
+            params.append(marketplace)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY fetched_at', params).fetchall()
+        return [ArchivedPage(*row) for row in rows]
+
+    def load(self, digest: str, kind: str) -> RawPage:
+        """
+        保存したページを読み出す
+
+        Args:
+            digest: ページ内容のハッシュ
+            kind: RawPage.kind（html / script）
+
+        Returns:
+            解析前のページ
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT codec, data FROM blobs WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"アーカイブにページがありません: {digest}")
+        codec, data = row
+        return self._decode(kind, self._decompress(codec, data))
+
+    def close(self):
+        """アーカイブを閉じる"""
+        if self.stored or self.deduplicated:
+            logger.info(f"SERPアーカイブ: {self.stored} ページを保存、{self.deduplicated} ページは保存済みの内容と同一")
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
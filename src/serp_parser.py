@@ -0,0 +1,361 @@
+"""
+検索結果ページ（SERP）を1回の走査で解析するパーサー
+
+lxmlがインストールされていればlxmlで、無ければBeautifulSoup（html.parser）で解析する。
+どちらの場合も商品ごとの再パースは行わず、ページ全体を1回だけ解析する。
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Dict, Any
+from loguru import logger
+
+try:
+    import lxml.html
+except ImportError:  # lxmlが無い場合はBeautifulSoupで解析する
+    lxml = None
+    from bs4 import BeautifulSoup
+
+
+class SerpItem(NamedTuple):
+    """検索結果の商品1件"""
+    item_id: Optional[str]  # ASINまたは楽天商品ID（取得できない場合はNone）
+    is_sponsored: bool  # 広告（スポンサー・PR）商品か
+    position: int  # ページ内の表示位置（1から始まる）
+
+
+class ParsedPage(NamedTuple):
+    """1ページ分の解析結果"""
+    items: List[SerpItem]
+    has_next: bool  # 次のページがあるか
+    total_results: Optional[int] = None  # ページに表示された検索結果の総数（取得できない場合はNone）
+
+
+class RawPage(NamedTuple):
+    """解析前のページ"""
+    kind: str  # html: ページのHTML / script: ブラウザ内抽出スクリプトの戻り値
+    data: Any
+
+
+SPONSORED_LABELS = ('スポンサー', 'Sponsored')
+AMAZON_NEXT_LABEL = '次のページに移動してください'
+
+
+def _class_xpath(class_name: str) -> str:
+    """class属性に指定したクラスを含む要素を選ぶXPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+# lxml用のXPath
+_AMAZON_PRODUCTS = "//div[@data-component-type='s-search-result']"
+_AMAZON_SPONSORED = (
+    "descendant-or-self::*["
+    "@data-component-type='sp-sponsored-result'"
+    f" or {_class_xpath('AdHolder')}"
+    f" or {_class_xpath('s-sponsored-label')}"
+    f" or ({_class_xpath('s-label-popover')} and text()[normalize-space(.)='スポンサー' or normalize-space(.)='Sponsored'])"
+    "]"
+)
+_AMAZON_NEXT = f"//a[@aria-label='{AMAZON_NEXT_LABEL}']"
+_AMAZON_RESULT_COUNT = "//*[@data-component-type='s-result-info-bar']"
+_RAKUTEN_PRODUCTS = f"//div[{_class_xpath('searchresultitem')}]"
+_RAKUTEN_PR = "descendant::*[text()[normalize-space(.)='PR']]"
+_RAKUTEN_PAGINATION = f"//div[{_class_xpath('pagination')}]"
+# 商品カード内のレビュー件数なども count クラスを持つため、結果一覧の外にある「件」を含む要素に限る
+_RAKUTEN_RESULT_COUNT = (
+    f"//*[{_class_xpath('count')} and contains(., '件')"
+    f" and not(ancestor::div[{_class_xpath('searchresultitem')}])]"
+)
+
+
+def extract_product_id(url: str) -> Optional[str]:
+    """
+    楽天商品URLから商品IDを抽出
+    
+    Args:
+        url: 楽天商品URL
+        
+    Returns:
+        商品ID
+    """
+    try:
+        # URLから商品IDを抽出するパターン
+        # 例: https://item.rakuten.co.jp/shop-name/product-id/
+        patterns = [
+            r'/item\.rakuten\.co\.jp/[^/]+/([^/?]+)',  # 通常の商品URL
+            r'/product\.rakuten\.co\.jp/product/-/([^/?]+)',  # 別形式のURL
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, url)
+            if match:
+                return match.group(1)
+        
+        # 商品IDが直接渡された場合
+        if '/' not in url and '?' not in url:
+            return url
+        
+        return None
+        
+    except Exception as e:
+        logger.debug(f"商品ID抽出エラー: {e}")
+        return None
+
+
+def parse_total_results(text: Optional[str]) -> Optional[int]:
+    """
+    検索結果数の表示から総数を取り出す
+
+    「1-48 / 3,000件以上」「12,345 以上のうち 1-48件」「（1～45件 / 123,456件）」のように
+    表示範囲と総数が並ぶため、最も大きい数を総数とする。
+
+    Args:
+        text: 検索結果数の表示テキスト
+
+    Returns:
+        検索結果の総数（数が無い場合はNone）
+    """
+    numbers = [int(number.replace(',', '')) for number in re.findall(r'\d[\d,]*', text or '')]
+    return max(numbers) if numbers else None
+
+
+def parse_rakuten_total_results(text: Optional[str]) -> Optional[int]:
+    """
+    楽天の検索結果数の表示（「（1～45件 / 123,456件）」）から総数を取り出す
+
+    「件」の直前の数だけを対象にし、「/」の後ろに総数があればそれを、無ければ最後の数を総数とする。
+
+    Args:
+        text: 検索結果数の表示テキスト
+
+    Returns:
+        検索結果の総数（「件」の付いた数が無い場合はNone）
+    """
+    text = text or ''
+    total = re.search(r'/\s*(\d[\d,]*)\s*件', text)
+    if total:
+        return int(total.group(1).replace(',', ''))
+    numbers = re.findall(r'(\d[\d,]*)\s*件', text)
+    return int(numbers[-1].replace(',', '')) if numbers else None
+
+
+def _first_total(texts, parse) -> Optional[int]:
+    """候補の表示テキストを順に解析し、最初に取り出せた総数を返す"""
+    for text in texts:
+        total = parse(text)
+        if total is not None:
+            return total
+    return None
+
+
+def parse_amazon_serp(html: str) -> ParsedPage:
+    """
+    Amazonの検索結果ページを解析
+
+    Args:
+        html: ページのHTML
+
+    Returns:
+        ASINを持つ商品の（ASIN, 広告か, 表示位置）と次ページの有無
+    """
+    if not html or not html.strip():
+        return ParsedPage([], False)
+    if lxml is not None:
+        return _parse_amazon_lxml(html)
+    return _parse_amazon_bs4(html)
+
+
+def parse_rakuten_serp(html: str) -> ParsedPage:
+    """
+    楽天の検索結果ページを解析
+
+    Args:
+        html: ページのHTML
+
+    Returns:
+        全商品（PR含む）の（商品ID, PRか, 表示位置）と次ページの有無
+    """
+    if not html or not html.strip():
+        return ParsedPage([], False)
+    if lxml is not None:
+        return _parse_rakuten_lxml(html)
+    return _parse_rakuten_bs4(html)
+
+
+def _parse_amazon_lxml(html: str) -> ParsedPage:
+    """lxmlでAmazonの検索結果ページを解析"""
+    root = lxml.html.fromstring(html)
+    items = []
+
+    for product in root.xpath(_AMAZON_PRODUCTS):
+        asin = product.get('data-asin', '')
+        if not asin:
+            continue
+        is_sponsored = bool(product.xpath(_AMAZON_SPONSORED))
+        items.append(SerpItem(asin, is_sponsored, len(items) + 1))
+
+    counts = root.xpath(_AMAZON_RESULT_COUNT)
+    total_results = parse_total_results(counts[0].text_content()) if counts else None
+    return ParsedPage(items, bool(root.xpath(_AMAZON_NEXT)), total_results)
+
+
+def _parse_rakuten_lxml(html: str) -> ParsedPage:
+    """lxmlで楽天の検索結果ページを解析"""
+    root = lxml.html.fromstring(html)
+    items = []
+
+    for position, product in enumerate(root.xpath(_RAKUTEN_PRODUCTS), start=1):
+        links = product.xpath('.//a')
+        href = links[0].get('href') if links else None
+        item_id = extract_product_id(href) if href else None
+        is_sponsored = bool(product.xpath(_RAKUTEN_PR))
+        items.append(SerpItem(item_id, is_sponsored, position))
+
+    has_next = False
+    pagination = root.xpath(_RAKUTEN_PAGINATION)
+    if pagination:
+        has_next = any('次へ' in link.text_content() for link in pagination[0].xpath('.//a'))
+
+    total_results = _first_total(
+        (count.text_content() for count in root.xpath(_RAKUTEN_RESULT_COUNT)),
+        parse_rakuten_total_results
+    )
+    return ParsedPage(items, has_next, total_results)
+
+
+def _is_sponsored_tag(product) -> bool:
+    """BeautifulSoupの商品要素が広告（スポンサー）商品か判定"""
+    try:
+        # 1. data-component-type属性がsp-sponsored-resultの要素
+        if product.get('data-component-type') == 'sp-sponsored-result' or \
+                product.find(attrs={'data-component-type': 'sp-sponsored-result'}):
+            return True
+
+        # 2. AdHolderクラス / 4. s-sponsored-labelクラスを含む要素
+        for class_name in ('AdHolder', 's-sponsored-label'):
+            if class_name in product.get('class', []) or product.find(class_=class_name):
+                return True
+
+        # 3. s-label-popover内の「スポンサー」「Sponsored」ラベル
+        for label in product.find_all(class_='s-label-popover'):
+            if any(text.strip() in SPONSORED_LABELS for text in label.find_all(string=True, recursive=False)):
+                return True
+
+        return False
+
+    except Exception as e:
+        logger.debug(f"広告判定中のエラー: {e}")
+        return False
+
+
+def _parse_amazon_bs4(html: str) -> ParsedPage:
+    """BeautifulSoupでAmazonの検索結果ページを解析"""
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+
+    for product in soup.find_all('div', {'data-component-type': 's-search-result'}):
+        asin = product.get('data-asin', '')
+        if not asin:
+            continue
+        items.append(SerpItem(asin, _is_sponsored_tag(product), len(items) + 1))
+
+    has_next = soup.find('a', {'aria-label': AMAZON_NEXT_LABEL}) is not None
+    count = soup.find(attrs={'data-component-type': 's-result-info-bar'})
+    total_results = parse_total_results(count.get_text()) if count else None
+    return ParsedPage(items, has_next, total_results)
+
+
+def _parse_rakuten_bs4(html: str) -> ParsedPage:
+    """BeautifulSoupで楽天の検索結果ページを解析"""
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+
+    for position, product in enumerate(soup.find_all('div', class_='searchresultitem'), start=1):
+        link_elem = product.find('a')
+        href = link_elem.get('href') if link_elem else None
+        item_id = extract_product_id(href) if href else None
+        is_sponsored = product.find(string=lambda text: text.strip() == 'PR') is not None
+        items.append(SerpItem(item_id, is_sponsored, position))
+
+    has_next = False
+    pagination = soup.find('div', class_='pagination')
+    if pagination:
+        has_next = any('次へ' in link.get_text() for link in pagination.find_all('a'))
+
+    total_results = _first_total(
+        (
+            count.get_text() for count in soup.find_all(class_='count')
+            if '件' in count.get_text() and count.find_parent('div', class_='searchresultitem') is None
+        ),
+        parse_rakuten_total_results
+    )
+    return ParsedPage(items, has_next, total_results)
+
+
+def parse_amazon_script_result(result: Dict[str, Any]) -> ParsedPage:
+    """
+    ブラウザ内抽出（AMAZON_EXTRACT_SCRIPT）の戻り値を解析結果に変換
+
+    Args:
+        result: execute_scriptの戻り値
+
+    Returns:
+        ASINを持つ商品の（ASIN, 広告か, 表示位置）と次ページの有無
+    """
+    items = [
+        SerpItem(item['id'], bool(item['sponsored']), int(item['position']))
+        for item in (result or {}).get('items', [])
+    ]
+    return ParsedPage(
+        items,
+        bool((result or {}).get('has_next')),
+        parse_total_results((result or {}).get('total_text'))
+    )
+
+
+def parse_rakuten_script_result(result: Dict[str, Any]) -> ParsedPage:
+    """
+    ブラウザ内抽出（RAKUTEN_EXTRACT_SCRIPT）の戻り値を解析結果に変換
+
+    Args:
+        result: execute_scriptの戻り値
+
+    Returns:
+        全商品（PR含む）の（商品ID, PRか, 表示位置）と次ページの有無
+    """
+    items = [
+        SerpItem(
+            extract_product_id(item['url']) if item.get('url') else None,
+            bool(item['sponsored']),
+            int(item['position'])
+        )
+        for item in (result or {}).get('items', [])
+    ]
+    return ParsedPage(
+        items,
+        bool((result or {}).get('has_next')),
+        parse_rakuten_total_results((result or {}).get('total_text'))
+    )
+
+
+_RAW_PAGE_PARSERS = {
+    ('amazon', 'html'): parse_amazon_serp,
+    ('amazon', 'script'): parse_amazon_script_result,
+    ('rakuten', 'html'): parse_rakuten_serp,
+    ('rakuten', 'script'): parse_rakuten_script_result,
+}
+
+
+def parse_raw_page(marketplace: str, raw_page: RawPage) -> ParsedPage:
+    """
+    解析前のページをマーケットプレイスと種類に応じて解析
+
+    解析プロセスからも呼べるよう、引数・戻り値ともにpickle可能な値だけを使う。
+
+    Args:
+        marketplace: マーケットプレイス名（amazon / rakuten）
+        raw_page: 解析前のページ
+
+    Returns:
+        ページの解析結果
+    """
+    return _RAW_PAGE_PARSERS[(marketplace, raw_page.kind)](raw_page.data)
@@ -0,0 +1,64 @@
+"""
+ブラウザ内で検索結果を抽出するJavaScript
+
+driver.page_source で描画済みDOM全体を転送する代わりに、ページ内で結果カードを
+走査して {items: [...], has_next: bool, total_text: 検索結果数の表示} だけを返す。判定条件は serp_parser と揃えている。
+"""
+
+AMAZON_EXTRACT_SCRIPT = r"""
+const labels = ['スポンサー', 'Sponsored'];
+const sponsoredSelector = '[data-component-type="sp-sponsored-result"], .AdHolder, .s-sponsored-label';
+const items = [];
+
+for (const card of document.querySelectorAll('div[data-component-type="s-search-result"]')) {
+    const asin = card.getAttribute('data-asin') || '';
+    if (!asin) {
+        continue;
+    }
+
+    let sponsored = card.matches(sponsoredSelector) || card.querySelector(sponsoredSelector) !== null;
+    if (!sponsored) {
+        for (const label of card.querySelectorAll('.s-label-popover')) {
+            sponsored = Array.from(label.childNodes).some(
+                node => node.nodeType === Node.TEXT_NODE && labels.includes(node.textContent.trim())
+            );
+            if (sponsored) {
+                break;
+            }
+        }
+    }
+
+    items.push({id: asin, sponsored: sponsored, position: items.length + 1});
+}
+
+const hasNext = document.querySelector('a[aria-label="次のページに移動してください"]') !== null;
+const count = document.querySelector('[data-component-type="s-result-info-bar"]');
+return {items: items, has_next: hasNext, total_text: count ? count.textContent : null};
+"""
+
+RAKUTEN_EXTRACT_SCRIPT = r"""
+const items = [];
+
+document.querySelectorAll('div.searchresultitem').forEach((card, index) => {
+    const link = card.querySelector('a');
+    let sponsored = false;
+    const walker = document.createTreeWalker(card, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        if (walker.currentNode.textContent.trim() === 'PR') {
+            sponsored = true;
+            break;
+        }
+    }
+    items.push({url: link ? link.getAttribute('href') : null, sponsored: sponsored, position: index + 1});
+});
+
+let hasNext = false;
+const pagination = document.querySelector('div.pagination');
+if (pagination) {
+    hasNext = Array.from(pagination.querySelectorAll('a')).some(link => link.textContent.includes('次へ'));
+}
+const count = Array.from(document.querySelectorAll('.count')).find(
+    elem => elem.textContent.includes('件') && !elem.closest('div.searchresultitem')
+);
+return {items: items, has_next: hasNext, total_text: count ? count.textContent : null};
+"""
@@ -0,0 +1,252 @@
+"""
+検索結果の上位商品を日ごとに列指向（Parquet）で保存するスナップショット
+
+キーワードの検索で確認した全商品を（ページ番号, 表示順, オーガニック順位, 広告か, ASIN・楽天商品ID）の
+順に記録する。競合商品や新しいSKUを追加したときも、その日の順位をスナップショットから引けるため
+検索し直す必要がない。
+
+ファイルは <保存先>/date=YYYY-MM-DD/<マーケットプレイス>-<時刻>-<プロセスID>.parquet に書き出す。
+同じ日に同じキーワードを複数回検索した場合は、最後に記録した検索結果を使う。
+pyarrowが必要（pip install pyarrow）。
+
+検索は対象商品が見つかった時点で打ち切るため、記録されるのは実際に取得したページの商品だけである。
+打ち切ったキーワードで見つからない商品の順位は「不明」、最終ページまたは最大検索ページ数まで
+確認したキーワードで見つからない商品は「圏外」になる。
+"""
+
+import os
+import threading
+from datetime import date as date_type, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+from loguru import logger
+
+from src.rank_state import RankState
+from src.search_planner import SearchPlan
+from src.ranking import RANK_UNKNOWN
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrowが無い場合はスナップショットを使えない
+    pa = None
+    pq = None
+
+
+_COLUMNS = ('marketplace', 'keyword', 'captured_at', 'page', 'slot', 'position', 'sponsored', 'item_id',
+            'pages_scanned', 'exhaustive')
+
+
+def _schema():
+    """スナップショットのスキーマ（文字列の列は辞書エンコードで小さく保存する）"""
+    return pa.schema([
+        ('marketplace', pa.dictionary(pa.int8(), pa.string())),
+        ('keyword', pa.dictionary(pa.int32(), pa.string())),
+        ('captured_at', pa.timestamp('ms')),
+        ('page', pa.int16()),
+        ('slot', pa.int16()),  # 広告を含めた表示順（1から始まる、ページをまたいで通し番号）
+        ('position', pa.int32()),  # オーガニック順位（順位に数えない商品はnull）
+        ('sponsored', pa.bool_()),
+        ('item_id', pa.string()),
+        ('pages_scanned', pa.int16()),
+        ('exhaustive', pa.bool_()),  # 最終ページまたは最大検索ページ数まで確認したか
+    ])
+
+
+class KeywordSnapshot(NamedTuple):
+    """1キーワード・1日分のスナップショット"""
+    captured_at: datetime
+    exhaustive: bool
+    positions: Dict[str, Optional[int]]  # ASIN・楽天商品ID → オーガニック順位（広告としてのみ表示された商品はNone）
+
+    def rank(self, item_id: str) -> Optional[Union[int, str]]:
+        """
+        商品の順位
+
+        Args:
+            item_id: ASINまたは楽天商品ID
+
+        Returns:
+            オーガニック順位（見つからない場合はNone、検索を打ち切っていて確認できない場合はRANK_UNKNOWN）
+        """
+        position = self.positions.get(item_id)
+        if position is not None:
+            return position
+        return None if self.exhaustive else RANK_UNKNOWN
+
+
+class SerpSnapshot:
+    """検索結果の上位商品のスナップショット（記録と順位の参照）"""
+
+    def __init__(self, directory: Union[str, Path], flush_rows: int = 100000):
+        """
+        Args:
+            directory: スナップショットの保存先
+            flush_rows: メモリに溜める行数の上限（超えたらファイルに書き出す）
+        """
+        if pa is None:
+            raise RuntimeError("SERPスナップショットにはpyarrowが必要です（pip install pyarrow）")
+        self.directory = Path(directory)
+        self.flush_rows = flush_rows
+        self.rows = 0  # 書き出した行数
+        self._buffers: Dict[Tuple[str, str], Dict[str, List[Any]]] = {}  # （日付, マーケットプレイス）→ 列ごとの値
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._days: Dict[str, Dict[Tuple[str, str], KeywordSnapshot]] = {}  # 読み込んだ日のキャッシュ
+
+    def add(self, marketplace: str, rank_state: RankState, captured_at: Optional[datetime] = None):
+        """
+        検索し終えたキーワードの商品を記録
+
+        Args:
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            rank_state: 検索し終えたキーワードの状態（record_items=Trueで作成したもの）
+            captured_at: 検索日時（Noneの場合は現在時刻）
+        """
+        if not rank_state.items:
+            return
+        captured_at = captured_at or datetime.now()
+        pages_scanned = rank_state.items[-1][0]
+
+        with self._lock:
+            columns = self._buffers.setdefault(
+                (captured_at.strftime('%Y-%m-%d'), marketplace),
+                {column: [] for column in _COLUMNS}
+            )
+            for slot, (page, item, position) in enumerate(rank_state.items, start=1):
+                columns['marketplace'].append(marketplace)
+                columns['keyword'].append(rank_state.keyword)
+                columns['captured_at'].append(captured_at)
+                columns['page'].append(page)
+                columns['slot'].append(slot)
+                columns['position'].append(position)
+                columns['sponsored'].append(item.is_sponsored)
+                columns['item_id'].append(item.item_id)
+                columns['pages_scanned'].append(pages_scanned)
+                columns['exhaustive'].append(rank_state.exhaustive)
+            self._buffered += len(rank_state.items)
+            if self._buffered >= self.flush_rows:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        """溜めた行を日付・マーケットプレイスごとのファイルに書き出す（ロックを持って呼ぶ）"""
+        stamp = datetime.now().strftime('%H%M%S%f')
+        for (day, marketplace), columns in self._buffers.items():
+            path = self.directory / f'date={day}' / f'{marketplace}-{stamp}-{os.getpid()}.parquet'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pydict(columns, schema=_schema())
+            # 書きかけのファイルを読まないよう、一時ファイルに書いてから置き換える
+            temp_path = path.with_suffix('.tmp')
+            pq.write_table(table, temp_path, compression='zstd')
+            os.replace(temp_path, path)
+            self._days.pop(day, None)
+            self.rows += table.num_rows
+        self._buffers = {}
+        self._buffered = 0
+
+    def flush(self):
+        """溜めた行をファイルに書き出す"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """溜めた行を書き出して閉じる"""
+        self.flush()
+        if self.rows:
+            logger.info(f"SERPスナップショット: {self.rows} 件の商品を記録しました（{self.directory}）")
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.close()
+
+    def load_day(self, day: str) -> Dict[Tuple[str, str], KeywordSnapshot]:
+        """
+        1日分のスナップショットを読み込む
+
+        Args:
+            day: 日付（YYYY-MM-DD形式）
+
+        Returns:
+            （マーケットプレイス, キーワード）とスナップショットの辞書
+        """
+        if day in self._days:
+            return self._days[day]
+
+        latest: Dict[Tuple[str, str], KeywordSnapshot] = {}
+        for path in sorted((self.directory / f'date={day}').glob('*.parquet')):
+            columns = pq.read_table(path, columns=['marketplace', 'keyword', 'captured_at', 'position', 'item_id', 'exhaustive']).to_pydict()
+            rows = zip(columns['marketplace'], columns['keyword'], columns['captured_at'],
+                       columns['position'], columns['item_id'], columns['exhaustive'])
+            for marketplace, keyword, captured_at, position, item_id, exhaustive in rows:
+                key = (marketplace, keyword)
+                snapshot = latest.get(key)
+                if snapshot is None or snapshot.captured_at < captured_at:
+                    # 後から検索した結果で置き換える
+                    snapshot = KeywordSnapshot(captured_at, exhaustive, {})
+                    latest[key] = snapshot
+                elif snapshot.captured_at > captured_at:
+                    continue
+                # 広告とオーガニックの両方に表示された商品はオーガニック順位を使う
+                if item_id and snapshot.positions.get(item_id) is None:
+                    snapshot.positions[item_id] = position
+
+        self._days[day] = latest
+        return latest
+
+    def lookup(self, day: str, marketplace: str, keyword: str, item_id: str) -> Optional[Union[int, str]]:
+        """
+        スナップショットから商品の順位を引く
+
+        Args:
+            day: 日付（YYYY-MM-DD形式）
+            marketplace: マーケットプレイス名（amazon / rakuten）
+            keyword: 検索キーワード
+            item_id: ASINまたは楽天商品ID
+
+        Returns:
+            オーガニック順位（圏外はNone、その日のスナップショットが無い・確認できない場合はRANK_UNKNOWN）
+        """
+        snapshot = self.load_day(day).get((marketplace, keyword))
+        if snapshot is None:
+            return RANK_UNKNOWN
+        return snapshot.rank(item_id)
+
+    def rank_results(self, plan: SearchPlan, since: str, until: str) -> List[Dict[str, Any]]:
+        """
+        期間内のスナップショットから、検索計画の全SKU×キーワードの順位を引く
+
+        Args:
+            plan: 検索計画（現在の入力シートから作成）
+            since: 開始日（YYYY-MM-DD形式）
+            until: 終了日（YYYY-MM-DD形式）
+
+        Returns:
+            write_ranking_data に渡せるランキング結果のリスト（スナップショットが無い日付・キーワードは含まない）
+        """
+        results = []
+        day = date_type.fromisoformat(since)
+        while day <= date_type.fromisoformat(until):
+            day_str = day.isoformat()
+            snapshots = self.load_day(day_str)
+            day += timedelta(days=1)
+            if not snapshots:
+                continue
+
+            ranks = {}
+            for marketplace in ('amazon', 'rakuten'):
+                ranks[marketplace] = {}
+                for keyword, targets in plan.targets(marketplace).items():
+                    snapshot = snapshots.get((marketplace, keyword))
+                    ranks[marketplace][keyword] = {
+                        target: snapshot.rank(target) if snapshot else RANK_UNKNOWN for target in targets
+                    }
+            captured_keywords = {keyword for _, keyword in snapshots}
+            results += [
+                result for result in plan.build_results(ranks['amazon'], ranks['rakuten'], day_str)
+                if result['keyword'] in captured_keywords
+            ]
+        return results
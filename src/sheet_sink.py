@@ -0,0 +1,180 @@
+"""
+検索中に完了した結果行を少しずつランキングシートに書き込むシンク
+
+実行ジャーナル（src.run_journal）を定期的に読み、SKUの全マーケットプレイスの結果がそろった行を
+一定の行数または一定の時間ごとにまとめて upsert_ranking_data で書き込む。結果の元はジャーナルに
+あるため、シンクが持つのはこの実行で書き込み済みの（SKU名, キーワード）だけで、複数プロセスで分担した
+検索の結果も書き込める。
+
+- 書き込みに失敗した行は次の書き込みで再送する（少なくとも1回は書き込む）
+- 同じ日・SKU×キーワードの行は上書きするため、再送や --resume、常駐モードが書き込んだ行と
+  重なっても行は増えず、この実行の順位で置き換わる
+- Sheets APIの書き込み回数の上限に収まるよう、書き込みの間隔を空け、失敗したら間隔を倍に延ばす
+- 「不明」を含む行は --resume で検索し直す可能性があるため、検索の途中では書き込まず最後に書き込む
+  （書き込み済みには数えないため、再開後に確定した順位で上書きされる）
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+from src.google_sheets import GoogleSheetsClient
+from src.run_journal import RunJournal
+from src.search_planner import SearchPlan
+from src.ranking import RANK_UNKNOWN
+
+
+class SheetSink:
+    """完了した結果行をランキングシートに順次書き込むシンク"""
+
+    def __init__(
+        self,
+        sheets_client: GoogleSheetsClient,
+        sheet_name: str,
+        journal: RunJournal,
+        batch_rows: int = 200,
+        flush_interval: float = 60,
+        min_write_interval: float = 5,
+        poll_interval: float = 5,
+        max_backoff: float = 300,
+        max_retries: int = 5
+    ):
+        """
+        Args:
+            sheets_client: Google Sheetsクライアント
+            sheet_name: 書き込むシート名
+            journal: 結果を読み出す実行ジャーナル
+            batch_rows: 1回に書き込む最大行数（この行数たまったらすぐに書き込む）
+            flush_interval: 行数がたまらなくても書き込むまでの秒数
+            min_write_interval: 書き込みの最小間隔（秒、Sheets APIの書き込み回数の上限対策）
+            poll_interval: ジャーナルを確認する間隔（秒）
+            max_backoff: 失敗したときに延ばす書き込み間隔の上限（秒）
+            max_retries: 最後の書き込みで連続して失敗してよい回数
+        """
+        self.sheets_client = sheets_client
+        self.sheet_name = sheet_name
+        self.journal = journal
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = flush_interval
+        self.min_write_interval = min_write_interval
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.rows_written = 0
+
+        self.plan: Optional[SearchPlan] = None
+        self._written: Set[Tuple[str, str]] = set()  # この実行で確定した順位を書き込んだ（SKU名, キーワード）
+        self._interval = min_write_interval
+        self._last_write = 0.0
+        self._pending_since: Optional[float] = None  # 書き込み待ちの行が出てきた時刻
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(row: Dict[str, Any]) -> Tuple[str, str]:
+        """行の重複判定キー"""
+        return row['sku_name'], row['keyword']
+
+    def start(self, plan: SearchPlan):
+        """
+        書き込みを開始
+
+        Args:
+            plan: 検索計画（ジャーナルの結果をSKU×キーワードの行に展開するために使う）
+        """
+        self.plan = plan
+        self._thread = threading.Thread(target=self._run, name='sheet-sink', daemon=True)
+        self._thread.start()
+
+    def _settled_rows(self) -> List[Dict[str, Any]]:
+        """ジャーナルから、まだ書き込んでいない確定した行を作る"""
+        ranks = self.journal.load()
+        rows = self.plan.build_results(ranks['amazon'], ranks['rakuten'], self.journal.run_date, complete_only=True)
+        return [
+            row for row in rows
+            if self._key(row) not in self._written
+            and RANK_UNKNOWN not in (row['amazon_rank'], row['rakuten_rank'])
+        ]
+
+    def _run(self):
+        """ジャーナルを定期的に確認して書き込むスレッド"""
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._poll()
+            except Exception as e:
+                logger.warning(f"シートへの順次書き込みでエラーが発生しました（続行します）: {e}")
+
+    def _poll(self):
+        """書き込み待ちの行が一定数たまったか、一定時間たっていれば1回分書き込む"""
+        rows = self._settled_rows()
+        if not rows:
+            self._pending_since = None
+            return
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        if len(rows) >= self.batch_rows or now - self._pending_since >= self.flush_interval:
+            self._write(rows[:self.batch_rows])
+
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        """
+        行を書き込む（書き込みの間隔を守り、失敗したら間隔を延ばす）
+
+        Args:
+            rows: 書き込む行
+
+        Returns:
+            書き込めた場合True
+        """
+        delay = self._last_write + self._interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        try:
+            # 同じ日・SKU×キーワードの行は上書きし、1日1行にする（常駐モード・最後の書き込みと同じ）
+            self.sheets_client.upsert_ranking_data(rows, self.sheet_name)
+        except Exception as e:
+            self._interval = min(self.max_backoff, max(self._interval, 1) * 2)
+            logger.warning(f"シートに書き込めませんでした（{self._interval:.0f}秒後に再送します）: {e}")
+            return False
+        finally:
+            self._last_write = time.monotonic()
+
+        self._interval = self.min_write_interval
+        # 「不明」の行は再開後に確定した順位で上書きできるよう、書き込み済みに数えない
+        self._written.update(
+            self._key(row) for row in rows if RANK_UNKNOWN not in (row['amazon_rank'], row['rakuten_rank'])
+        )
+        self.rows_written += len(rows)
+        self._pending_since = None
+        return True
+
+    def finish(self, results: List[Dict[str, Any]]) -> int:
+        """
+        順次書き込みを止め、まだ書き込んでいない行を全て書き込む
+
+        Args:
+            results: 実行全体のランキング結果（「不明」の行も含む）
+
+        Returns:
+            この実行で書き込んだ行数
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+        rows = [row for row in results if self._key(row) not in self._written]
+        failures = 0
+        while rows:
+            batch = rows[:self.batch_rows]
+            if self._write(batch):
+                rows = rows[len(batch):]
+                failures = 0
+                continue
+            failures += 1
+            if failures > self.max_retries:
+                raise RuntimeError(
+                    f"シートに {len(rows)} 行を書き込めませんでした（--resume で書き込みをやり直せます）"
+                )
+        return self.rows_written
@@ -20,6 +20,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import *
 from src.google_sheets import GoogleSheetsClient
+from src.ranking import parse_rank_cell
 
 
 class RankingVisualizer:
@@ -64,9 +65,9 @@ class RankingVisualizer:
             # 日付をdatetime型に変換
             df['日付'] = pd.to_datetime(df['日付'])
             
-            # 順位を数値に変換（圏外は999）
-            df['Amazon順位'] = df['Amazon順位'].apply(lambda x: 999 if x == '圏外' else int(x))
-            df['楽天順位'] = df['楽天順位'].apply(lambda x: 999 if x == '圏外' else int(x))
+            # 順位を数値に変換（圏外は999、不明は欠損値）
+            df['Amazon順位'] = df['Amazon順位'].apply(parse_rank_cell)
+            df['楽天順位'] = df['楽天順位'].apply(parse_rank_cell)
             
             # フィルタリング
             if sku_name:
@@ -0,0 +1,128 @@
+"""
+ページ取得・キーワード検索の期限を監視するウォッチドッグ
+
+driver.get() などブラウザへの呼び出しが応答しなくなると、呼び出したスレッドは例外も出せずに
+止まり続ける。ウォッチドッグは期限を別スレッドで監視し、期限を過ぎたら登録された処理
+（応答しないタブ・ブラウザのプロセスの強制終了）を実行する。タブやプロセスが無くなると止まっていた呼び出しは
+エラーで戻るため、呼び出し側はそのページを「期限切れ」として扱い、検索を続けられる。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+from loguru import logger
+
+
+class Deadline:
+    """ウォッチドッグに登録した1件の期限"""
+
+    def __init__(self, watchdog: Optional['Watchdog'], expires_at: float, on_expire: Callable[[], None], label: str):
+        """
+        Args:
+            watchdog: 監視するウォッチドッグ（Noneの場合は期限切れにならない）
+            expires_at: 期限（time.monotonic() の値）
+            on_expire: 期限を過ぎたときに監視スレッドで呼ぶ処理
+            label: ログに表示する名前
+        """
+        self.watchdog = watchdog
+        self.expires_at = expires_at
+        self.on_expire = on_expire
+        self.label = label
+        self.expired = False  # 期限を過ぎて on_expire を呼んだか
+
+    def cancel(self):
+        """期限の監視をやめる（処理が期限内に終わった場合に呼ぶ）"""
+        if self.watchdog:
+            self.watchdog._cancel(self)
+
+    def __enter__(self):
+        """with文のenter処理"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """with文のexit処理"""
+        self.cancel()
+
+
+class Watchdog:
+    """登録された期限を1つのスレッドで監視し、過ぎたものの処理を実行する"""
+
+    def __init__(self, poll_interval: float = 0.5):
+        """
+        Args:
+            poll_interval: 期限を確認する間隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.expired_count = 0  # 期限を過ぎた件数
+        self._deadlines: Dict[int, Deadline] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, seconds: Optional[float], on_expire: Callable[[], None], label: str) -> Deadline:
+        """
+        期限を登録
+
+        Args:
+            seconds: 期限までの秒数（0以下・Noneの場合は監視しない）
+            on_expire: 期限を過ぎたときに監視スレッドで呼ぶ処理
+            label: ログに表示する名前
+
+        Returns:
+            登録した期限（処理が終わったら cancel する。with文でも使える）
+        """
+        if not seconds or seconds <= 0:
+            return Deadline(None, float('inf'), on_expire, label)
+
+        deadline = Deadline(self, time.monotonic() + seconds, on_expire, label)
+        with self._cond:
+            self._deadlines[id(deadline)] = deadline
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='watchdog', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return deadline
+
+    def _cancel(self, deadline: Deadline):
+        """期限の登録を外す"""
+        with self._cond:
+            self._deadlines.pop(id(deadline), None)
+
+    def _run(self):
+        """期限を過ぎたものを取り出して処理する監視スレッド"""
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                expired = [deadline for deadline in self._deadlines.values() if deadline.expires_at <= now]
+                for deadline in expired:
+                    del self._deadlines[id(deadline)]
+                    deadline.expired = True
+                if not expired:
+                    self._cond.wait(self.poll_interval)
+                    continue
+
+            # 強制終了は時間がかかることがあるため、ロックを持たずに実行する
+            for deadline in expired:
+                self.expired_count += 1
+                logger.warning(f"期限を過ぎたため強制終了します: {deadline.label}")
+                try:
+                    deadline.on_expire()
+                except Exception as e:
+                    logger.error(f"期限切れの処理に失敗しました: {deadline.label} - {e}")
+
+
+_default_watchdog: Optional[Watchdog] = None
+_default_lock = threading.Lock()
+
+
+def default_watchdog() -> Watchdog:
+    """
+    プロセス共通のウォッチドッグを取得
+
+    Returns:
+        ウォッチドッグ
+    """
+    global _default_watchdog
+    with _default_lock:
+        if _default_watchdog is None:
+            _default_watchdog = Watchdog()
+        return _default_watchdog
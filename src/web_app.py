@@ -21,7 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.config import *
 from src.google_sheets import GoogleSheetsClient
 from src.visualizer import RankingVisualizer
-from src.main import search_rankings
+from src.main import search_all_rankings
 
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
 CORS(app)
@@ -188,8 +188,8 @@ def get_ranking_history():
             
             # JSON形式に変換
             df['日付'] = df['日付'].dt.strftime('%Y-%m-%d')
-            df['Amazon順位'] = df['Amazon順位'].apply(lambda x: None if x == 999 else x)
-            df['楽天順位'] = df['楽天順位'].apply(lambda x: None if x == 999 else x)
+            df['Amazon順位'] = df['Amazon順位'].apply(lambda x: None if x == 999 or pd.isna(x) else x)
+            df['楽天順位'] = df['楽天順位'].apply(lambda x: None if x == 999 or pd.isna(x) else x)
             
             data = df.to_dict('records')
         else:
@@ -250,10 +250,7 @@ def run_search():
             return jsonify({'status': 'error', 'message': '対象商品が見つかりません'}), 404
         
         # 検索を実行
-        all_results = []
-        for sku_data in sku_list:
-            results = search_rankings(sku_data)
-            all_results.extend(results)
+        all_results = search_all_rankings(sku_list)
         
         # 結果を保存
         if all_results:
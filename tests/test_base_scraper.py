@@ -0,0 +1,40 @@
+"""BaseScraper のHTTP取得結果の判定のテスト"""
+
+from pathlib import Path
+
+from src.amazon_scraper import AmazonScraper
+from src.page_readiness import PageState
+from src.rate_limiter import RateLimiter
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+URL = 'https://www.amazon.co.jp/s?k=kw'
+
+
+class FakeHttpFetcher:
+    """決まったHTMLを返す HttpFetcher の代わり"""
+
+    def __init__(self, html):
+        self.html = html
+
+    def fetch(self, url, markers):
+        return (PageState.READY if markers.ready_marker in self.html else PageState.TIMEOUT), self.html
+
+
+def scraper_for(html):
+    return AmazonScraper(http_fetcher=FakeHttpFetcher(html), rate_limiter=RateLimiter({}))
+
+
+def test_http_page_with_results_is_ready():
+    html = (FIXTURES / 'amazon_serp.html').read_text(encoding='utf-8')
+    state, raw_page, _ = scraper_for(html)._request_page(URL, http_only=True)
+    assert state == PageState.READY
+    assert raw_page.data == html
+
+
+def test_http_page_that_parses_to_nothing_is_not_final():
+    # 目印の文字列だけがあり、商品も次のページへのリンクも解析できないページ
+    html = '<html><body><script>var c = "s-search-result";</script></body></html>'
+    state, raw_page, _ = scraper_for(html)._request_page(URL, http_only=True)
+    assert state == PageState.TIMEOUT
+    assert raw_page is None
@@ -0,0 +1,40 @@
+"""TabPool のブラウザ起動のテスト"""
+
+import threading
+
+from src.browser_pool import TabPool
+
+
+class SlowLaunchPool(TabPool):
+    """起動に時間がかかるブラウザの代わりを使う TabPool"""
+
+    def __init__(self):
+        super().__init__(size=4)
+        self.launches = 0
+        self.release_launch = threading.Event()
+        self.launch_started = threading.Event()
+
+    def _launch_browser(self):
+        self.launches += 1
+        self.launch_started.set()
+        self.release_launch.wait(1)
+        return object()
+
+
+def test_browser_launches_once_outside_the_lock():
+    pool = SlowLaunchPool()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool._browser())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert pool.launch_started.wait(1)
+
+    # 起動中もロックは空いている（返却・状態確認が止まらない）
+    assert pool._lock.acquire(timeout=0.5)
+    pool._lock.release()
+
+    pool.release_launch.set()
+    for thread in threads:
+        thread.join(1)
+    assert pool.launches == 1
+    assert len(results) == 3 and all(shared is results[0] for shared in results)
@@ -0,0 +1,73 @@
+"""CircuitBreaker のテスト"""
+
+import threading
+import time
+
+from src.circuit_breaker import CircuitBreaker
+from src.page_readiness import PageState
+
+
+def test_closed_breaker_lets_requests_through():
+    breaker = CircuitBreaker('test')
+    assert breaker.acquire()
+    breaker.record_result(PageState.READY)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_block_opens_and_cooldown_doubles():
+    breaker = CircuitBreaker('test', base_cooldown=10, max_cooldown=15, max_trips=5)
+    breaker.record_result(PageState.BLOCKED)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 9 < breaker.open_until - time.monotonic() <= 10
+
+    # 待機中に戻ってきた結果は数えない
+    breaker.record_result(PageState.BLOCKED)
+    assert breaker.trips == 1
+
+    breaker.state = CircuitBreaker.HALF_OPEN
+    breaker.record_result(PageState.BLOCKED)
+    assert breaker.trips == 2
+    assert 14 < breaker.open_until - time.monotonic() <= 15
+
+
+def test_half_open_lets_one_probe_through_and_success_closes():
+    breaker = CircuitBreaker('test', base_cooldown=0.05)
+    breaker.record_result(PageState.BLOCKED)
+
+    assert breaker.acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # 回復確認の結果が出るまで他のリクエストは待たされる
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: breaker.acquire() and acquired.set())
+    waiter.start()
+    assert not acquired.wait(0.1)
+
+    breaker.record_result(PageState.NO_RESULTS)
+    waiter.join(1)
+    assert acquired.is_set()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.trips == 0
+
+
+def test_timeout_during_probe_retries_probe():
+    breaker = CircuitBreaker('test', base_cooldown=0.01)
+    breaker.record_result(PageState.BLOCKED)
+    time.sleep(0.02)
+    assert breaker.acquire()
+
+    breaker.record_result(PageState.TIMEOUT)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+    assert breaker.acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_gives_up_after_max_trips():
+    breaker = CircuitBreaker('test', base_cooldown=0.01, max_trips=2)
+    breaker.record_result(PageState.BLOCKED)
+    assert breaker.acquire()
+    breaker.record_result(PageState.BLOCKED)
+
+    assert breaker.gave_up
+    assert not breaker.acquire()
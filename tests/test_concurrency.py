@@ -0,0 +1,70 @@
+"""AdaptiveConcurrency（AIMDによる同時実行数の調整）のテスト"""
+
+from src.concurrency import AdaptiveConcurrency
+from src.page_readiness import PageState
+
+
+def controller(**kwargs) -> AdaptiveConcurrency:
+    options = dict(initial=4, minimum=1, maximum=6, window=4, latency_target=5.0, error_threshold=0.25)
+    options.update(kwargs)
+    return AdaptiveConcurrency('test', **options)
+
+
+def record(concurrency: AdaptiveConcurrency, samples):
+    for state, elapsed in samples:
+        concurrency.record_page(state, elapsed)
+
+
+def test_healthy_window_increases_by_one():
+    concurrency = controller()
+    record(concurrency, [(PageState.READY, 1.0)] * 3)
+    assert concurrency.limit == 4
+    concurrency.record_page(PageState.NO_RESULTS, 1.0)
+    assert concurrency.limit == 5
+
+
+def test_limit_does_not_exceed_maximum():
+    concurrency = controller(initial=6)
+    record(concurrency, [(PageState.READY, 1.0)] * 4)
+    assert concurrency.limit == 6
+
+
+def test_block_halves_immediately():
+    concurrency = controller()
+    concurrency.record_page(PageState.BLOCKED, 1.0)
+    assert concurrency.limit == 2
+
+
+def test_error_rate_over_threshold_halves():
+    concurrency = controller()
+    record(concurrency, [(PageState.TIMEOUT, 30.0), (PageState.TIMEOUT, 30.0), (PageState.READY, 1.0), (PageState.READY, 1.0)])
+    assert concurrency.limit == 2
+
+
+def test_slow_average_latency_halves():
+    concurrency = controller()
+    record(concurrency, [(PageState.READY, 6.0)] * 4)
+    assert concurrency.limit == 2
+
+
+def test_timeouts_do_not_count_toward_latency():
+    concurrency = controller()
+    record(concurrency, [(PageState.TIMEOUT, 60.0), (PageState.READY, 1.0), (PageState.READY, 1.0), (PageState.READY, 1.0)])
+    assert concurrency.limit == 5
+
+
+def test_limit_does_not_go_below_minimum():
+    concurrency = controller(initial=1)
+    concurrency.record_page(PageState.BLOCKED, 1.0)
+    assert concurrency.limit == 1
+
+
+def test_acquire_and_release_track_active_slots():
+    concurrency = controller(initial=2)
+    concurrency.acquire()
+    concurrency.acquire()
+    assert concurrency.active == 2
+    concurrency.release()
+    concurrency.release()
+    concurrency.release()
+    assert concurrency.active == 0
@@ -0,0 +1,44 @@
+"""DepthPolicy（長期圏外の組み合わせの検索ページ数）のテスト"""
+
+from datetime import date, timedelta
+
+from src.depth_policy import DepthPolicy
+
+
+def history(*cells, sku_name='sku', keyword='kw'):
+    """1日1件の「Amazon順位」の履歴（古い順）"""
+    start = date(2026, 10, 1)
+    return [
+        {'date': (start + timedelta(days=day)).isoformat(), 'sku_name': sku_name, 'keyword': keyword,
+         'amazon_rank': cell, 'rakuten_rank': ''}
+        for day, cell in enumerate(cells)
+    ]
+
+
+def test_streak_counts_consecutive_out_of_range_days():
+    streaks = DepthPolicy._count_streaks(history('3', '圏外', '不明', '圏外', '>48位', '圏外'))
+    assert streaks[('sku', 'kw', 'amazon')] == 3
+
+
+def test_same_day_rows_count_as_one_day():
+    rows = [
+        {'date': '2026-10-01', 'sku_name': 'sku', 'keyword': 'kw', 'amazon_rank': '圏外', 'rakuten_rank': ''}
+        for _ in range(24)
+    ]
+    assert DepthPolicy._count_streaks(rows)[('sku', 'kw', 'amazon')] == 1
+
+
+def test_last_row_of_the_day_wins():
+    rows = history('圏外', '圏外') + [
+        {'date': '2026-10-02', 'sku_name': 'sku', 'keyword': 'kw', 'amazon_rank': '12', 'rakuten_rank': ''}
+    ]
+    assert DepthPolicy._count_streaks(rows)[('sku', 'kw', 'amazon')] == 0
+
+
+def test_long_term_out_of_range_is_probed_except_on_full_scan_day():
+    policy = DepthPolicy(history(*['圏外'] * 7), max_pages=5, out_of_range_days=7, probe_pages=1, full_scan_interval=7)
+    assert policy.long_term_out_of_range == 1
+
+    depths = [policy.depth('sku', 'kw', 'amazon', date(2026, 10, 10) + timedelta(days=day)) for day in range(7)]
+    assert sorted(depths) == [1, 1, 1, 1, 1, 1, 5]
+    assert policy.depth('sku', 'other', 'amazon', date(2026, 10, 10)) == 5
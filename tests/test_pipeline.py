@@ -0,0 +1,62 @@
+"""SearchPipeline（取得と解析を分けた検索）のテスト"""
+
+import threading
+import time
+from pathlib import Path
+
+from src.amazon_scraper import AmazonScraper
+from src.page_readiness import PageState
+from src.pipeline import SearchPipeline
+from src.ranking import RANK_UNKNOWN
+from src.rate_limiter import RateLimiter
+from src.search_planner import SearchPlan
+from src.serp_parser import RawPage
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+AMAZON_HTML = (FIXTURES / 'amazon_serp.html').read_text(encoding='utf-8')
+
+
+class StubScraper(AmazonScraper):
+    """ブラウザ・HTTPを使わず、決まったページを返すスクレイパー"""
+
+    def __init__(self, fetch_delay=0.0, failing_keywords=()):
+        super().__init__(rate_limiter=RateLimiter({}))
+        self.fetch_delay = fetch_delay
+        self.failing_keywords = set(failing_keywords)
+        self.fetched = []
+        self._lock = threading.Lock()
+
+    def fetch_search_page(self, keyword, page):
+        with self._lock:
+            self.fetched.append((keyword, page))
+        if keyword in self.failing_keywords:
+            raise RuntimeError('取得に失敗')
+        time.sleep(self.fetch_delay)
+        return PageState.READY, RawPage('html', AMAZON_HTML)
+
+
+def run_pipeline(scraper, plan, **kwargs):
+    pipeline = SearchPipeline(lambda marketplace: scraper, {'amazon': 2}, parse_workers=1, stats_interval=60, **kwargs)
+    return pipeline.run(plan)['amazon']
+
+
+def test_every_keyword_is_returned_when_a_fetch_raises():
+    plan = SearchPlan([
+        {'sku_name': 'SKU1', 'asin': 'B000000001', 'rakuten_url': '', 'keywords': ['ok', 'boom']},
+    ])
+    results = run_pipeline(StubScraper(failing_keywords=['boom']), plan)
+
+    assert results['ok'] == {'B000000001': 1}
+    assert results['boom'] == {'B000000001': RANK_UNKNOWN}
+
+
+def test_keyword_deadline_stops_paging():
+    plan = SearchPlan([
+        {'sku_name': 'SKU1', 'asin': 'B00MISSING', 'rakuten_url': '', 'keywords': ['kw']},
+    ])
+    scraper = StubScraper(fetch_delay=0.05)
+    results = run_pipeline(scraper, plan, max_pages=50, keyword_deadline=0.2)
+
+    # 期限までに確認できなかったターゲットは「圏外」ではなく「不明」
+    assert results['kw'] == {'B00MISSING': RANK_UNKNOWN}
+    assert len(scraper.fetched) < 50
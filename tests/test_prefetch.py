@@ -0,0 +1,66 @@
+"""PagePrefetcher（後続ページの先読み）のテスト"""
+
+import threading
+import time
+
+from src.page_readiness import PageState
+from src.prefetch import PagePrefetcher
+from src.rate_limiter import TokenBucket
+
+
+def test_results_are_taken_in_page_order():
+    fetch = lambda page, cancelled: (PageState.READY, f'page{page}')
+    with PagePrefetcher(fetch, last_page=3, window=2) as prefetcher:
+        prefetcher.schedule(1)
+        assert prefetcher.take(2) == (PageState.READY, 'page2')
+        assert prefetcher.take(3) == (PageState.READY, 'page3')
+        # 1ページ目と範囲外のページは先読みしない
+        assert prefetcher.take(1) is None
+        assert prefetcher.take(4) is None
+
+
+def test_undecided_prefetch_is_left_to_the_caller():
+    fetch = lambda page, cancelled: (PageState.TIMEOUT, None)
+    with PagePrefetcher(fetch, last_page=2, window=1) as prefetcher:
+        prefetcher.schedule(1)
+        assert prefetcher.take(2) is None
+
+
+def test_take_gives_up_on_a_prefetch_starved_by_a_saturated_bucket():
+    bucket = TokenBucket(rate=0.01, burst=1)
+    bucket.acquire()  # 他のリクエストがトークンを使い切った状態
+    finished = threading.Event()
+
+    def fetch(page, cancelled):
+        bucket.acquire(cancelled)
+        finished.set()
+        if cancelled.is_set():
+            return PageState.CANCELLED, None
+        return PageState.READY, f'page{page}'
+
+    with PagePrefetcher(fetch, last_page=2, window=1) as prefetcher:
+        prefetcher.schedule(1)
+        started_at = time.monotonic()
+        assert prefetcher.take(2, timeout=0.1) is None
+        assert time.monotonic() - started_at < 1
+
+        # 取り消された先読みはトークンを使わずにすぐ戻る
+        assert finished.wait(1)
+        assert bucket._tokens < 1
+
+
+def test_close_cancels_unused_prefetches():
+    started = threading.Event()
+    events = []
+
+    def fetch(page, cancelled):
+        events.append(cancelled)
+        started.set()
+        cancelled.wait(1)
+        return PageState.CANCELLED, None
+
+    prefetcher = PagePrefetcher(fetch, last_page=2, window=1)
+    prefetcher.schedule(1)
+    assert started.wait(1)
+    prefetcher.close()
+    assert events[0].is_set()
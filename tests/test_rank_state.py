@@ -0,0 +1,97 @@
+"""RankState（1キーワード分の順位の集計）と SearchPlan のテスト"""
+
+from src.page_readiness import PageState
+from src.rank_state import RankState
+from src.ranking import RANK_UNKNOWN
+from src.search_planner import SearchPlan
+from src.serp_parser import ParsedPage, SerpItem
+
+
+def organic_only(item: SerpItem) -> bool:
+    return not item.is_sponsored
+
+
+def page_of(*item_ids, has_next=True, sponsored=(), total_results=None) -> ParsedPage:
+    items = [SerpItem(item_id, item_id in sponsored, position) for position, item_id in enumerate(item_ids, start=1)]
+    return ParsedPage(items, has_next, total_results)
+
+
+def test_rank_counts_across_pages():
+    state = RankState('kw', ['C'], max_pages=3)
+    state.add_page(1, PageState.READY, page_of('A', 'B', total_results=1000), organic_only)
+    assert not state.done
+    state.add_page(2, PageState.READY, page_of('X', 'C'), organic_only)
+
+    ranks = state.finish()
+    assert state.done
+    assert ranks['C'] == 4
+    assert ranks.total_results == 1000
+
+
+def test_sponsored_items_are_not_ranked_but_recorded_as_ads():
+    state = RankState('kw', ['A', 'B'], max_pages=1)
+    state.add_page(1, PageState.READY, page_of('A', 'X', 'A', 'B', sponsored=('A',)), organic_only)
+
+    ranks = state.finish()
+    assert ranks['B'] == 2
+    assert ranks['A'] is None
+    assert ranks.ad_positions['A'] == [1, 3]
+    assert ranks.organic_ranks['B'] == 2
+
+
+def test_not_found_after_last_page_is_not_ranked():
+    state = RankState('kw', ['Z'], max_pages=5)
+    state.add_page(1, PageState.READY, page_of('A', 'B', has_next=False), organic_only)
+
+    assert state.done
+    assert state.finish()['Z'] is None
+
+
+def test_reduced_depth_miss_is_rank_beyond():
+    state = RankState('kw', ['Z'], max_pages=5, target_depths={'Z': 1})
+    state.add_page(1, PageState.READY, page_of('A', 'B', 'C'), organic_only)
+
+    assert state.done
+    ranks = state.finish()
+    assert ranks['Z'] == '>3'
+    assert ranks.organic_ranks['Z'] == '>3'
+
+
+def test_unreadable_page_makes_remaining_targets_unknown():
+    state = RankState('kw', ['A', 'Z'], max_pages=5)
+    state.add_page(1, PageState.READY, page_of('A', 'B'), organic_only)
+    state.add_page(2, PageState.TIMEOUT, None, organic_only)
+
+    ranks = state.finish()
+    assert ranks['A'] == 1
+    assert ranks['Z'] == RANK_UNKNOWN
+
+
+def test_no_results_page_finishes_exhaustively():
+    state = RankState('kw', ['Z'], max_pages=5)
+    state.add_page(1, PageState.NO_RESULTS, None, organic_only)
+
+    assert state.done
+    assert state.finish()['Z'] is None
+
+
+def test_fail_marks_missing_targets_unknown():
+    state = RankState('kw', ['A', 'Z'], max_pages=5)
+    state.add_page(1, PageState.READY, page_of('A'), organic_only)
+
+    ranks = state.fail()
+    assert state.done
+    assert ranks['A'] == 1
+    assert ranks['Z'] == RANK_UNKNOWN
+
+
+def test_search_plan_groups_skus_by_keyword():
+    plan = SearchPlan([
+        {'sku_name': 'SKU1', 'asin': 'B000000001', 'rakuten_url': 'https://item.rakuten.co.jp/shop/item-1/',
+         'keywords': ['kw1', 'kw2']},
+        {'sku_name': 'SKU2', 'asin': 'B000000002', 'rakuten_url': '', 'keywords': ['kw1']},
+    ])
+
+    assert plan.keywords == ['kw1', 'kw2']
+    assert plan.amazon_targets == {'kw1': {'B000000001', 'B000000002'}, 'kw2': {'B000000001'}}
+    assert plan.rakuten_targets == {'kw1': {'item-1'}, 'kw2': {'item-1'}}
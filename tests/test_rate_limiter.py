@@ -0,0 +1,59 @@
+"""TokenBucket・RateLimiter のテスト"""
+
+import threading
+import time
+
+from src.rate_limiter import RateLimiter, TokenBucket
+
+
+def test_burst_is_available_immediately():
+    bucket = TokenBucket(rate=1, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_reservations_queue_behind_each_other():
+    bucket = TokenBucket(rate=10, burst=1)
+    assert bucket._reserve() == 0.0
+    assert abs(bucket._reserve() - 0.1) < 0.02
+    assert abs(bucket._reserve() - 0.2) < 0.02
+
+
+def test_acquire_waits_for_refill():
+    bucket = TokenBucket(rate=20, burst=1)
+    bucket.acquire()
+    started_at = time.monotonic()
+    waited = bucket.acquire()
+    assert 0.03 < waited <= 0.06
+    assert time.monotonic() - started_at >= 0.03
+
+
+def test_cancelled_acquire_does_not_spend_a_token():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    cancelled = threading.Event()
+    threading.Timer(0.05, cancelled.set).start()
+
+    waited = bucket.acquire(cancelled)
+    assert waited < 0.5
+    # 予約していればトークンは負になる（取り消された待機は後続のリクエストを遅らせない）
+    assert 0 <= bucket._tokens < 1
+
+
+def test_cancellable_acquire_takes_available_token():
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.acquire(threading.Event()) < 0.05
+    assert bucket._try_take() > 0
+
+
+def test_rate_limiter_keeps_one_bucket_per_host():
+    limiter = RateLimiter({'www.amazon.co.jp': (1, 1)}, default=(2, 1))
+    amazon = limiter.bucket('https://www.amazon.co.jp/s?k=a')
+    assert limiter.bucket('https://www.amazon.co.jp/s?k=b') is amazon
+    assert amazon.rate == 1
+    assert limiter.bucket('https://example.com/').rate == 2
+
+
+def test_rate_limiter_without_default_does_not_limit_unknown_hosts():
+    limiter = RateLimiter({'www.amazon.co.jp': (1, 1)})
+    assert limiter.bucket('https://example.com/') is None
+    assert limiter.acquire('https://example.com/') == 0.0
@@ -0,0 +1,86 @@
+"""RefreshDaemon（更新区分ごとの間隔での常駐検索）のテスト"""
+
+import time
+
+import pytest
+
+from src.refresh_daemon import RefreshDaemon
+from src.run_journal import RunJournal
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+SKU_LIST = [
+    {'sku_name': 'hot-sku', 'asin': 'A1', 'rakuten_url': '', 'keywords': ['hot-kw', 'shared-kw'], 'tier': 'hot'},
+    {'sku_name': 'cold-sku', 'asin': 'A2', 'rakuten_url': '', 'keywords': ['cold-kw', 'shared-kw'], 'tier': 'cold'},
+    {'sku_name': 'plain-sku', 'asin': 'A3', 'rakuten_url': '', 'keywords': ['normal-kw'], 'tier': None},
+]
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    written = []
+    journal_path = tmp_path / 'journal.sqlite3'
+
+    def search(plan, run_date):
+        ranks = {keyword: {target: 1 for target in targets} for keyword, targets in plan.amazon_targets.items()}
+        with RunJournal(journal_path, run_date) as journal:
+            for keyword, keyword_ranks in ranks.items():
+                journal.record('amazon', keyword, keyword_ranks)
+        return {'amazon': ranks, 'rakuten': {}}
+
+    daemon = RefreshDaemon(
+        load_sku_list=lambda: SKU_LIST,
+        search=search,
+        write_results=written.extend,
+        journal_path=journal_path,
+        tier_intervals={'hot': HOUR, 'normal': DAY, 'cold': 7 * DAY},
+        retry_interval=900
+    )
+    daemon.written = written
+    daemon._reload()
+    yield daemon
+    daemon._journal.close()
+
+
+def test_keyword_uses_most_frequent_tier_of_its_skus(daemon):
+    assert daemon.tiers == {'hot-kw': 'hot', 'shared-kw': 'hot', 'cold-kw': 'cold', 'normal-kw': 'normal'}
+
+
+def test_unsearched_keywords_are_spread_over_first_window(daemon):
+    for keyword, window in (('hot-kw', HOUR), ('normal-kw', DAY), ('cold-kw', DAY)):
+        due = daemon.next_due(keyword)
+        assert daemon._started_at < due <= daemon._started_at + window
+
+
+def test_next_due_after_refresh_is_about_one_interval_later(daemon):
+    now = time.time()
+    daemon._last_refreshed['normal-kw'] = now
+    due = daemon.next_due('normal-kw')
+    assert now + DAY / 2 < due <= now + DAY * 1.5
+
+
+def test_due_keywords_are_ordered_by_tier(daemon):
+    due = daemon.due_keywords(time.time() + 8 * DAY)
+    assert [daemon.tiers[keyword] for keyword in due] == ['hot', 'hot', 'normal', 'cold']
+    # 同じ区分の中では検索時刻の早い順
+    assert daemon.next_due(due[0]) <= daemon.next_due(due[1])
+
+
+def test_tick_writes_rows_and_pushes_next_due(daemon):
+    daemon._tick(['hot-kw', 'shared-kw'])
+
+    assert sorted((row['sku_name'], row['keyword']) for row in daemon.written) == [
+        ('cold-sku', 'shared-kw'), ('hot-sku', 'hot-kw'), ('hot-sku', 'shared-kw')
+    ]
+    now = time.time()
+    assert daemon.next_due('hot-kw') > now + HOUR / 2
+    assert 'hot-kw' not in daemon.due_keywords(now)
+    assert daemon.status()['last_tick']['rows_written'] == 3
+
+
+def test_retry_interval_delays_failed_keywords(daemon):
+    now = time.time()
+    daemon._attempted['normal-kw'] = now
+    daemon._last_refreshed.pop('normal-kw', None)
+    assert daemon._ready_at('normal-kw') >= now + 900
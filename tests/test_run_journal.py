@@ -0,0 +1,77 @@
+"""RunJournal（再開・書き込み済みの記録）のテスト"""
+
+import pytest
+
+from src.rank_state import SerpRanks
+from src.ranking import RANK_UNKNOWN
+from src.run_journal import RunJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with RunJournal(tmp_path / 'journal.sqlite3', '2026-10-17') as journal:
+        yield journal
+
+
+def test_load_restores_serp_ranks(journal):
+    journal.record('amazon', 'kw', SerpRanks({'A': 3, 'B': None}, {'A': 2, 'B': None}, {'A': [1], 'B': []}, 500))
+
+    ranks = journal.load()['amazon']['kw']
+    assert dict(ranks) == {'A': 3, 'B': None}
+    assert ranks.organic_ranks == {'A': 2, 'B': None}
+    assert ranks.ad_positions == {'A': [1], 'B': []}
+    assert ranks.total_results == 500
+    assert journal.load()['rakuten'] == {}
+
+
+def test_completed_excludes_unknown_and_missing_targets(journal):
+    journal.record('amazon', 'done', {'A': 1, 'B': None})
+    journal.record('amazon', 'unknown', {'A': RANK_UNKNOWN})
+    journal.record('rakuten', 'partial', {'X': 5})
+
+    completed = journal.completed({
+        'amazon': {'done': ['A', 'B'], 'unknown': ['A'], 'new': ['A']},
+        'rakuten': {'partial': ['X', 'Y']},
+    })
+    assert completed == {'amazon': {'done'}, 'rakuten': set()}
+
+
+def test_rerecording_replaces_unknown(journal):
+    journal.record('amazon', 'kw', {'A': RANK_UNKNOWN})
+    journal.record('amazon', 'kw', {'A': 7})
+
+    assert journal.load()['amazon']['kw'] == {'A': 7}
+    assert journal.completed({'amazon': {'kw': ['A']}}) == {'amazon': {'kw'}}
+
+
+def test_resume_sees_records_from_previous_process(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    with RunJournal(path, '2026-10-17') as first:
+        first.record('amazon', 'kw', {'A': 1})
+        first.mark_written('Rankings', 1)
+
+    with RunJournal(path, '2026-10-17') as resumed:
+        assert resumed.load()['amazon']['kw'] == {'A': 1}
+        assert resumed.written('Rankings')
+        assert not resumed.written('Other')
+
+    with RunJournal(path, '2026-10-18') as next_day:
+        assert next_day.load()['amazon'] == {}
+        assert not next_day.written('Rankings')
+
+
+def test_keyword_costs_are_smoothed_across_days(tmp_path):
+    path = tmp_path / 'journal.sqlite3'
+    with RunJournal(path, '2026-10-17') as journal:
+        journal.record('amazon', 'kw', {'A': 1}, elapsed=10.0)
+    with RunJournal(path, '2026-10-18') as journal:
+        journal.record('amazon', 'kw', {'A': 1}, elapsed=20.0)
+        assert journal.keyword_costs() == {('amazon', 'kw'): pytest.approx(13.0)}
+
+
+def test_last_refreshed_ignores_unknown(journal):
+    journal.record('amazon', 'kw', {'A': 1})
+    journal.record('rakuten', 'kw', {'X': RANK_UNKNOWN})
+    journal.record('amazon', 'other', {'A': RANK_UNKNOWN})
+
+    assert set(journal.last_refreshed()) == {'kw'}
@@ -0,0 +1,109 @@
+"""RunScheduler（時間の上限に収まるキーワードの選択）のテスト"""
+
+from datetime import date
+
+import pytest
+
+from src.run_scheduler import RunScheduler, parse_duration
+from src.search_planner import SearchPlan
+
+TODAY = date(2026, 10, 17)
+
+
+def amazon_plan(*skus) -> SearchPlan:
+    """（SKU名, キーワード, 優先度）からAmazonだけの検索計画を作る"""
+    return SearchPlan([
+        {'sku_name': sku_name, 'asin': f'ASIN-{sku_name}', 'rakuten_url': '', 'keywords': [keyword], 'priority': priority}
+        for sku_name, keyword, priority in skus
+    ])
+
+
+def history_row(day: str, sku_name: str, keyword: str, amazon_rank: str) -> dict:
+    return {'date': day, 'sku_name': sku_name, 'keyword': keyword, 'amazon_rank': amazon_rank, 'rakuten_rank': ''}
+
+
+@pytest.mark.parametrize('text, seconds', [('90s', 90), ('45m', 2700), ('1.5h', 5400), ('10', 600)])
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+def test_parse_duration_rejects_unknown_units():
+    with pytest.raises(ValueError):
+        parse_duration('1d')
+
+
+def test_without_budget_everything_is_selected_by_value():
+    plan = amazon_plan(('low', 'kw-low', 3), ('high', 'kw-high', 1))
+    scheduler = RunScheduler([], {}, {'amazon': 1}, default_cost=10)
+
+    schedule = scheduler.schedule(plan, None, TODAY)
+    assert [job.keyword for job in schedule.selected] == ['kw-high', 'kw-low']
+    assert list(schedule.plan.amazon_targets) == ['kw-high', 'kw-low']
+    assert schedule.deferred == []
+    assert schedule.predicted_seconds == 20
+
+
+def test_budget_prefers_value_per_second():
+    plan = amazon_plan(('big', 'kw-big', 1), ('a', 'kw-a', 2), ('b', 'kw-b', 2))
+    costs = {('amazon', 'kw-big'): 100.0, ('amazon', 'kw-a'): 30.0, ('amazon', 'kw-b'): 30.0}
+    scheduler = RunScheduler([], costs, {'amazon': 1})
+
+    # kw-big は価値が最も高いが、秒数あたりでは2件の小さいキーワードのほうが価値が高い
+    schedule = scheduler.schedule(plan, 60, TODAY)
+    assert sorted(job.keyword for job in schedule.selected) == ['kw-a', 'kw-b']
+    assert [job.keyword for job in schedule.deferred] == ['kw-big']
+    assert schedule.predicted_seconds == 60
+
+
+def test_skipped_job_does_not_stop_smaller_ones_from_fitting():
+    plan = amazon_plan(('a', 'kw-a', 1), ('b', 'kw-b', 1), ('c', 'kw-c', 3))
+    costs = {('amazon', 'kw-a'): 40.0, ('amazon', 'kw-b'): 40.0, ('amazon', 'kw-c'): 10.0}
+    scheduler = RunScheduler([], costs, {'amazon': 1})
+
+    schedule = scheduler.schedule(plan, 50, TODAY)
+    assert sorted(job.keyword for job in schedule.selected) == ['kw-a', 'kw-c']
+    assert [job.keyword for job in schedule.deferred] == ['kw-b']
+
+
+def test_lane_workers_share_the_budget():
+    plan = amazon_plan(('a', 'kw-a', 1), ('b', 'kw-b', 1))
+    scheduler = RunScheduler([], {}, {'amazon': 2}, default_cost=60)
+
+    schedule = scheduler.schedule(plan, 60, TODAY)
+    assert len(schedule.selected) == 2
+    assert schedule.predicted_seconds == 60
+
+
+def test_unmeasured_keywords_use_marketplace_median():
+    plan = amazon_plan(('a', 'kw-a', 1), ('new', 'kw-new', 1))
+    scheduler = RunScheduler([], {('amazon', 'kw-a'): 12.0, ('amazon', 'other'): 20.0}, {'amazon': 1}, default_cost=99)
+
+    jobs = {job.keyword: job for job in scheduler.schedule(plan, None, TODAY).selected}
+    assert jobs['kw-new'].costs == {'amazon': 16.0}
+
+
+def test_staleness_and_volatility_raise_value():
+    history = [
+        history_row('2026-10-16', 'fresh', 'kw-fresh', '5'),
+        history_row('2026-10-07', 'stale', 'kw-stale', '5'),
+        history_row('2026-10-15', 'moving', 'kw-moving', '5'),
+        history_row('2026-10-16', 'moving', 'kw-moving', '35'),
+    ]
+    plan = amazon_plan(('fresh', 'kw-fresh', 1), ('stale', 'kw-stale', 1), ('moving', 'kw-moving', 1))
+    scheduler = RunScheduler(history, {}, {'amazon': 1})
+
+    values = {job.keyword: job.value for job in scheduler.schedule(plan, None, TODAY).selected}
+    assert values['kw-fresh'] == pytest.approx(2.0)
+    assert values['kw-stale'] == pytest.approx(11.0)
+    assert values['kw-moving'] == pytest.approx(2.0 * 4.0)
+
+
+def test_same_day_rows_count_once_for_volatility():
+    # 常駐モードが1日に何度も書き込んだ場合も、その日の最後の行だけを使う
+    history = [
+        history_row('2026-10-15', 'sku', 'kw', '5'),
+        history_row('2026-10-16', 'sku', 'kw', '45'),
+        history_row('2026-10-16', 'sku', 'kw', '5'),
+    ]
+    scheduler = RunScheduler(history, {}, {'amazon': 1})
+    assert scheduler._volatility[('sku', 'kw')] == 0.0
@@ -0,0 +1,61 @@
+"""SerpArchive（検索結果ページの圧縮アーカイブ）と reparse のテスト"""
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.reparse import reparse_archive
+from src.search_planner import SearchPlan
+from src.serp_archive import SerpArchive
+from src.serp_parser import RawPage
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+AMAZON_HTML = (FIXTURES / 'amazon_serp.html').read_text(encoding='utf-8')
+
+
+@pytest.fixture
+def archive(tmp_path):
+    with SerpArchive(tmp_path / 'serp_archive.sqlite3') as archive:
+        yield archive
+
+
+def test_pages_round_trip(archive):
+    html = RawPage('html', AMAZON_HTML)
+    script = RawPage('script', {'items': [{'id': 'B000000001', 'sponsored': False, 'position': 1}], 'has_next': False})
+    html_digest = archive.store('amazon', 'kw', 1, html, datetime(2026, 10, 16, 9))
+    script_digest = archive.store('amazon', 'kw', 2, script, datetime(2026, 10, 16, 9, 1))
+
+    assert archive.load(html_digest, 'html') == html
+    assert archive.load(script_digest, 'script') == script
+    assert [(page.keyword, page.page, page.kind) for page in archive.pages('2026-10-16', '2026-10-16')] == [
+        ('kw', 1, 'html'), ('kw', 2, 'script'),
+    ]
+    assert archive.pages('2026-10-17', '2026-10-17') == []
+
+
+def test_same_content_is_stored_once(archive):
+    page = RawPage('html', AMAZON_HTML)
+    first = archive.store('amazon', 'kw', 1, page, datetime(2026, 10, 16, 9))
+    second = archive.store('amazon', 'kw', 1, page, datetime(2026, 10, 17, 9))
+
+    assert first == second
+    assert (archive.stored, archive.deduplicated) == (1, 1)
+    assert archive._conn.execute('SELECT COUNT(*) FROM blobs').fetchone() == (1,)
+    # 索引は取得ごとに残る
+    assert len(archive.pages('2026-10-16', '2026-10-17')) == 2
+
+
+def test_reparse_uses_the_latest_page_of_the_day(archive):
+    plan = SearchPlan([
+        {'sku_name': 'SKU1', 'asin': 'B000000002', 'rakuten_url': '', 'keywords': ['kw']},
+    ])
+    empty = RawPage('html', '<html><body></body></html>')
+    archive.store('amazon', 'kw', 1, empty, datetime(2026, 10, 16, 9))
+    archive.store('amazon', 'kw', 1, RawPage('html', AMAZON_HTML), datetime(2026, 10, 16, 10))
+
+    results = reparse_archive(archive, plan, '2026-10-16', '2026-10-16', workers=1)
+
+    assert [(row['date'], row['sku_name'], row['keyword'], row['amazon_rank']) for row in results] == [
+        ('2026-10-16', 'SKU1', 'kw', 2),
+    ]
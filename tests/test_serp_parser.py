@@ -0,0 +1,115 @@
+"""serp_parser のテスト（lxml と BeautifulSoup の両方の解析経路で同じ結果になること）"""
+
+from pathlib import Path
+
+import pytest
+
+from src import serp_parser
+from src.serp_parser import (
+    ParsedPage, RawPage, SerpItem, extract_product_id, parse_raw_page, parse_rakuten_total_results,
+    parse_total_results
+)
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+AMAZON_EXPECTED = ParsedPage(
+    [
+        SerpItem('B000SPONS1', True, 1),
+        SerpItem('B000000001', False, 2),
+        SerpItem('B000SPONS2', True, 3),
+        # ラベルの直下に「スポンサー」のテキストが無いものは広告とみなさない
+        SerpItem('B000000002', False, 4),
+    ],
+    has_next=True,
+    total_results=3000
+)
+
+RAKUTEN_EXPECTED = ParsedPage(
+    [
+        SerpItem('item-1', False, 1),
+        SerpItem('item-2', True, 2),
+        SerpItem(None, False, 3),
+    ],
+    has_next=True,
+    total_results=12345
+)
+
+
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+
+@pytest.fixture(params=['lxml', 'bs4'])
+def backend(request, monkeypatch):
+    """解析に使うライブラリを切り替える"""
+    if request.param == 'lxml':
+        pytest.importorskip('lxml.html')
+        if serp_parser.lxml is None:
+            pytest.skip('lxml is not installed')
+    else:
+        bs4 = pytest.importorskip('bs4')
+        monkeypatch.setattr(serp_parser, 'lxml', None)
+        monkeypatch.setattr(serp_parser, 'BeautifulSoup', bs4.BeautifulSoup, raising=False)
+    return request.param
+
+
+def test_parse_amazon_serp(backend):
+    assert serp_parser.parse_amazon_serp(fixture('amazon_serp.html')) == AMAZON_EXPECTED
+
+
+def test_parse_rakuten_serp(backend):
+    assert serp_parser.parse_rakuten_serp(fixture('rakuten_serp.html')) == RAKUTEN_EXPECTED
+
+
+def test_parse_rakuten_serp_without_count(backend):
+    html = '<div class="searchresultitem"><a href="https://item.rakuten.co.jp/s/p/"></a><span class="count">3件</span></div>'
+    parsed = serp_parser.parse_rakuten_serp(html)
+    assert parsed.total_results is None
+    assert parsed.has_next is False
+
+
+def test_parse_raw_page_dispatches_script_results():
+    result = {
+        'items': [
+            {'url': 'https://item.rakuten.co.jp/shop-a/item-1/', 'sponsored': False, 'position': 1},
+            {'url': None, 'sponsored': True, 'position': 2},
+        ],
+        'has_next': False,
+        'total_text': '（1～2件 / 2件）',
+    }
+    parsed = parse_raw_page('rakuten', RawPage('script', result))
+    assert parsed == ParsedPage([SerpItem('item-1', False, 1), SerpItem(None, True, 2)], False, 2)
+
+    amazon = parse_raw_page('amazon', RawPage('script', {'items': [{'id': 'B0', 'sponsored': 1, 'position': 1}]}))
+    assert amazon == ParsedPage([SerpItem('B0', True, 1)], False, None)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1-48 / 3,000件以上', 3000),
+    ('12,345 以上のうち 1-48件', 12345),
+    ('', None),
+    (None, None),
+])
+def test_parse_total_results(text, expected):
+    assert parse_total_results(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('（1～45件 / 123,456件）', 123456),
+    ('（45件）', 45),
+    ('ポイント3倍', None),
+    (None, None),
+])
+def test_parse_rakuten_total_results(text, expected):
+    assert parse_rakuten_total_results(text) == expected
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://item.rakuten.co.jp/shop-name/product-id/', 'product-id'),
+    ('https://item.rakuten.co.jp/shop-name/product-id/?scid=af', 'product-id'),
+    ('https://product.rakuten.co.jp/product/-/abc123/', 'abc123'),
+    ('product-id', 'product-id'),
+    ('https://example.com/other', None),
+])
+def test_extract_product_id(url, expected):
+    assert extract_product_id(url) == expected
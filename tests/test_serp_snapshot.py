@@ -0,0 +1,49 @@
+"""SerpSnapshot（検索結果の上位商品のスナップショット）のテスト"""
+
+from datetime import datetime
+
+import pytest
+
+from src.page_readiness import PageState
+from src.ranking import RANK_UNKNOWN
+from src.rank_state import RankState
+from src.search_planner import SearchPlan
+from src.serp_parser import ParsedPage, SerpItem
+from src.serp_snapshot import KeywordSnapshot, SerpSnapshot
+
+
+def scanned_state(keyword, items, has_next):
+    """1ページ分の商品を確認し終えた RankState"""
+    rank_state = RankState(keyword, ['B00TARGET'], max_pages=1, record_items=True)
+    rank_state.add_page(1, PageState.READY, ParsedPage(items, has_next), lambda item: not item.is_sponsored)
+    rank_state.finish()
+    return rank_state
+
+
+def test_keyword_snapshot_rank():
+    snapshot = KeywordSnapshot(datetime(2026, 10, 16), exhaustive=False, positions={'A1': 3, 'AD': None})
+    assert snapshot.rank('A1') == 3
+    # 打ち切ったキーワードで見つからない商品は確認できていない
+    assert snapshot.rank('A2') == RANK_UNKNOWN
+    assert snapshot._replace(exhaustive=True).rank('A2') is None
+
+
+def test_snapshot_round_trip_uses_the_latest_search(tmp_path):
+    pytest.importorskip('pyarrow')
+    items = [SerpItem('B00SPONSOR', True, 1), SerpItem('B00OTHER', False, 2), SerpItem('B00COMPETE', False, 3)]
+    with SerpSnapshot(tmp_path) as snapshot:
+        snapshot.add('amazon', scanned_state('kw', items, has_next=True), datetime(2026, 10, 16, 9))
+        snapshot.add('amazon', scanned_state('kw', items[::-1], has_next=False), datetime(2026, 10, 16, 10))
+
+    snapshot = SerpSnapshot(tmp_path)
+    assert snapshot.lookup('2026-10-16', 'amazon', 'kw', 'B00COMPETE') == 1
+    assert snapshot.lookup('2026-10-16', 'amazon', 'kw', 'B00OTHER') == 2
+    # 最後の検索は最終ページまで確認しているため「圏外」
+    assert snapshot.lookup('2026-10-16', 'amazon', 'kw', 'B00MISSING') is None
+    assert snapshot.lookup('2026-10-17', 'amazon', 'kw', 'B00OTHER') == RANK_UNKNOWN
+
+    plan = SearchPlan([
+        {'sku_name': 'NEW', 'asin': 'B00COMPETE', 'rakuten_url': '', 'keywords': ['kw', 'other']},
+    ])
+    results = snapshot.rank_results(plan, '2026-10-16', '2026-10-16')
+    assert [(row['date'], row['keyword'], row['amazon_rank']) for row in results] == [('2026-10-16', 'kw', 1)]
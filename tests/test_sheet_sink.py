@@ -0,0 +1,178 @@
+"""SheetSink（ランキングシートへの順次書き込み）の重複防止・上書きのテスト"""
+
+import pytest
+
+from src.ranking import RANK_UNKNOWN
+from src.run_journal import RunJournal
+from src.search_planner import SearchPlan
+from src.sheet_sink import SheetSink
+
+RUN_DATE = '2026-10-17'
+
+
+class FakeSheetsClient:
+    """書き込んだ行を覚えておく Google Sheets クライアントの代わり"""
+
+    def __init__(self, history=None):
+        self.rows = list(history or [])
+        self.writes = 0
+        self.fail_after_write = 0  # 書き込んだ後に失敗させる回数（タイムアウトで結果が分からない場合）
+
+    def upsert_ranking_data(self, rows, sheet_name):
+        """GoogleSheetsClient.upsert_ranking_data と同じく、同じ日・SKU×キーワードの行は上書きする"""
+        self.writes += 1
+        for row in rows:
+            key = (row['date'], row['sku_name'], row['keyword'])
+            index = next((i for i, old in enumerate(self.rows) if (old['date'], old['sku_name'], old['keyword']) == key), None)
+            if index is None:
+                self.rows.append(row)
+            else:
+                self.rows[index] = row
+        if self.fail_after_write:
+            self.fail_after_write -= 1
+            raise TimeoutError('write timed out')
+
+
+class DownSheetsClient(FakeSheetsClient):
+    """書き込みが届かずに失敗し続ける Google Sheets クライアントの代わり"""
+
+    def upsert_ranking_data(self, rows, sheet_name):
+        self.writes += 1
+        raise TimeoutError('write failed')
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with RunJournal(tmp_path / 'journal.sqlite3', RUN_DATE) as journal:
+        yield journal
+
+
+@pytest.fixture
+def plan():
+    return SearchPlan([
+        {'sku_name': 'SKU1', 'asin': 'A1', 'rakuten_url': '', 'keywords': ['kw1', 'kw2']},
+        {'sku_name': 'SKU2', 'asin': 'A2', 'rakuten_url': '', 'keywords': ['kw1']},
+    ])
+
+
+def sink_for(client, journal, **kwargs) -> SheetSink:
+    options = dict(batch_rows=10, flush_interval=0, min_write_interval=0, poll_interval=3600)
+    options.update(kwargs)
+    return SheetSink(client, 'Rankings', journal, **options)
+
+
+def keys(rows):
+    return sorted((row['sku_name'], row['keyword']) for row in rows)
+
+
+def test_poll_writes_settled_rows_once(journal, plan):
+    client = FakeSheetsClient()
+    sink = sink_for(client, journal)
+    sink.start(plan)
+    journal.record('amazon', 'kw1', {'A1': 1, 'A2': 2})
+
+    sink._poll()
+    sink._poll()
+    assert keys(client.rows) == [('SKU1', 'kw1'), ('SKU2', 'kw1')]
+
+    results = plan.build_results(journal.load()['amazon'], {}, RUN_DATE)
+    assert sink.finish(results) == 3
+    assert keys(client.rows) == [('SKU1', 'kw1'), ('SKU1', 'kw2'), ('SKU2', 'kw1')]
+
+
+def test_rows_already_on_sheet_are_overwritten(journal, plan):
+    client = FakeSheetsClient([
+        # 常駐モードが本日書き込んだ行と、前日の行
+        {'date': RUN_DATE, 'sku_name': 'SKU1', 'keyword': 'kw1', 'amazon_rank': 9},
+        {'date': '2026-10-16', 'sku_name': 'SKU2', 'keyword': 'kw1', 'amazon_rank': 9},
+    ])
+    sink = sink_for(client, journal)
+    sink.start(plan)
+    journal.record('amazon', 'kw1', {'A1': 1, 'A2': 2})
+
+    sink._poll()
+    assert len(client.rows) == 3
+    assert client.rows[0]['amazon_rank'] == 1
+    assert keys(client.rows[2:]) == [('SKU2', 'kw1')]
+
+
+def test_ambiguous_failure_is_resent_without_duplicates(journal, plan):
+    client = FakeSheetsClient()
+    client.fail_after_write = 1
+    sink = sink_for(client, journal)
+    sink.start(plan)
+    journal.record('amazon', 'kw1', {'A1': 1, 'A2': 2})
+
+    sink._poll()
+    assert client.writes == 1
+    sink._interval = 0
+    sink._poll()
+
+    # 失敗した書き込みは実際には届いていたが、送り直しても同じ行を上書きするだけ
+    assert client.writes == 2
+    assert keys(client.rows) == [('SKU1', 'kw1'), ('SKU2', 'kw1')]
+
+
+def test_resume_overwrites_unknown_rows(tmp_path, plan):
+    client = FakeSheetsClient()
+    path = tmp_path / 'journal.sqlite3'
+
+    # 中断した実行: SKU1 の順位を確認できず、最後に「不明」の行を書き込んだ
+    with RunJournal(path, RUN_DATE) as journal:
+        journal.record('amazon', 'kw1', {'A1': RANK_UNKNOWN, 'A2': 2})
+        sink = sink_for(client, journal)
+        sink.start(plan)
+        sink.finish(plan.build_results(journal.load()['amazon'], {}, RUN_DATE, complete_only=True))
+    assert [row['amazon_rank'] for row in client.rows if row['sku_name'] == 'SKU1'] == [RANK_UNKNOWN]
+
+    # --resume: 「不明」だったキーワードを検索し直して確定した順位で上書きする
+    with RunJournal(path, RUN_DATE) as journal:
+        sink = sink_for(client, journal)
+        sink.start(plan)
+        journal.record('amazon', 'kw1', {'A1': 4, 'A2': 2})
+        sink._poll()
+        sink.finish(plan.build_results(journal.load()['amazon'], {}, RUN_DATE, complete_only=True))
+
+    assert keys(client.rows) == [('SKU1', 'kw1'), ('SKU2', 'kw1')]
+    assert [row['amazon_rank'] for row in client.rows if row['sku_name'] == 'SKU1'] == [4]
+
+
+def test_unknown_rows_wait_for_finish(journal, plan):
+    client = FakeSheetsClient()
+    sink = sink_for(client, journal)
+    sink.start(plan)
+    journal.record('amazon', 'kw1', {'A1': RANK_UNKNOWN, 'A2': 2})
+
+    sink._poll()
+    assert keys(client.rows) == [('SKU2', 'kw1')]
+
+    results = plan.build_results(journal.load()['amazon'], {}, RUN_DATE)
+    sink.finish(results)
+    assert keys(client.rows) == [('SKU1', 'kw1'), ('SKU1', 'kw2'), ('SKU2', 'kw1')]
+
+
+def test_finish_gives_up_after_max_retries(journal, plan):
+    client = DownSheetsClient()
+    sink = sink_for(client, journal, max_backoff=0, max_retries=1)
+    sink.start(plan)
+
+    with pytest.raises(RuntimeError):
+        sink.finish(plan.build_results({}, {}, RUN_DATE))
+
+
+def test_sink_keeps_one_row_per_sku_and_keyword_per_day(journal, plan):
+    client = FakeSheetsClient([
+        {'date': '2026-10-16', 'sku_name': 'SKU1', 'keyword': 'kw1', 'amazon_rank': 9},
+    ])
+    sink = sink_for(client, journal)
+    sink.start(plan)
+    journal.record('amazon', 'kw1', {'A1': 1, 'A2': 2})
+    sink._poll()
+
+    # 書き込めたか分からない失敗の後に同じ行を送り直しても、本日分の行は増えない
+    sink._written.clear()
+    sink._poll()
+
+    today = [row for row in client.rows if row['date'] == RUN_DATE]
+    assert keys(today) == [('SKU1', 'kw1'), ('SKU2', 'kw1')]
+    assert len(client.rows) == 3
@@ -0,0 +1,107 @@
+"""Watchdog（ページ取得・キーワード検索の期限の監視）のテスト"""
+
+import threading
+import time
+from pathlib import Path
+
+from src.amazon_scraper import AmazonScraper
+from src.page_readiness import PageState
+from src.rate_limiter import RateLimiter
+from src.watchdog import Watchdog
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def test_expired_deadline_runs_its_handler():
+    watchdog = Watchdog(poll_interval=0.01)
+    fired = threading.Event()
+    deadline = watchdog.start(0.05, fired.set, 'テスト')
+
+    assert fired.wait(1)
+    assert deadline.expired
+    assert watchdog.expired_count == 1
+
+
+def test_cancelled_or_disabled_deadline_never_fires():
+    watchdog = Watchdog(poll_interval=0.01)
+    fired = threading.Event()
+    with watchdog.start(0.05, fired.set, 'キャンセル'):
+        pass
+    disabled = watchdog.start(0, fired.set, '無効')
+
+    assert not fired.wait(0.2)
+    assert not disabled.expired
+
+
+def test_failing_handler_does_not_stop_the_watchdog():
+    watchdog = Watchdog(poll_interval=0.01)
+    fired = threading.Event()
+
+    def fail():
+        raise RuntimeError('終了できない')
+
+    watchdog.start(0.01, fail, '失敗')
+    watchdog.start(0.05, fired.set, '後続')
+    assert fired.wait(1)
+    assert watchdog.expired_count == 2
+
+
+class FakePage:
+    """読み込みが止まる（hang=True）か、すぐに結果を返すブラウザのページ"""
+
+    def __init__(self, hang):
+        self.hang = hang
+        self._killed = threading.Event()
+
+    def get(self, url):
+        if self.hang:
+            # 強制終了されるまで戻らない driver.get の代わり
+            self._killed.wait(5)
+            raise ConnectionError('ブラウザが終了しました')
+
+    def execute_script(self, script, *args):
+        return PageState.READY
+
+    @property
+    def page_source(self):
+        return (FIXTURES / 'amazon_serp.html').read_text(encoding='utf-8')
+
+    def kill(self):
+        self._killed.set()
+
+    @property
+    def killed(self):
+        return self._killed.is_set()
+
+
+class FakePool:
+    """用意したページを順に貸し出すプール"""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.released = []
+
+    def acquire_page(self, timeout=None):
+        return self.pages.pop(0)
+
+    def release_page(self, page):
+        self.released.append(page)
+
+    def record_page(self, page):
+        pass
+
+
+def test_hung_page_is_killed_and_fetched_again_on_a_new_page():
+    hung, fresh = FakePage(hang=True), FakePage(hang=False)
+    pool = FakePool([hung, fresh])
+    scraper = AmazonScraper(pool=pool, rate_limiter=RateLimiter({}), page_deadline=0.1)
+    scraper.watchdog = Watchdog(poll_interval=0.01)
+
+    started_at = time.monotonic()
+    state, raw_page, _ = scraper._request_page('https://www.amazon.co.jp/s?k=kw')
+
+    assert time.monotonic() - started_at < 2
+    assert state == PageState.READY and raw_page.kind == 'html'
+    # 止めたページはプールに返して作り直させる
+    assert hung.killed and pool.released == [hung]
+    assert scraper.browser_page is fresh